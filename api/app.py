@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .routers import (
     auth,
@@ -8,11 +9,24 @@ from .routers import (
     ballots_backup,
     backup,
     secure,
+    jobs,
 )
-from .routers.ballots_backup import start_ballot_backup_scheduler
 from api.middleware.anon_session import AnonSessionMiddleware
+from common.jobs import in_app_worker
 
-app = FastAPI(title="Secure E-Voting Prototype", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ Scheduled backups run on the shared job queue (once per day cluster-wide)
+    worker = in_app_worker()
+    if worker is not None:
+        worker.start()
+    yield
+    if worker is not None:
+        worker.stop(timeout=5)
+
+
+app = FastAPI(title="Secure E-Voting Prototype", version="0.1.0", lifespan=lifespan)
 
 
 @app.get("/")
@@ -38,6 +52,4 @@ app.include_router(backup.router, prefix="/api/backup", tags=["backup"])
 app.include_router(results_backup.router, prefix="/api/results/backup", tags=["results-backup"])
 app.include_router(ballots_backup.router, prefix="/api/ballots/backup", tags=["ballots-backup"])
 app.include_router(secure.router, prefix="/secure", tags=["secure"])
-
-# ✅ Start scheduled ballot backup job
-start_ballot_backup_scheduler()
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
@@ -1,49 +1,69 @@
 """
 api/routers/backup.py
 Implements SR-07: Daily encrypted voter backups + quarterly restore drill.
+The daily backup runs on the shared job queue (common/jobs.py), so it runs
+once per day however many API processes are up.
 """
 
-from fastapi import APIRouter
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
-from utils.backup_utils import perform_encrypted_backup, restore_from_backup
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from common.db import get_db
+from common.jobs import JobContext, handler, job_view, schedule, submit
+from common.models.models import Job
+from utils.backup_utils import backup_key, perform_encrypted_backup, restore_from_backup
 import os
 
 router = APIRouter(tags=["backup"])
 
-# Create scheduler instance
-scheduler = BackgroundScheduler()
+BACKUP_EVERY_S = 24 * 3600
 
 
-def daily_voter_backup():
-    """Performs daily encrypted backup for voter registration data."""
+@handler("voter_backup")
+def daily_voter_backup(ctx: JobContext):
+    """
+    Performs daily encrypted backup for voter registration data.
+    Fails (and is retried) without BACKUP_AES_KEY: a backup under a one-off
+    key could never be restored, so it must not be reported as DONE.
+    """
+    if backup_key() is None:
+        raise RuntimeError("BACKUP_AES_KEY is not set; the backup would not be restorable")
     print(f"[{datetime.now()}] 🔄 Running daily voter backup...")
     result = perform_encrypted_backup()
     print("✅ Daily voter backup result:", result)
+    if not result["restorable"]:
+        raise RuntimeError("backup was written under a one-off key and cannot be restored")
+    return result
 
 
 # Schedule: run every 24 hours
-scheduler.add_job(daily_voter_backup, "interval", hours=24)
-scheduler.start()
+schedule("voter_backup", BACKUP_EVERY_S)
 
 
 @router.post("/run")
-def run_backup():
+def run_backup(
+    background: bool = Query(False, description="queue as a job and return its id"),
+    db: Session = Depends(get_db),
+):
     """Manual backup trigger."""
+    if background:
+        return {"status": "queued", "job": job_view(submit(db, "voter_backup"))}
     result = perform_encrypted_backup()
     return {"status": "ok", "message": "Encrypted backup completed", "details": result}
 
 
 @router.get("/status")
-def backup_status():
-    """Shows current backup job schedule."""
-    jobs = scheduler.get_jobs()
-    if not jobs:
-        return {"status": "idle"}
+def backup_status(db: Session = Depends(get_db)):
+    """Shows current backup job schedule and the latest backup job."""
+    last = db.execute(
+        select(Job).where(Job.type == "voter_backup").order_by(Job.id.desc()).limit(1)
+    ).scalar_one_or_none()
+    next_run = (int(datetime.now(timezone.utc).timestamp()) // BACKUP_EVERY_S + 1) * BACKUP_EVERY_S
     return {
         "status": "scheduled",
-        "next_run": str(jobs[0].next_run_time),
-        "job_id": jobs[0].id,
+        "next_run": str(datetime.fromtimestamp(next_run, timezone.utc)),
+        "last_job": job_view(last) if last else None,
     }
 
 
@@ -64,5 +84,8 @@ def restore_drill():
         return {"status": "error", "message": "No backups available to restore."}
 
     latest = os.path.join(backup_dir, latest_backup[0])
+    # every chunk and the trailer are authenticated while streaming
     result = restore_from_backup(latest)
+    if not result["verified"]:
+        return {"status": "error", "message": "Restore drill failed verification", "details": result}
     return {"status": "ok", "message": "Quarterly restore drill completed", "details": result}
@@ -1,36 +1,21 @@
 """
 api/routers/ballot_backup.py
 Implements daily AES-GCM encrypted backups for ballot data (SR-19).
+The daily run is a scheduled job on the shared queue (common/jobs.py).
 """
 
 import os
 from datetime import datetime
-from fastapi import APIRouter
-from apscheduler.schedulers.background import BackgroundScheduler
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-
-def perform_encrypted_backup(db_path: str, backup_file: str):
-    """Lightweight AES-GCM backup utility (for SR-19 standalone testing)."""
-    with open(db_path, "rb") as f:
-        data = f.read()
-    key = get_random_bytes(32)
-    nonce = get_random_bytes(12)
-    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-    ciphertext, tag = cipher.encrypt_and_digest(data)
-    with open(backup_file, "wb") as f:
-        f.write(nonce + tag + ciphertext)
-    return {
-        "status": "success",
-        "backup_file": backup_file,
-        "key_preview": key.hex()[:16] + "...",
-    }
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from common.db import get_db
+from common.jobs import JobContext, handler, job_view, schedule, submit
+from utils.backup_utils import backup_key, perform_encrypted_backup
 
 router = APIRouter(tags=["ballot-backup"])
 
 BACKUP_DIR = os.path.join("backup", "ballots")
 os.makedirs(BACKUP_DIR, exist_ok=True)
-scheduler = BackgroundScheduler()
 
 
 def perform_ballot_backup():
@@ -47,15 +32,32 @@ def perform_ballot_backup():
         return {"status": "error", "error": str(e)}
 
 
+@handler("ballot_backup")
+def ballot_backup_job(ctx: JobContext):
+    """
+    Queued/scheduled ballot backup; a failure is retried by the job queue.
+    Without BACKUP_AES_KEY the backup would not be restorable, so the job fails.
+    """
+    if backup_key() is None:
+        raise RuntimeError("BACKUP_AES_KEY is not set; the backup would not be restorable")
+    result = perform_ballot_backup()
+    if result["status"] != "ok":
+        raise RuntimeError(result["error"])
+    if not result["details"]["restorable"]:
+        raise RuntimeError("backup was written under a one-off key and cannot be restored")
+    return result
+
+
+# Daily ballot backups (every 24 h, once across all workers)
+schedule("ballot_backup", 24 * 3600)
+
+
 @router.post("/run")
-def run_ballot_backup():
+def run_ballot_backup(
+    background: bool = Query(False, description="queue as a job and return its id"),
+    db: Session = Depends(get_db),
+):
     """Manual trigger for ballot backup."""
+    if background:
+        return {"status": "queued", "job": job_view(submit(db, "ballot_backup"))}
     return perform_ballot_backup()
-
-
-def start_ballot_backup_scheduler():
-    """Starts scheduler for daily ballot backups."""
-    if not scheduler.running:
-        scheduler.add_job(perform_ballot_backup, "interval", days=1)
-        scheduler.start()
-        print("🕒 Ballot backup scheduler started (runs every 24 h)")
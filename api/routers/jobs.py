@@ -0,0 +1,21 @@
+"""
+api/routers/jobs.py
+Status polling for background jobs (backups, exports, tallies).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from common.db import get_db
+from common.jobs import job_view
+from common.models.models import Job
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Status, attempts, progress and result of one job."""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job_view(job)
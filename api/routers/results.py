@@ -1,31 +1,30 @@
-from fastapi import APIRouter, Header, HTTPException, Response
-from hashlib import sha256
-import json
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+import os
 
-router = APIRouter()
+from api.security.api_key import RESULTS_API_KEY, UNAUTHORIZED, api_key_ok
+from common.tally.live import results_cache
 
-API_KEY = "demo-api-key"  # temporary constant
+router = APIRouter()
 
-def checksum(obj):
-    return sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+API_KEY = RESULTS_API_KEY
+RESULTS_ELECTION_ID = os.getenv("RESULTS_ELECTION_ID", "el1")
 
 @router.get("/latest")
 def latest_results(
+    election_id: str = Query(RESULTS_ELECTION_ID, max_length=64),
     x_api_key: str | None = Header(default=None, alias="X-API-Key"),
     if_none_match: str | None = Header(default=None, alias="If-None-Match"),
 ):
-    if x_api_key != API_KEY:
-        raise HTTPException(status_code=401, detail={"code": "unauthorized", "detail": "missing/invalid api key"})
+    if not api_key_ok(x_api_key):
+        raise HTTPException(status_code=401, detail=UNAUTHORIZED)
 
-    payload = {"electionId": "el1", "tally": {"c1": 120, "c2": 95, "c3": 88}}
-    etag = checksum(payload)
+    # body and checksum are built once per aggregate version
+    snap = results_cache.get(election_id)
+    headers = {"ETag": snap.etag, "X-Results-Version": str(snap.version)}
 
-    if if_none_match == etag:
-        r = Response(status_code=304)
-        r.headers["ETag"] = etag
-        return r
+    if if_none_match == snap.etag:
+        return Response(status_code=304, headers=headers)
 
-    resp = Response(content=json.dumps(payload), media_type="application/json")
-    resp.headers["ETag"] = etag
-    resp.headers["X-Checksum-SHA256"] = etag
+    resp = Response(content=snap.body, media_type="application/json", headers=headers)
+    resp.headers["X-Checksum-SHA256"] = snap.etag
     return resp
@@ -0,0 +1,39 @@
+"""
+api/security/api_key.py
+Shared API-key gate for results data (SR-20): /api/results/latest and the
+results push channel accept the same key; triggering a live count takes the
+key (header only) or an admin bearer token.
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Query
+
+from api.security.rbac import get_current_user_role
+from common.models.roles import Role
+
+RESULTS_API_KEY = os.getenv("RESULTS_API_KEY", "demo-api-key")
+
+UNAUTHORIZED = {"code": "unauthorized", "detail": "missing/invalid api key"}
+
+
+def api_key_ok(key: Optional[str]) -> bool:
+    return bool(key) and hmac.compare_digest(key.encode(), RESULTS_API_KEY.encode())
+
+
+def require_api_key(
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+    api_key: Optional[str] = Query(default=None, description="for clients that cannot set headers (EventSource)"),
+) -> None:
+    if not api_key_ok(x_api_key or api_key):
+        raise HTTPException(status_code=401, detail=UNAUTHORIZED)
+
+
+def require_admin_or_api_key(
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+    role: Role = Depends(get_current_user_role),
+) -> None:
+    if role != Role.ADMIN and not api_key_ok(x_api_key):
+        raise HTTPException(status_code=401, detail=UNAUTHORIZED)
@@ -0,0 +1,106 @@
+"""
+bench/async_load.py
+Load benchmark: sync (threadpool) vs async (event loop) chain-tip handlers.
+
+Both handlers run the same chain-tip query against DATABASE_URL, plus a
+simulated network round-trip (--rtt-ms) standing in for a remote Postgres.
+Sync handlers are capped by Starlette's threadpool (40 workers by default);
+async handlers only hold a coroutine while they wait on the database.
+
+    python bench/async_load.py --requests 2000 --concurrency 400 --rtt-ms 100
+
+Client and server share one process, so at small RTTs both modes hit the same
+CPU ceiling; the gap opens once concurrency x RTT exceeds the threadpool.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx  # type: ignore
+from fastapi import Depends, FastAPI  # type: ignore
+from sqlalchemy import select  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base, engine, get_async_session, get_session, dispose_async_engine
+from common.models.models import BallotChain
+
+
+def build_app(rtt: float) -> FastAPI:
+    app = FastAPI()
+
+    def _tip_stmt(election_id: str):
+        return (
+            select(BallotChain.seq, BallotChain.curr_hash)
+            .where(BallotChain.election_id == election_id)
+            .order_by(BallotChain.seq.desc())
+            .limit(1)
+        )
+
+    @app.get("/sync/tip")
+    def sync_tip(election_id: str, db: Session = Depends(get_session)):
+        time.sleep(rtt)
+        row = db.execute(_tip_stmt(election_id)).first()
+        return {"height": row.seq if row else 0}
+
+    @app.get("/async/tip")
+    async def async_tip(election_id: str, db: AsyncSession = Depends(get_async_session)):
+        await asyncio.sleep(rtt)
+        row = (await db.execute(_tip_stmt(election_id))).first()
+        return {"height": row.seq if row else 0}
+
+    return app
+
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.get(path, params={"election_id": "bench"})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=400)
+    ap.add_argument("--rtt-ms", type=float, default=100.0)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    app = build_app(args.rtt_ms / 1000.0)
+
+    for mode in ("sync", "async"):
+        stats = await run(app, f"/{mode}/tip", args.requests, args.concurrency)
+        print(f"{mode:>5}: {stats}")
+
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
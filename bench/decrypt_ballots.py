@@ -0,0 +1,75 @@
+"""
+bench/decrypt_ballots.py
+Throughput of the streaming ballot decryption (common/tally/decrypt.py).
+
+Writes N encrypted canonical_prefs() ballots to a scratch SQLite database,
+then streams them back through iter_preferences() inline and on the pool.
+
+    python bench/decrypt_ballots.py --ballots 500000 --workers 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("BALLOT_AES_KEY", "ab" * 32)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from common.db import Base
+from common.models.models import Ballot
+from common.tally.decrypt import iter_preferences
+from cryptoutils.ballots import ballot_key, canonical_prefs
+from cryptoutils.pool import CryptoPool
+
+
+def build(path: str, n: int, candidates: int) -> Session:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    ids = list(range(1, candidates + 1))
+    with engine.begin() as conn:
+        for start in range(0, n, 50_000):
+            docs = [canonical_prefs(rng.sample(ids, 6), "bench", "t") for _ in range(min(50_000, n - start))]
+            conn.execute(
+                insert(Ballot),
+                [{"election_id": "bench", "ciphertext": ct, "nonce": nonce, "receipt": "00" * 32}
+                 for ct, nonce in ballot_key.encrypt_many(docs)],
+            )
+    return Session(engine)
+
+
+def run(db: Session, pool) -> tuple[int, float]:
+    t0 = time.perf_counter()
+    n = sum(len(c.prefs) for c in iter_preferences(db, "bench", pool))
+    return n, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--ballots", type=int, default=500_000)
+    ap.add_argument("--candidates", type=int, default=12)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build(os.path.join(tmp, "bench.db"), args.ballots, args.candidates)
+        pool = CryptoPool(workers=args.workers)
+        try:
+            for label, p in (("inline", None), (f"pool x{args.workers}", pool)):
+                n, dt = run(db, p)
+                print(f"{label:>10}: {n:,} ballots in {dt:.2f}s = {n / dt:,.0f} ballots/s")
+        finally:
+            pool.shutdown()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+bench/tally_stv.py
+Counting-speed benchmark for the fixed-point STV engine (common/tally/stv.py).
+
+Uses the same synthetic ballot generator as bench/tally_irv.py.
+
+    python bench/tally_stv.py --ballots 2000000 --candidates 100 --seats 6
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.tally_irv import synthetic
+from common.tally.stv import count_stv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--ballots", type=int, default=1_000_000)
+    ap.add_argument("--candidates", type=int, default=100)
+    ap.add_argument("--seats", type=int, default=6)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    pm = synthetic(args.ballots, args.candidates)
+    t1 = time.perf_counter()
+    res = count_stv(pm, args.seats)
+    t2 = time.perf_counter()
+    print(f"generated {args.ballots:,} ballots in {t1 - t0:.2f}s")
+    print(f"counted   {len(res.log) - 1} steps in {t2 - t1:.2f}s -> elected {res.elected}")
+
+
+if __name__ == "__main__":
+    main()
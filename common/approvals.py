@@ -0,0 +1,123 @@
+# common/approvals.py
+"""
+Quorum approval of result exports, one transaction per approval.
+
+An approval is a single unit of work that commits once:
+
+    1. look up the admin (or add it, uncommitted);
+    2. UPDATE the action: approvals_count + 1, and status EXPORTING once the
+       count reaches the action's quorum, guarded by `status = 'PENDING'`.
+       The UPDATE takes the action's row lock, so concurrent approvals of one
+       action serialize here and each sees the previous one's count;
+    3. INSERT the Approval row (unique per action and admin);
+    4. on the approval that reached quorum, INSERT the export job;
+    5. COMMIT.
+
+Exactly one approval therefore moves an action out of PENDING and queues its
+export.  A unique-constraint race (the same admin twice, or a new admin
+created concurrently) rolls the whole unit back and it is retried against
+fresh state.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import case, select, update  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.jobs import enqueue
+from common.models.models import AdminUser, Approval, ResultAction
+
+EXPORT_APPROVAL_QUORUM = int(os.getenv("EXPORT_APPROVAL_QUORUM", "2"))
+APPROVAL_MAX_RETRIES = 5
+
+
+class DuplicateApproval(ValueError):
+    """This admin has already approved the action."""
+
+
+@dataclass(frozen=True)
+class ApprovalResult:
+    action_id: int
+    status: str
+    approvals: int
+    quorum: int
+    job_id: int | None = None   # set on the approval that reached quorum
+    applied: bool = True        # False if the action was no longer PENDING
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+def new_export_action(db: Session, requested_by: str, election_id: str, quorum: int | None = None) -> ResultAction:
+    act = ResultAction(
+        type="EXPORT",
+        payload=json.dumps({"by": requested_by, "election_id": election_id}),
+        quorum=max(quorum or 0, EXPORT_APPROVAL_QUORUM),
+    )
+    db.add(act)
+    db.commit()
+    db.refresh(act)
+    return act
+
+
+def _admin_id(db: Session, email: str) -> int:
+    admin_id = db.execute(select(AdminUser.id).where(AdminUser.email == email)).scalar()
+    if admin_id is None:
+        admin = AdminUser(email=email, is_active=True)
+        db.add(admin)
+        db.flush()
+        admin_id = admin.id
+    return admin_id
+
+
+def _approve_once(db: Session, action_id: int, admin_email: str) -> ApprovalResult:
+    admin_id = _admin_id(db, admin_email)
+    if db.execute(
+        select(Approval.id).where(Approval.action_id == action_id, Approval.admin_id == admin_id)
+    ).first():
+        db.rollback()
+        raise DuplicateApproval(f"{admin_email} already approved action {action_id}")
+
+    count = ResultAction.approvals_count + 1
+    row = db.execute(
+        update(ResultAction)
+        .where(ResultAction.id == action_id, ResultAction.type == "EXPORT", ResultAction.status == "PENDING")
+        .values(
+            approvals_count=count,
+            status=case((count >= ResultAction.quorum, "EXPORTING"), else_=ResultAction.status),
+        )
+        .returning(ResultAction.approvals_count, ResultAction.quorum, ResultAction.status)
+    ).first()
+    if row is None:
+        db.rollback()
+        act = db.get(ResultAction, action_id)
+        if act is None or act.type != "EXPORT":
+            raise LookupError(f"action {action_id} not found")
+        return ApprovalResult(act.id, act.status, act.approvals_count, act.quorum, applied=False)
+
+    approvals, quorum, status = row
+    db.add(Approval(action_id=action_id, admin_id=admin_id))
+    db.flush()
+    job_id = None
+    if status == "EXPORTING":
+        # queued with the status change: both commit or neither does
+        job_id = enqueue(db, "export", {"action_id": action_id}, dedupe_key=f"export:{action_id}").id
+    db.commit()
+    return ApprovalResult(action_id, status, approvals, quorum, job_id)
+
+
+def approve_export(db: Session, action_id: int, admin_email: str) -> ApprovalResult:
+    """
+    Record one admin's approval of an EXPORT action.  Raises LookupError
+    for an unknown action and DuplicateApproval for a repeat approval.
+    """
+    for _ in range(APPROVAL_MAX_RETRIES):
+        try:
+            return _approve_once(db, action_id, admin_email)
+        except IntegrityError:
+            db.rollback()  # lost a unique-constraint race: retry on fresh state
+    raise RuntimeError(f"approval of action {action_id} kept conflicting")
@@ -0,0 +1,219 @@
+# common/chain/appender.py
+"""
+Race-free appends to the per-election ballot hash chains.
+
+Each election has its own chain and its own `chain_head` row, so concurrent
+elections never contend on the same head.  Every process keeps the last
+committed head (hash, height, version) per election in memory and advances the
+row with a compare-and-swap on `version` in the same transaction that inserts
+the BallotChain links.  If another replica moved the head first, the CAS
+matches no row, the transaction is rolled back and retried against a freshly
+loaded head.  Deadlocks, serialization failures and a locked SQLite database
+are transient in the same way and are retried too; writers touching several
+elections lock their heads in sorted order so they rarely deadlock at all.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Callable, Sequence, TypeVar
+
+from sqlalchemy import update  # type: ignore
+from sqlalchemy.exc import IntegrityError, OperationalError  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.models.models import BallotChain, ChainHead
+from cryptoutils.ballots import hash_chain
+from .merkle import MerkleIndex, merkle_index
+
+CHAIN_MAX_RETRIES = int(os.getenv("CHAIN_MAX_RETRIES", "20"))
+GENESIS = bytes(32)
+
+T = TypeVar("T")
+Head = tuple[bytes, int, int]  # (hash, height, version)
+
+# serialization_failure, deadlock_detected
+RETRY_SQLSTATES = {"40001", "40P01"}
+
+
+class ChainConflict(Exception):
+    """Another writer advanced the chain head since we last read it."""
+
+    def __init__(self, election_id: str | None, reason: str):
+        super().__init__(f"chain_head[{election_id}]: {reason}")
+        self.election_id = election_id
+
+
+def is_transient(exc: OperationalError) -> bool:
+    """True for errors that a retry of the whole transaction can clear."""
+    orig = exc.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code in RETRY_SQLSTATES or "database is locked" in str(orig)
+
+
+class ChainAppender:
+    """
+    Serializes chain appends per election across processes via CAS on `chain_head`.
+
+    Usage:
+        result = appender.run(SessionLocal, lambda db: ... appender.append(db, eid, items) ...)
+    """
+
+    def __init__(self, max_retries: int = CHAIN_MAX_RETRIES, merkle: MerkleIndex = merkle_index):
+        self._max_retries = max_retries
+        self._merkle = merkle
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self._heads: dict[str, Head] = {}
+        self._started = time.monotonic()
+        self.appends = 0     # links committed
+        self.commits = 0     # successful CAS transactions
+        self.conflicts = 0   # CAS failures (retried)
+
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(election_id)` after every commit that extended that chain."""
+        self._listeners.append(listener)
+
+    # ---- head bookkeeping ----
+    def _load(self, db: Session, election_id: str) -> Head:
+        row = db.get(ChainHead, election_id, populate_existing=True)
+        if row is None:
+            # First append for this election: bootstrap from any existing links.
+            last = (
+                db.query(BallotChain)
+                .filter(BallotChain.election_id == election_id)
+                .order_by(BallotChain.seq.desc())
+                .first()
+            )
+            row = ChainHead(
+                election_id=election_id,
+                head_hash=last.curr_hash if last else GENESIS,
+                height=last.seq if last else 0,
+                version=0,
+            )
+            db.add(row)
+            try:
+                db.flush()
+            except IntegrityError:
+                raise ChainConflict(election_id, "bootstrapped concurrently")
+        return row.head_hash, row.height, row.version
+
+    def head(self, db: Session, election_id: str) -> bytes:
+        """Current head hash (in-memory if known, else loaded from the DB)."""
+        with self._lock:
+            cached = self._heads.get(election_id)
+        return (cached or self._load(db, election_id))[0]
+
+    # ---- append ----
+    def append(
+        self,
+        db: Session,
+        election_id: str,
+        items: Sequence[tuple[int, bytes, bytes]],
+        receipts: Sequence[bytes] | None = None,
+    ) -> list[bytes]:
+        """
+        Stage links for `items` = [(ballot_id, ct, nonce), ...] on the chain of
+        `election_id` in db's transaction and CAS-advance its chain_head.
+        If `receipts` (raw receipt bytes, one per item) are given, the
+        election's Merkle tree is extended in the same transaction.
+        Returns each link's curr_hash.
+        Must be called inside `run()`, which commits and retries on conflict.
+        """
+        pending: dict[str, Head] = db.info.setdefault("chain_pending_heads", {})
+        with self._lock:
+            cached = self._heads.get(election_id)
+        prev, height, version = (
+            pending.get(election_id) or cached or self._load(db, election_id)
+        )
+
+        links: list[bytes] = []
+        for ballot_id, ct, nonce in items:
+            curr = hash_chain(prev, ct, nonce)
+            db.add(
+                BallotChain(
+                    ballot_id=ballot_id,
+                    election_id=election_id,
+                    seq=height + len(links) + 1,
+                    prev_hash=prev,
+                    curr_hash=curr,
+                )
+            )
+            links.append(curr)
+            prev = curr
+
+        res = db.execute(
+            update(ChainHead)
+            .where(ChainHead.election_id == election_id, ChainHead.version == version)
+            .values(head_hash=prev, height=height + len(links), version=version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount != 1:
+            raise ChainConflict(election_id, f"moved past version {version}")
+        if receipts is not None:
+            self._merkle.append(db, election_id, height, receipts)
+
+        pending[election_id] = (prev, height + len(links), version + 1)
+        db.info["chain_pending_links"] = db.info.get("chain_pending_links", 0) + len(links)
+        return links
+
+    def run(self, session_factory: Callable[[], Session], work: Callable[[Session], T]) -> T:
+        """
+        Execute `work(db)` in a fresh transaction and commit it.
+        On ChainConflict, or a transient deadlock / serialization failure, the
+        transaction is rolled back, stale heads reloaded, and `work` re-run (so
+        it must not have side effects outside the DB).
+        """
+        for attempt in range(self._max_retries + 1):
+            db = session_factory()
+            try:
+                result = work(db)
+                pending = db.info.pop("chain_pending_heads", {})
+                n_links = db.info.pop("chain_pending_links", 0)
+                db.commit()
+            except Exception as e:
+                db.info.pop("chain_pending_heads", None)
+                db.info.pop("chain_pending_links", None)
+                db.rollback()
+                if not (isinstance(e, ChainConflict) or isinstance(e, OperationalError) and is_transient(e)):
+                    raise
+                with self._lock:
+                    if isinstance(e, ChainConflict):
+                        self._heads.pop(e.election_id, None)
+                    self.conflicts += 1
+                # cheap jittered backoff; grows slowly with contention
+                time.sleep(random.uniform(0, 0.001 * (attempt + 1)))
+                continue
+            finally:
+                db.close()
+
+            if pending:
+                with self._lock:
+                    self._heads.update(pending)
+                    self.commits += 1
+                    self.appends += n_links
+                for election_id in pending:
+                    for listener in self._listeners:
+                        listener(election_id)
+            return result
+        raise ChainConflict(None, f"gave up after {self._max_retries} retries")
+
+    # ---- metrics ----
+    def stats(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            attempts = self.commits + self.conflicts
+            return {
+                "appends": self.appends,
+                "commits": self.commits,
+                "conflicts": self.conflicts,
+                "appends_per_sec": round(self.appends / elapsed, 2),
+                "conflict_rate": round(self.conflicts / attempts, 4) if attempts else 0.0,
+                "heights": {e: h[1] for e, h in self._heads.items()},
+            }
+
+
+# process-wide appender shared by all writers in this service
+chain_appender = ChainAppender()
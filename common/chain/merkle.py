@@ -0,0 +1,242 @@
+# common/chain/merkle.py
+"""
+Incremental Merkle tree over each election's ballot receipts.
+
+    leaf(i)        = SHA-256(0x00 || receipt_i)
+    node(l, i)     = SHA-256(0x01 || node(l-1, 2i) || node(l-1, 2i+1))
+                   = node(l-1, 2i)            if 2i+1 has no node (promotion)
+
+Leaves are in chain order (idx = seq - 1).  Appending k leaves rewrites only
+the right edge of the tree, i.e. O(k + log n) node rows, and an inclusion
+proof needs one sibling per level: O(log n) rows in a single query.  Updates
+run inside the chain-append transaction, so the tree is serialized by the
+same chain_head CAS and always matches the committed chain height.
+
+A chain that predates the index (or was extended without it) is not indexed
+on the append path: appends skip the tree until the `merkle_backfill` job
+has caught it up.  The job adds MERKLE_BACKFILL_CHUNK leaves per
+transaction, and its final step CAS-bumps chain_head so that no append can
+commit between it and the index it completes.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Sequence
+
+from sqlalchemy import and_, func, insert, or_, select, update  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.jobs import JobContext, handler
+from common.models.models import Ballot, BallotChain, ChainHead, MerkleNode
+
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+MERKLE_BACKFILL_CHUNK = int(os.getenv("MERKLE_BACKFILL_CHUNK", "50000"))
+
+
+def leaf_hash(receipt: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + receipt).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def width(n: int, level: int) -> int:
+    """Number of nodes on `level` of a tree with n leaves."""
+    return (n + (1 << level) - 1) >> level
+
+
+def depth(n: int) -> int:
+    """Level of the root for n >= 1 leaves."""
+    return (n - 1).bit_length()
+
+
+def stored(n: int, level: int) -> int:
+    """Rows present on `level` of a tree with n leaves (nothing above the root)."""
+    return width(n, level) if n and level <= depth(n) else 0
+
+
+def verify_proof(receipt: bytes, index: int, size: int, path: Sequence[dict], root: bytes) -> bool:
+    """
+    Recompute the root from a proof produced by MerkleIndex.proof().
+    The side of each sibling follows from `index` and `size`; the path's own
+    "side" flags are informational and ignored.
+    """
+    if not 0 <= index < size:
+        return False
+    levels = [l for l in range(depth(size)) if (index >> l) ^ 1 < width(size, l)]
+    if len(path) != len(levels):
+        return False
+    h = leaf_hash(receipt)
+    for level, step in zip(levels, path):
+        sib = bytes.fromhex(step["hash"])
+        h = node_hash(sib, h) if (index >> level) & 1 else node_hash(h, sib)
+    return h == root
+
+
+class MerkleIndex:
+    # ---- writes ----
+    def _get(self, db: Session, election_id: str, level: int, idx: int) -> bytes:
+        h = db.execute(
+            select(MerkleNode.hash).where(
+                MerkleNode.election_id == election_id,
+                MerkleNode.level == level,
+                MerkleNode.idx == idx,
+            )
+        ).scalar_one_or_none()
+        if h is None:
+            raise LookupError(f"merkle node ({election_id}, {level}, {idx}) missing")
+        return h
+
+    def built(self, db: Session, election_id: str) -> int:
+        """Number of leaves indexed so far (leaves are always added in order)."""
+        return db.execute(
+            select(func.coalesce(func.max(MerkleNode.idx) + 1, 0)).where(
+                MerkleNode.election_id == election_id, MerkleNode.level == 0
+            )
+        ).scalar()
+
+    def append(self, db: Session, election_id: str, start: int, receipts: Sequence[bytes]) -> bool:
+        """
+        Add leaves start..start+len(receipts)-1 and refresh their ancestors.
+        `start` is the chain height before this append.  Returns False (and
+        writes nothing) if the tree does not reach `start` yet: the chain is
+        waiting for the merkle_backfill job.
+        """
+        if not receipts:
+            return True
+        if start and db.get(MerkleNode, (election_id, 0, start - 1)) is None:
+            return False
+        n_old, n_new = start, start + len(receipts)
+        nodes = {start + i: leaf_hash(r) for i, r in enumerate(receipts)}
+        self._store(db, election_id, 0, nodes, stored(n_old, 0))
+
+        lo, hi, level = start, n_new - 1, 0
+        while width(n_new, level) > 1:
+            plo, phi = lo >> 1, hi >> 1
+            if 2 * plo < lo:
+                nodes[2 * plo] = self._get(db, election_id, level, 2 * plo)
+            parents = {}
+            for p in range(plo, phi + 1):
+                right = nodes.get(2 * p + 1)
+                parents[p] = node_hash(nodes[2 * p], right) if right is not None else nodes[2 * p]
+            level += 1
+            self._store(db, election_id, level, parents, stored(n_old, level))
+            nodes, lo, hi = parents, plo, phi
+        return True
+
+    def _store(self, db: Session, election_id: str, level: int, nodes: dict[int, bytes], existing: int) -> None:
+        """Insert new nodes; only indices below `existing` are already present."""
+        fresh = [
+            {"election_id": election_id, "level": level, "idx": i, "hash": h}
+            for i, h in nodes.items()
+            if i >= existing
+        ]
+        for i, h in nodes.items():
+            if i < existing:
+                db.execute(
+                    update(MerkleNode)
+                    .where(
+                        MerkleNode.election_id == election_id,
+                        MerkleNode.level == level,
+                        MerkleNode.idx == i,
+                    )
+                    .values(hash=h)
+                    .execution_options(synchronize_session=False)
+                )
+        if fresh:
+            db.execute(insert(MerkleNode), fresh)
+
+    def backfill_step(self, db: Session, election_id: str, chunk: int | None = None) -> tuple[int, int]:
+        """
+        Index up to `chunk` (MERKLE_BACKFILL_CHUNK) more committed leaves and
+        commit.  Returns (leaves indexed, chain height); done when they are equal.
+        """
+        chunk = chunk or MERKLE_BACKFILL_CHUNK
+        while True:
+            head = db.get(ChainHead, election_id, populate_existing=True)
+            if head is None:
+                return 0, 0
+            start = self.built(db, election_id)
+            upto = min(head.height, start + chunk)
+            if upto < head.height:
+                break
+            # last step: hold the head (CAS on its version) so no append commits
+            # unindexed links meanwhile; appenders on the old version retry and index theirs
+            if db.execute(
+                update(ChainHead)
+                .where(ChainHead.election_id == election_id, ChainHead.version == head.version)
+                .values(version=head.version + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount:
+                break
+            db.rollback()  # an append committed since we read the head
+        receipts = db.execute(
+            select(Ballot.receipt)
+            .join(BallotChain, BallotChain.ballot_id == Ballot.id)
+            .where(BallotChain.election_id == election_id, BallotChain.seq > start, BallotChain.seq <= upto)
+            .order_by(BallotChain.seq)
+        ).scalars().all()
+        if len(receipts) != upto - start:
+            raise LookupError(f"chain of {election_id} has {len(receipts)} receipts in ({start}, {upto}]")
+        self.append(db, election_id, start, [bytes.fromhex(r) for r in receipts])
+        db.commit()
+        return upto, head.height
+
+    # ---- reads ----
+    def _require(self, db: Session, election_id: str, size: int) -> None:
+        # a part-built index (backfill in progress) holds nodes of a smaller tree
+        built = self.built(db, election_id)
+        if built < size:
+            raise LookupError(f"merkle index of {election_id} covers {built} of {size} leaves")
+
+    def root(self, db: Session, election_id: str, size: int) -> bytes:
+        """Root of the tree of `size` leaves; LookupError if not indexed that far."""
+        if size == 0:
+            return EMPTY_ROOT
+        self._require(db, election_id, size)
+        return self._get(db, election_id, depth(size), 0)
+
+    def proof(self, db: Session, election_id: str, index: int, size: int) -> tuple[list[dict], bytes]:
+        """
+        Sibling path for leaf `index` in the tree of `size` leaves, plus its root.
+        Every node is fetched with one query; side "L" means the sibling is
+        hashed on the left.  LookupError unless the index covers `size` leaves.
+        """
+        self._require(db, election_id, size)
+        top = depth(size)
+        wanted: list[tuple[int, int]] = []
+        for level in range(top):
+            sib = (index >> level) ^ 1
+            if sib < width(size, level):
+                wanted.append((level, sib))
+        keys = wanted + [(top, 0)]
+        rows = db.execute(
+            select(MerkleNode.level, MerkleNode.idx, MerkleNode.hash).where(
+                MerkleNode.election_id == election_id,
+                or_(*(and_(MerkleNode.level == l, MerkleNode.idx == i) for l, i in keys)),
+            )
+        ).all()
+        found = {(l, i): h for l, i, h in rows}
+        if len(found) != len(keys):
+            raise LookupError(f"merkle index of {election_id} is incomplete")
+        path = [
+            {"level": l, "side": "L" if i < (index >> l) else "R", "hash": found[(l, i)].hex()}
+            for l, i in wanted
+        ]
+        return path, found[(top, 0)]
+
+
+merkle_index = MerkleIndex()
+
+
+@handler("merkle_backfill")
+def merkle_backfill_job(ctx: JobContext, election_id: str) -> dict:
+    """Build the Merkle index of a chain that predates it, a chunk per transaction."""
+    with ctx.session_factory() as db:
+        while True:
+            built, height = merkle_index.backfill_step(db, election_id)
+            ctx.progress(built, height)
+            if built == height:
+                return {"election_id": election_id, "leaves": built}
@@ -0,0 +1,135 @@
+# common/chain/tip.py
+"""
+Process-local cache of per-election chain tips for the polled tip endpoints.
+
+Each election's tip is read from the database at most once per
+CHAIN_TIP_TTL_S (one loader per election at a time; concurrent pollers share
+the result), and immediately after this process appends to that chain.
+Responses carry an ETag derived from the tip hash; `If-None-Match` gets a 304,
+and `wait=N` turns that into a long-poll that returns as soon as the tip moves.
+At most CHAIN_TIP_CACHE_SIZE elections are kept (least recently used first
+out), so polling made-up election ids cannot grow the cache without bound.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response  # type: ignore
+from fastapi.responses import JSONResponse  # type: ignore
+from sqlalchemy import select  # type: ignore
+
+from common.chain.appender import chain_appender
+from common.db import AsyncSessionLocal
+from common.models.models import BallotChain
+
+CHAIN_TIP_TTL_S = float(os.getenv("CHAIN_TIP_TTL_S", "1.0"))
+CHAIN_TIP_POLL_S = float(os.getenv("CHAIN_TIP_POLL_S", "0.1"))
+CHAIN_TIP_MAX_WAIT_S = float(os.getenv("CHAIN_TIP_MAX_WAIT_S", "30"))
+CHAIN_TIP_CACHE_SIZE = int(os.getenv("CHAIN_TIP_CACHE_SIZE", "10000"))
+
+Loader = Callable[[str], Awaitable[dict]]
+
+
+async def load_tip(election_id: str) -> dict:
+    async with AsyncSessionLocal() as db:
+        tip = (
+            await db.execute(
+                select(BallotChain)
+                .where(BallotChain.election_id == election_id)
+                .order_by(BallotChain.seq.desc())
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+    if not tip:
+        return {"election_id": election_id, "height": 0, "tip_hash": "00" * 32, "ballot_id": None}
+    return {
+        "election_id": election_id,
+        "height": tip.seq,
+        "tip_hash": tip.curr_hash.hex() if isinstance(tip.curr_hash, (bytes, bytearray)) else None,
+        "ballot_id": tip.ballot_id,
+    }
+
+
+def etag_for(tip: dict) -> str:
+    return f'"{tip["tip_hash"]}"'
+
+
+class TipCache:
+    def __init__(self, loader: Loader = load_tip, ttl: float = CHAIN_TIP_TTL_S, max_entries: int = CHAIN_TIP_CACHE_SIZE):
+        self._loader = loader
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # election -> (expires, tip), LRU order
+        self._locks: dict[str, asyncio.Lock] = {}  # only while a load is pending
+        self.hits = 0
+        self.loads = 0
+
+    def invalidate(self, election_id: str) -> None:
+        """Drop a cached tip (safe to call from any thread, e.g. the chain appender)."""
+        self._entries.pop(election_id, None)
+
+    def _fresh(self, election_id: str) -> dict | None:
+        entry = self._entries.get(election_id)
+        if entry and entry[0] > time.monotonic():
+            try:
+                self._entries.move_to_end(election_id)
+            except KeyError:  # invalidated meanwhile
+                pass
+            return entry[1]
+        return None
+
+    def _remember(self, election_id: str, tip: dict) -> None:
+        self._entries[election_id] = (time.monotonic() + self._ttl, tip)
+        self._entries.move_to_end(election_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, election_id: str) -> dict:
+        tip = self._fresh(election_id)
+        if tip is not None:
+            self.hits += 1
+            return tip
+        lock = self._locks.setdefault(election_id, asyncio.Lock())
+        try:
+            async with lock:
+                tip = self._fresh(election_id)  # another poller may have just loaded it
+                if tip is None:
+                    tip = await self._loader(election_id)
+                    self.loads += 1
+                    self._remember(election_id, tip)
+        finally:
+            if not lock.locked() and self._locks.get(election_id) is lock:
+                del self._locks[election_id]
+        return tip
+
+    async def wait_for_change(self, election_id: str, etag: str, timeout: float) -> dict:
+        """Return the tip once its ETag differs from `etag`, or the current tip at timeout."""
+        deadline = time.monotonic() + min(timeout, CHAIN_TIP_MAX_WAIT_S)
+        tip = await self.get(election_id)
+        while etag_for(tip) == etag and time.monotonic() < deadline:
+            await asyncio.sleep(min(CHAIN_TIP_POLL_S, max(deadline - time.monotonic(), 0)))
+            tip = await self.get(election_id)
+        return tip
+
+    async def respond(self, request: Request, election_id: str, wait: float = 0) -> Response:
+        """Tip as JSON with ETag; 304 if the client's If-None-Match is still current."""
+        inm = request.headers.get("if-none-match")
+        if inm and wait > 0:
+            tip = await self.wait_for_change(election_id, inm, wait)
+        else:
+            tip = await self.get(election_id)
+        etag = etag_for(tip)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if inm == etag:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(tip, headers=headers)
+
+
+# process-wide cache shared by the tip endpoints in this service;
+# appends made by this process invalidate it immediately
+tip_cache = TipCache()
+chain_appender.subscribe(tip_cache.invalidate)
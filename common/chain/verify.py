@@ -0,0 +1,267 @@
+# common/chain/verify.py
+"""
+Incremental verification of a per-election ballot chain.
+
+A verified prefix is remembered in `chain_verify_checkpoints` (last seq, id,
+curr_hash).  Each call re-reads the checkpointed link to make sure it was not
+rewritten, then streams only the links after it, so cost tracks new ballots
+instead of total ballots and memory stays constant.
+`full=True` ignores the checkpoint and re-verifies from genesis.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Iterator
+
+from sqlalchemy import func, select  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.db import SessionLocal, worker_dsn, worker_engine
+from common.models.models import Ballot, BallotChain, ChainVerifyCheckpoint
+from cryptoutils.ballots import hash_chain
+from cryptoutils.pool import CryptoPool, crypto_pool
+
+VERIFY_YIELD_PER = int(os.getenv("CHAIN_VERIFY_YIELD_PER", "10000"))
+VERIFY_PROGRESS_EVERY = int(os.getenv("CHAIN_VERIFY_PROGRESS_EVERY", "100000"))
+DEEP_RANGE_SIZE = int(os.getenv("CHAIN_DEEP_RANGE_SIZE", "50000"))
+GENESIS = bytes(32)
+MAX_BREAKS = 100
+
+
+def _break(link_id: int, seq: int, reason: str, **extra) -> dict:
+    return {"type": "break", "at_id": link_id, "seq": seq, "reason": reason, **extra}
+
+
+def iter_verify(
+    db: Session,
+    election_id: str,
+    full: bool = False,
+    yield_per: int = VERIFY_YIELD_PER,
+    progress_every: int = VERIFY_PROGRESS_EVERY,
+) -> Iterator[dict]:
+    """
+    Stream verification events for `election_id`'s chain after its checkpoint
+    (or from genesis): {"type": "break", ...} per problem, {"type": "progress"}
+    every `progress_every` links, and one final {"type": "summary"}.
+    Checks per link: 32-byte hashes, seq without gaps, prev_hash == previous
+    curr_hash (zero32 at genesis) and non-decreasing created_at.
+
+    Links are read as plain (id, seq, prev_hash, curr_hash, created_at) tuples
+    through a server-side cursor (`yield_per`), and only the previous link is
+    kept, so memory is constant in chain length.  The checkpoint is advanced
+    when everything checked is intact; a broken full run drops it.
+    """
+    cp = None if full else db.get(ChainVerifyCheckpoint, election_id)
+    seq, last_id, prev, last_ts = 0, None, GENESIS, None
+
+    if cp is not None:
+        anchor = db.execute(
+            select(BallotChain.id, BallotChain.curr_hash).where(
+                BallotChain.election_id == election_id, BallotChain.seq == cp.last_seq
+            )
+        ).first()
+        if anchor is None or tuple(anchor) != (cp.last_id, cp.last_hash):
+            # the verified prefix changed underneath us: only a full run can say where
+            yield from iter_verify(db, election_id, True, yield_per, progress_every)
+            return
+        seq, last_id, prev, last_ts = cp.last_seq, cp.last_id, cp.last_hash, cp.last_created_at
+
+    from_seq = seq + 1
+    checked = breaks = 0
+    rows = db.execute(
+        select(
+            BallotChain.id, BallotChain.seq, BallotChain.prev_hash,
+            BallotChain.curr_hash, BallotChain.created_at,
+        )
+        .where(BallotChain.election_id == election_id, BallotChain.seq > seq)
+        .order_by(BallotChain.seq.asc())
+        .execution_options(yield_per=yield_per)
+    )
+    for link_id, link_seq, prev_hash, curr_hash, created_at in rows:
+        checked += 1
+        found: list[dict] = []
+        if len(prev_hash or b"") != 32 or len(curr_hash or b"") != 32:
+            found.append(_break(link_id, link_seq, "hash missing or wrong length"))
+        if link_seq != seq + 1:
+            found.append(_break(link_id, link_seq, f"seq gap (expected {seq + 1})"))
+        if prev_hash != prev:
+            found.append(
+                _break(
+                    link_id,
+                    link_seq,
+                    "genesis prev_hash is not zero32" if seq == 0 else "prev_hash does not match prior curr_hash",
+                    expected_prev=prev.hex(),
+                    actual_prev=prev_hash.hex() if prev_hash else None,
+                )
+            )
+        if created_at is None:
+            found.append(_break(link_id, link_seq, "created_at is NULL"))
+        elif last_ts is not None and created_at < last_ts:
+            found.append(_break(link_id, link_seq, "created_at older than previous record"))
+        breaks += len(found)
+        yield from found
+
+        seq, last_id, prev = link_seq, link_id, curr_hash
+        last_ts = created_at or last_ts
+        if progress_every and checked % progress_every == 0:
+            yield {"type": "progress", "checked": checked, "seq": seq}
+    rows.close()
+
+    ok = breaks == 0
+    if ok and last_id is not None:
+        _save_checkpoint(db, election_id, seq, last_id, prev, last_ts)
+    elif not ok and full:
+        db.query(ChainVerifyCheckpoint).filter_by(election_id=election_id).delete()
+        db.commit()
+
+    yield {
+        "type": "summary",
+        "ok": ok,
+        "election_id": election_id,
+        "height": seq,
+        "tip_hash": prev.hex() if last_id is not None else None,
+        "from_seq": from_seq,
+        "checked": checked,
+        "full": cp is None,
+        "breaks": breaks,
+    }
+
+
+def verify_chain(db: Session, election_id: str, full: bool = False, **kw) -> dict:
+    """
+    Run iter_verify() to completion and return its summary, with the first
+    MAX_BREAKS breaks attached (`breaks_total` has the real count).
+    """
+    breaks: list[dict] = []
+    summary: dict = {}
+    for event in iter_verify(db, election_id, full, **kw):
+        kind = event.pop("type")
+        if kind == "break":
+            if len(breaks) < MAX_BREAKS:
+                breaks.append(event)
+        elif kind == "summary":
+            summary = event
+    summary["breaks_total"] = summary["breaks"]
+    summary["breaks"] = breaks
+    return summary
+
+
+def iter_verify_ndjson(election_id: str, full: bool = False) -> Iterator[str]:
+    """
+    iter_verify() as NDJSON lines for StreamingResponse.  Opens its own session,
+    because request-scoped sessions are closed before a streamed body is sent.
+    """
+    with SessionLocal() as db:
+        for event in iter_verify(db, election_id, full=full):
+            yield json.dumps(event, separators=(",", ":")) + "\n"
+
+
+def _save_checkpoint(db: Session, election_id: str, seq: int, last_id: int, last_hash: bytes, last_ts) -> None:
+    row = db.get(ChainVerifyCheckpoint, election_id)
+    now = datetime.now(timezone.utc)
+    if row is None:
+        db.add(
+            ChainVerifyCheckpoint(
+                election_id=election_id, last_seq=seq, last_id=last_id,
+                last_hash=last_hash, last_created_at=last_ts, verified_at=now,
+            )
+        )
+    elif row.last_seq <= seq:
+        row.last_seq, row.last_id, row.last_hash = seq, last_id, last_hash
+        row.last_created_at, row.verified_at = last_ts, now
+    try:
+        db.commit()
+    except IntegrityError:
+        # a concurrent verifier stored the same prefix first
+        db.rollback()
+
+
+# ---------- deep verification (recomputes every curr_hash) ----------
+def _deep_check_range(dsn: str, election_id: str, lo: int, hi: int, yield_per: int) -> dict:
+    """
+    Worker: re-hash links lo..hi (by seq) from their stored prev_hash and the
+    ballot's (ciphertext, nonce).  Ranges are independent; the caller stitches
+    them by comparing each range's first prev_hash with the previous last curr_hash.
+    """
+    breaks: list[dict] = []
+    first_prev = last_curr = None
+    expected = lo
+    with Session(worker_engine(dsn)) as db:
+        rows = db.execute(
+            select(
+                BallotChain.id, BallotChain.seq, BallotChain.prev_hash,
+                BallotChain.curr_hash, Ballot.ciphertext, Ballot.nonce,
+            )
+            .outerjoin(Ballot, Ballot.id == BallotChain.ballot_id)
+            .where(BallotChain.election_id == election_id, BallotChain.seq.between(lo, hi))
+            .order_by(BallotChain.seq.asc())
+            .execution_options(yield_per=yield_per)
+        )
+        for link_id, seq, prev_hash, curr_hash, ct, nonce in rows:
+            if first_prev is None:
+                first_prev = prev_hash
+            if seq != expected:
+                breaks.append({"at_id": link_id, "seq": seq, "reason": f"seq gap (expected {expected})"})
+            elif last_curr is not None and prev_hash != last_curr:
+                breaks.append({"at_id": link_id, "seq": seq, "reason": "prev_hash does not match prior curr_hash"})
+            if ct is None:
+                breaks.append({"at_id": link_id, "seq": seq, "reason": "ballot row missing"})
+            elif hash_chain(prev_hash, ct, nonce) != curr_hash:
+                breaks.append({"at_id": link_id, "seq": seq, "reason": "curr_hash != H(prev || ciphertext || nonce)"})
+            last_curr, expected = curr_hash, seq + 1
+    if expected != hi + 1:
+        breaks.append({"at_id": None, "seq": expected, "reason": f"links {expected}..{hi} missing"})
+    return {"lo": lo, "hi": hi, "first_prev": first_prev, "last_curr": last_curr, "breaks": breaks}
+
+
+def deep_verify(
+    db: Session,
+    election_id: str,
+    pool: CryptoPool = crypto_pool,
+    range_size: int = DEEP_RANGE_SIZE,
+    yield_per: int = VERIFY_YIELD_PER,
+) -> dict:
+    """
+    Recompute every link of a chain, curr = H(prev || ct || nonce) (the voting
+    and registration services write the same link format), fanning seq
+    ranges out to worker processes that each read and hash their own slice,
+    then stitch the ranges.  Scales with CRYPTO_POOL_WORKERS.  Workers get a
+    DSN name, never the database password (see common.db.worker_dsn).
+    """
+    height = db.execute(
+        select(func.max(BallotChain.seq)).where(BallotChain.election_id == election_id)
+    ).scalar() or 0
+    dsn = worker_dsn(db)
+    futures = [
+        pool.submit(_deep_check_range, dsn, election_id, lo, min(lo + range_size - 1, height), yield_per)
+        for lo in range(1, height + 1, range_size)
+    ]
+
+    breaks: list[dict] = []
+    prev_last = GENESIS
+    for fut in futures:
+        r = fut.result()
+        if r["first_prev"] is not None and r["first_prev"] != prev_last:
+            breaks.append({
+                "at_id": None,
+                "seq": r["lo"],
+                "reason": "genesis prev_hash is not zero32" if r["lo"] == 1 else "range boundary does not link",
+            })
+        breaks.extend(r["breaks"])
+        prev_last = r["last_curr"] if r["last_curr"] is not None else prev_last
+    breaks.sort(key=lambda b: b["seq"])
+
+    return {
+        "ok": not breaks,
+        "election_id": election_id,
+        "height": height,
+        "tip_hash": prev_last.hex() if height else None,
+        "deep": True,
+        "ranges": len(futures),
+        "workers": pool.workers,
+        "breaks_total": len(breaks),
+        "breaks": breaks[:MAX_BREAKS],
+    }
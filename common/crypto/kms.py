@@ -1,6 +1,7 @@
 # cryptoutils/kms.py
 from __future__ import annotations
 import os, secrets, hashlib
+from functools import lru_cache
 from typing import Tuple
 from Crypto.Cipher import AES
 
@@ -37,5 +38,10 @@ class LocalKMS:
         cipher.update(self.key_id)
         return cipher.decrypt_and_verify(ct, tag)
 
+@lru_cache(maxsize=1)
+def default_kms() -> LocalKMS:
+    """Process-wide LocalKMS built from the environment (call default_kms.cache_clear() to rotate)."""
+    return LocalKMS()
+
 def aad_hash(aad: bytes) -> bytes:
     return hashlib.sha256(aad).digest()
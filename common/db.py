@@ -1,5 +1,12 @@
-from sqlalchemy import create_engine  # type: ignore
+from sqlalchemy import create_engine, make_url  # type: ignore
 from sqlalchemy.orm import sessionmaker, DeclarativeBase  # type: ignore
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore
+from sqlalchemy.ext.asyncio import (  # type: ignore
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from dotenv import load_dotenv  # type: ignore
 import os
 
@@ -37,3 +44,90 @@ def get_session():
 
 # ✅ Alias for dependency injection
 get_db = get_session
+
+
+_WORKER_ENGINES: dict = {}
+
+
+def worker_dsn(db) -> str:
+    """
+    How pool workers reach the database behind `db` (a Session) without its
+    password crossing the process boundary: "default" for DATABASE_URL, which
+    workers read from their own environment, else the URL itself when it has
+    no password (e.g. a SQLite file).
+    """
+    url = db.get_bind().url
+    if url == make_url(DATABASE_URL):
+        return "default"
+    if url.password is None:
+        return url.render_as_string(hide_password=False)
+    raise ValueError("pool workers can only open DATABASE_URL or a database URL without a password")
+
+
+def worker_engine(dsn: str = "default"):
+    """Engine for pool worker processes: one per DSN (see worker_dsn) per process."""
+    engine = _WORKER_ENGINES.get(dsn)
+    if engine is None:
+        engine = _WORKER_ENGINES[dsn] = create_engine(DATABASE_URL if dsn == "default" else dsn, pool_pre_ping=True)
+    return engine
+
+
+# ---------------------------------------------------------------------
+# Async engine (aiosqlite / asyncpg) for non-blocking request handlers
+# ---------------------------------------------------------------------
+def _async_url(url: str) -> str:
+    """Map the sync driver in DATABASE_URL onto its asyncio counterpart."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "40"))
+
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Create the async engine on first use (the driver is only imported then)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        pool_kwargs = {}
+        if ":memory:" not in ASYNC_DATABASE_URL:
+            # one event loop multiplexes many requests, so size the pool for
+            # concurrency rather than for threadpool width
+            pool_kwargs = {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": ASYNC_POOL_SIZE,
+                "max_overflow": ASYNC_MAX_OVERFLOW,
+            }
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, pool_pre_ping=True, **pool_kwargs
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Async counterpart of SessionLocal()."""
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose_async_engine() -> None:
+    """Close pooled async connections (call from app shutdown)."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+async def get_async_session():
+    """Yield an async database session for FastAPI dependencies."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,302 @@
+# common/export.py
+"""
+Streaming export of an election's encrypted ballots for the counting centre.
+
+File layout (big-endian):
+    header  = MAGIC(8) | version(u8)
+    record  = length(u32) | ballot_id(u64)
+              | nonce_len(u8) | nonce | ct_len(u32) | ciphertext
+              | receipt(32) | chain_hash(32, zero if the ballot has no link)
+
+Records are grouped into chunks of about EXPORT_CHUNK_BYTES (a record never
+spans two chunks).  The manifest lists each chunk's offset, length, record
+count, id range and SHA-256, plus the whole-file SHA-256 and the chain tip at
+export time.  It is signed with the results Ed25519 key, using the same
+canonical JSON as /results/sign.  A receiver checks one signature against
+the results public key it already trusts (never the key the manifest carries),
+then hashes chunks independently and in parallel (verify_export).
+
+Rows come from a server-side cursor and go straight to a buffered file, so
+memory stays constant and throughput is bound by disk and database I/O.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Iterator
+
+from sqlalchemy import select  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.crypto.signing import get_public_key_b64, sign_detached_b64, verify_detached_b64
+from common.db import SessionLocal
+from common.jobs import JobContext, JobLost, handler
+from common.models.models import AdminUser, Approval, Ballot, BallotChain, ChainHead, ResultAction
+from cryptoutils.pool import CryptoPool, crypto_pool
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(8 << 20)))
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "10000"))
+
+MAGIC = b"EVBEXP\x00\x01"
+VERSION = 1
+FORMAT = "evballots/1"
+_HEADER = struct.Struct(">8sB")
+_LEN = struct.Struct(">I")
+_ID = struct.Struct(">QB")
+_CT_LEN = struct.Struct(">I")
+NO_LINK = bytes(32)
+SIGNATURE_FIELDS = ("signature", "public_key", "algorithm")
+
+
+class ExportFormatError(ValueError):
+    """The export file does not match the format or its manifest."""
+
+
+def manifest_message(manifest: dict) -> bytes:
+    """Exact bytes covered by the manifest signature."""
+    body = {k: v for k, v in manifest.items() if k not in SIGNATURE_FIELDS}
+    return json.dumps(body, separators=(",", ":"), sort_keys=True).encode()
+
+
+def encode_record(ballot_id: int, nonce: bytes, ct: bytes, receipt: str, chain_hash: bytes | None) -> bytes:
+    body = b"".join((
+        _ID.pack(ballot_id, len(nonce)), nonce,
+        _CT_LEN.pack(len(ct)), ct,
+        bytes.fromhex(receipt), chain_hash or NO_LINK,
+    ))
+    return _LEN.pack(len(body)) + body
+
+
+def decode_record(body: bytes) -> dict:
+    ballot_id, n = _ID.unpack_from(body, 0)
+    pos = _ID.size
+    nonce = body[pos : pos + n]
+    pos += n
+    (ct_len,) = _CT_LEN.unpack_from(body, pos)
+    pos += _CT_LEN.size
+    ct = body[pos : pos + ct_len]
+    pos += ct_len
+    receipt, chain_hash = body[pos : pos + 32], body[pos + 32 : pos + 64]
+    if pos + 64 != len(body):
+        raise ExportFormatError(f"record {ballot_id} has a bad length")
+    return {
+        "id": ballot_id, "nonce": nonce, "ciphertext": ct, "receipt": receipt.hex(),
+        "chain_hash": None if chain_hash == NO_LINK else chain_hash,
+    }
+
+
+def _rows(db: Session, election_id: str, yield_per: int):
+    # Core-level cursor: tuples, no ORM identity map
+    return db.connection().execution_options(yield_per=yield_per).execute(
+        select(Ballot.id, Ballot.nonce, Ballot.ciphertext, Ballot.receipt, BallotChain.curr_hash)
+        .outerjoin(BallotChain, BallotChain.ballot_id == Ballot.id)
+        .where(Ballot.election_id == election_id)
+        .order_by(Ballot.id)
+    )
+
+
+def write_export(
+    db: Session,
+    election_id: str,
+    fp: BinaryIO,
+    chunk_bytes: int = EXPORT_CHUNK_BYTES,
+    yield_per: int = EXPORT_YIELD_PER,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """
+    Stream every ballot of the election into `fp`; returns the unsigned
+    manifest.  `progress(records_written)` is called as each chunk closes.
+    """
+    header = _HEADER.pack(MAGIC, VERSION)
+    fp.write(header)
+    whole = hashlib.sha256(header)
+    offset = len(header)
+    chunks: list[dict] = []
+    cur: dict | None = None
+    h = None
+
+    def close_chunk() -> None:
+        cur["sha256"] = h.hexdigest()
+        chunks.append(cur)
+        if progress is not None:
+            progress(sum(c["records"] for c in chunks))
+
+    for ballot_id, nonce, ct, receipt, chain_hash in _rows(db, election_id, yield_per):
+        rec = encode_record(ballot_id, nonce, ct, receipt, chain_hash)
+        if cur is not None and cur["length"] + len(rec) > chunk_bytes:
+            close_chunk()
+            cur = None
+        if cur is None:
+            cur = {"index": len(chunks), "offset": offset, "length": 0, "records": 0, "first_id": ballot_id}
+            h = hashlib.sha256()
+        fp.write(rec)
+        h.update(rec)
+        whole.update(rec)
+        cur["length"] += len(rec)
+        cur["records"] += 1
+        cur["last_id"] = ballot_id
+        offset += len(rec)
+    if cur is not None:
+        close_chunk()
+
+    head = db.get(ChainHead, election_id)
+    return {
+        "format": FORMAT,
+        "election_id": election_id,
+        "records": sum(c["records"] for c in chunks),
+        "bytes": offset,
+        "sha256": whole.hexdigest(),
+        "chunk_bytes": chunk_bytes,
+        "chunks": chunks,
+        "chain": {"height": head.height, "tip_hash": head.head_hash.hex()} if head else None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def sign_manifest(manifest: dict) -> dict:
+    return {
+        **manifest,
+        "algorithm": "Ed25519",
+        "public_key": get_public_key_b64(),
+        "signature": sign_detached_b64(manifest_message(manifest)),
+    }
+
+
+def export_election(
+    db: Session, election_id: str, name: str, out_dir: str = EXPORT_DIR,
+    chunk_bytes: int = EXPORT_CHUNK_BYTES, progress: Callable[[int], None] | None = None, **extra,
+) -> tuple[str, dict]:
+    """
+    Write <out_dir>/<name>.evb and its signed <name>.manifest.json.
+    `extra` (e.g. action_id, approvers) is added to the manifest before signing.
+    The data file is written under a unique temporary name (so a superseded
+    job attempt never shares it) and renamed when complete.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.evb")
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix=f"{name}.", suffix=".evb.part")
+    try:
+        with os.fdopen(fd, "wb", buffering=1 << 20) as fp:
+            manifest = write_export(db, election_id, fp, chunk_bytes, progress=progress)
+            fp.flush()
+            os.fsync(fp.fileno())
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    manifest = sign_manifest({**manifest, "file": os.path.basename(path), **extra})
+    with open(os.path.join(out_dir, f"{name}.manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return path, manifest
+
+
+# ---------- receiver side ----------
+def iter_records(fp: BinaryIO) -> Iterator[dict]:
+    """Decode records sequentially from an export file."""
+    magic, version = _HEADER.unpack(fp.read(_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ExportFormatError("not a ballot export file")
+    while True:
+        raw = fp.read(_LEN.size)
+        if not raw:
+            return
+        (n,) = _LEN.unpack(raw)
+        body = fp.read(n)
+        if len(body) != n:
+            raise ExportFormatError("truncated record")
+        yield decode_record(body)
+
+
+def _hash_range(path: str, offset: int, length: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        left = length
+        while left:
+            block = f.read(min(left, 1 << 20))
+            if not block:
+                break
+            h.update(block)
+            left -= len(block)
+    return h.hexdigest()
+
+
+def verify_export(
+    path: str, manifest: dict, pool: CryptoPool | None = crypto_pool, public_key: str | None = None
+) -> dict:
+    """
+    Check the manifest signature against `public_key` (base64; default: this
+    server's results key), then every chunk hash (on the pool's threads;
+    hashlib releases the GIL on large buffers).  A manifest naming any other
+    public key is rejected, whoever signed it.
+    """
+    expected = public_key or get_public_key_b64()
+    if manifest.get("public_key") != expected or not verify_detached_b64(
+        manifest_message(manifest), manifest.get("signature", ""), expected
+    ):
+        return {"ok": False, "signature": False, "bad_chunks": []}
+    size_ok = os.path.getsize(path) == manifest["bytes"]
+    chunks = manifest["chunks"]
+    if pool is None:
+        digests = [_hash_range(path, c["offset"], c["length"]) for c in chunks]
+    else:
+        futures = [pool.submit_thread(_hash_range, path, c["offset"], c["length"]) for c in chunks]
+        digests = [f.result() for f in futures]
+    bad = [c["index"] for c, d in zip(chunks, digests) if d != c["sha256"]]
+    return {"ok": size_ok and not bad, "signature": True, "size": size_ok, "bad_chunks": bad}
+
+
+# ---------- approved export actions ----------
+def run_export_action(
+    action_id: int, session_factory=SessionLocal, out_dir: str | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """
+    Execute an approved EXPORT ResultAction: write the files, then record
+    the manifest summary on the action (status DONE, or FAILED with the error).
+    """
+    with session_factory() as db:
+        act = db.get(ResultAction, action_id)
+        params = json.loads(act.payload or "{}")
+        approvers = sorted(
+            db.execute(
+                select(AdminUser.email).join(Approval, Approval.admin_id == AdminUser.id)
+                .where(Approval.action_id == action_id)
+            ).scalars()
+        )
+        try:
+            path, manifest = export_election(
+                db, params["election_id"], f"export_{action_id}", out_dir or EXPORT_DIR,
+                progress=progress, action_id=action_id, approvers=approvers,
+            )
+        except JobLost:
+            db.rollback()  # another attempt owns the action now
+            raise
+        except Exception as e:
+            db.rollback()
+            act.status = "FAILED"
+            act.payload = json.dumps({**params, "error": str(e)})
+            db.commit()
+            raise
+        act.status = "DONE"
+        act.payload = json.dumps({
+            **params,
+            "file": path,
+            "manifest": path[: -len(".evb")] + ".manifest.json",
+            "records": manifest["records"],
+            "sha256": manifest["sha256"],
+        })
+        db.commit()
+        return manifest
+
+
+@handler("export")
+def export_job(ctx: JobContext, action_id: int) -> dict:
+    """Job queue entry point; a retry rewrites the file from scratch."""
+    manifest = run_export_action(action_id, ctx.session_factory, progress=ctx.progress)
+    return {"action_id": action_id, "records": manifest["records"], "sha256": manifest["sha256"]}
@@ -0,0 +1,437 @@
+# common/jobs.py
+"""
+Durable, database-backed background jobs (exports, tallies, backups).
+
+Work is submitted as a `jobs` row and executed by JobWorker loops, either in
+a dedicated process (`python -m common.jobs`) or as a thread inside a service
+(JOBS_WORKER_IN_APP).  Any number of workers may poll the same database:
+
+  - claim: a QUEUED row is moved to RUNNING with a compare-and-swap on its
+    status, taking one of its type's slots 0..concurrency-1.  (type, slot) is
+    unique, so a type never runs more than `concurrency` jobs cluster-wide;
+  - lease: a running job's heartbeat is refreshed every JOBS_LEASE_S / 3.  A
+    job whose worker died stops heartbeating and is re-queued (or failed, once
+    out of attempts) by whichever worker notices first.  A worker that finds
+    its lease gone flags the context (`ctx.lost`): the next progress() or
+    check() raises JobLost and the result is discarded.  A superseded attempt
+    can still be running, so handlers write files under unique temporary names;
+  - retries: a handler exception re-queues the job after
+    JOBS_RETRY_BASE_S * 2**(attempt-1) seconds until max_attempts is reached;
+  - schedules: every worker enqueues periodic jobs with a dedupe key per
+    period, so N processes still run each scheduled backup once.
+
+Handlers are module-level functions registered with @handler; they receive a
+JobContext (for progress reports) and the job's JSON payload as keyword
+arguments, and return a JSON-serializable result.  A worker only claims types
+registered in its own process; JOBS_MODULES lists the modules the standalone
+worker imports to find them.
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from sqlalchemy import select, update  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.db import SessionLocal
+from common.models.models import Job
+
+JOBS_POLL_S = float(os.getenv("JOBS_POLL_S", "2.0"))
+JOBS_LEASE_S = float(os.getenv("JOBS_LEASE_S", "300"))
+JOBS_RETRY_BASE_S = float(os.getenv("JOBS_RETRY_BASE_S", "30"))
+JOBS_PROGRESS_EVERY_S = float(os.getenv("JOBS_PROGRESS_EVERY_S", "1.0"))
+JOBS_MODULES = os.getenv(
+    "JOBS_MODULES",
+    "common.export,common.tally.live,common.chain.merkle,api.routers.backup,api.routers.ballots_backup",
+)
+
+QUEUED, RUNNING, DONE, FAILED = "QUEUED", "RUNNING", "DONE", "FAILED"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobLost(RuntimeError):
+    """The job's lease expired and it was re-queued elsewhere; stop working on it."""
+
+
+# ---------- registry ----------
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    fn: Callable[..., Any]
+    concurrency: int = 1
+    max_attempts: int = 3
+
+
+@dataclass(frozen=True)
+class Schedule:
+    type: str
+    every_s: float
+    payload: dict = field(default_factory=dict)
+
+
+_registry: dict[str, JobType] = {}
+_schedules: dict[str, Schedule] = {}
+
+
+def _concurrency_overrides() -> dict[str, int]:
+    # JOBS_CONCURRENCY="export=1,live_count=4"
+    out = {}
+    for item in filter(None, os.getenv("JOBS_CONCURRENCY", "").split(",")):
+        name, _, n = item.partition("=")
+        out[name.strip()] = int(n)
+    return out
+
+
+def handler(name: str, concurrency: int = 1, max_attempts: int = 3):
+    """Register `fn(ctx, **payload)` as the handler for jobs of type `name`."""
+    def register(fn):
+        limit = _concurrency_overrides().get(name, concurrency)
+        _registry[name] = JobType(name, fn, max(limit, 1), max_attempts)
+        return fn
+    return register
+
+
+def schedule(type: str, every_s: float, **payload) -> None:
+    """Enqueue a `type` job once per `every_s` seconds (across all workers)."""
+    _schedules[type] = Schedule(type, every_s, payload)
+
+
+def load_handlers(modules: str = JOBS_MODULES) -> None:
+    for name in filter(None, (m.strip() for m in modules.split(","))):
+        importlib.import_module(name)
+
+
+# ---------- submission / status ----------
+def enqueue(
+    db: Session,
+    type: str,
+    payload: dict | None = None,
+    dedupe_key: str | None = None,
+    delay_s: float = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    Add a job to the caller's transaction (flushed, not committed), so it is
+    queued if and only if the surrounding work commits.
+    """
+    jt = _registry.get(type)
+    job = Job(
+        type=type,
+        payload=json.dumps(payload or {}),
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or (jt.max_attempts if jt else 3),
+        run_after=_now() + timedelta(seconds=delay_s),
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def submit(db: Session, type: str, payload: dict | None = None, dedupe_key: str | None = None, **kw) -> Job:
+    """
+    Queue a job and return its row.  With a `dedupe_key`, a second submission
+    of the same key returns the existing job instead of queueing another.
+    """
+    try:
+        job = enqueue(db, type, payload, dedupe_key, **kw)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return db.execute(select(Job).where(Job.dedupe_key == dedupe_key)).scalar_one()
+    db.refresh(job)
+    return job
+
+
+def submit_live(db: Session, type: str, payload: dict | None = None, *, dedupe_key: str, **kw) -> Job:
+    """
+    Like submit(), but the dedupe key only covers live (QUEUED/RUNNING) jobs:
+    a finished or failed job holding the key releases it and a new job is queued.
+    """
+    job = submit(db, type, payload, dedupe_key, **kw)
+    if job.status in (DONE, FAILED):
+        db.execute(
+            update(Job).where(Job.id == job.id, Job.status == job.status).values(dedupe_key=None)
+        )
+        db.commit()
+        job = submit(db, type, payload, dedupe_key, **kw)
+    return job
+
+
+def job_view(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "type": job.type,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": job.progress,
+        "total": job.total,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# ---------- execution ----------
+class JobContext:
+    """
+    Handed to handlers: job identity, the worker's session factory (use it
+    for the job's own database work) and throttled progress reporting.
+    """
+
+    def __init__(self, session_factory, job_id: int, worker: str, every_s: float = JOBS_PROGRESS_EVERY_S):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker = worker
+        self._every_s = every_s
+        self._last = 0.0
+        self.lost = threading.Event()  # set once the lease is known to be gone
+
+    def _owned(self):
+        return update(Job).where(Job.id == self.job_id, Job.worker == self.worker, Job.status == RUNNING)
+
+    def check(self) -> None:
+        """Raise JobLost if the heartbeat found this job re-queued elsewhere."""
+        if self.lost.is_set():
+            raise JobLost(f"job {self.job_id} is no longer held by {self.worker}")
+
+    def progress(self, done: int, total: int | None = None, force: bool = False) -> None:
+        """Record progress (at most once per JOBS_PROGRESS_EVERY_S unless forced)."""
+        self.check()
+        now = time.monotonic()
+        if not force and now - self._last < self._every_s:
+            return
+        self._last = now
+        values: dict = {"progress": done, "heartbeat_at": _now()}
+        if total is not None:
+            values["total"] = total
+        with self.session_factory() as db:
+            moved = db.execute(self._owned().values(**values)).rowcount
+            db.commit()
+        if not moved:
+            self.lost.set()
+            self.check()
+
+    def heartbeat(self) -> bool:
+        with self.session_factory() as db:
+            moved = db.execute(self._owned().values(heartbeat_at=_now())).rowcount
+            db.commit()
+        if not moved:
+            self.lost.set()
+        return bool(moved)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        name: str | None = None,
+        poll_s: float = JOBS_POLL_S,
+        lease_s: float = JOBS_LEASE_S,
+        retry_base_s: float = JOBS_RETRY_BASE_S,
+    ):
+        self._session_factory = session_factory
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._poll_s = poll_s
+        self._lease_s = lease_s
+        self._retry_base_s = retry_base_s
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._periods: dict[str, int] = {}  # last period enqueued per schedule
+        self.ran = 0
+        self.failed = 0
+
+    # ---- housekeeping ----
+    def enqueue_scheduled(self, db: Session) -> None:
+        now = time.time()
+        for s in list(_schedules.values()):
+            period = int(now // s.every_s)
+            if self._periods.get(s.type) != period:
+                submit(db, s.type, s.payload, dedupe_key=f"{s.type}@{period}")
+                self._periods[s.type] = period
+
+    def reap(self, db: Session) -> int:
+        """Release jobs whose worker stopped heartbeating; returns how many."""
+        stale = _now() - timedelta(seconds=self._lease_s)
+        rows = db.execute(
+            select(Job.id, Job.attempts, Job.max_attempts)
+            .where(Job.status == RUNNING, Job.heartbeat_at < stale)
+        ).all()
+        for job_id, attempts, max_attempts in rows:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == RUNNING, Job.heartbeat_at < stale)
+                .values(
+                    status=QUEUED if attempts < max_attempts else FAILED,
+                    slot=None, worker=None,
+                    error="lease expired (worker lost)",
+                    finished_at=None if attempts < max_attempts else _now(),
+                )
+            )
+        db.commit()
+        return len(rows)
+
+    # ---- claim ----
+    def claim(self, db: Session) -> tuple[int, JobType, dict] | None:
+        types = list(_registry)
+        if not types:
+            return None
+        candidates = db.execute(
+            select(Job.id, Job.type, Job.payload)
+            .where(Job.status == QUEUED, Job.type.in_(types), Job.run_after <= _now())
+            .order_by(Job.run_after, Job.id)
+            .limit(32)
+        ).all()
+        full: set[str] = set()
+        for job_id, type_, payload in candidates:
+            if type_ in full:
+                continue
+            jt = _registry[type_]
+            for slot in range(jt.concurrency):
+                try:
+                    moved = db.execute(
+                        update(Job)
+                        .where(Job.id == job_id, Job.status == QUEUED)
+                        .values(status=RUNNING, slot=slot, worker=self.name,
+                                heartbeat_at=_now(), attempts=Job.attempts + 1, error=None)
+                    ).rowcount
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()  # slot taken: try the next one
+                    continue
+                if moved:
+                    return job_id, jt, json.loads(payload or "{}")
+                break  # another worker claimed this job
+            else:
+                full.add(type_)
+        return None
+
+    def _finish(self, job_id: int, values: dict) -> None:
+        with self._session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker == self.name, Job.status == RUNNING)
+                .values(slot=None, **values)
+            )
+            db.commit()
+
+    def _keep_alive(self, ctx: JobContext, done: threading.Event) -> None:
+        while not done.wait(self._lease_s / 3):
+            try:
+                if not ctx.heartbeat():
+                    print(f"⚠️ job {ctx.job_id} lease lost by {ctx.worker}")
+                    return
+            except Exception as e:
+                print(f"⚠️ job {ctx.job_id} heartbeat failed: {e}")
+
+    def execute(self, job_id: int, jt: JobType, payload: dict) -> None:
+        ctx = JobContext(self._session_factory, job_id, self.name)
+        done = threading.Event()
+        beat = threading.Thread(target=self._keep_alive, args=(ctx, done), daemon=True)
+        beat.start()
+        try:
+            result = jt.fn(ctx, **payload)
+        except JobLost:
+            return
+        except Exception as e:
+            self.failed += 1
+            with self._session_factory() as db:
+                attempts = db.get(Job, job_id).attempts
+            error = f"{type(e).__name__}: {e}"
+            print(f"❌ job {job_id} ({jt.name}) attempt {attempts} failed: {error}")
+            if attempts < jt.max_attempts:
+                delay = self._retry_base_s * 2 ** (attempts - 1)
+                self._finish(job_id, {"status": QUEUED, "worker": None, "error": error,
+                                      "run_after": _now() + timedelta(seconds=delay)})
+            else:
+                self._finish(job_id, {"status": FAILED, "error": error + "\n" + traceback.format_exc(),
+                                      "finished_at": _now()})
+            return
+        finally:
+            done.set()
+        if ctx.lost.is_set():
+            return  # another attempt owns the job now; drop this result
+        self.ran += 1
+        self._finish(job_id, {"status": DONE, "result": json.dumps(result, default=str),
+                              "finished_at": _now()})
+
+    def run_once(self) -> bool:
+        """Housekeeping plus at most one job; True if a job ran."""
+        with self._session_factory() as db:
+            self.reap(db)
+            self.enqueue_scheduled(db)
+            claimed = self.claim(db)
+        if claimed is None:
+            return False
+        self.execute(*claimed)
+        return True
+
+    def run_until_idle(self, max_jobs: int = 1000) -> int:
+        n = 0
+        while n < max_jobs and self.run_once():
+            n += 1
+        return n
+
+    # ---- lifecycle ----
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:  # keep polling across DB hiccups
+                print(f"⚠️ job worker {self.name}: {e}")
+            self._stop.wait(self._poll_s)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"worker": self.name, "types": sorted(_registry), "ran": self.ran, "failed": self.failed}
+
+
+def in_app_worker() -> JobWorker | None:
+    """A worker thread for a service process, unless JOBS_WORKER_IN_APP=false."""
+    if os.getenv("JOBS_WORKER_IN_APP", "true").lower() != "true":
+        return None
+    return JobWorker()
+
+
+def main() -> None:
+    load_handlers()
+    worker = JobWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker._stop.set())
+    print(f"🕒 job worker {worker.name} serving {sorted(_registry)}")
+    try:
+        worker._run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    # handler modules register with `common.jobs`, not with this `__main__` copy
+    from common.jobs import main as _main
+    _main()
@@ -50,15 +50,119 @@ class BallotChain(Base):
     """
     Append-only blockchain-style chain linking ballots.
     Each record includes hash of the previous one for tamper-evidence.
+    Every election has its own chain: `seq` is the 1-based height within it.
     """
     __tablename__ = "ballot_chain"
 
     id = Column(Integer, primary_key=True, index=True)
     ballot_id = Column(Integer, ForeignKey("ballots.id"), nullable=False, index=True)
+    election_id = Column(String(64), nullable=True)  # NULL = legacy global chain
+    seq = Column(Integer, nullable=True)
     prev_hash = Column(LargeBinary(32), nullable=False)
     curr_hash = Column(LargeBinary(32), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())  # ✅ fixed
 
+    __table_args__ = (
+        UniqueConstraint("election_id", "seq", name="uq_chain_election_seq"),
+    )
+
+
+class ChainHead(Base):
+    """
+    One row per election pointing at the current head of its chain.
+    Appenders advance it with a compare-and-swap on `version`, so replicas
+    sharing one database cannot fork the chain.
+    """
+    __tablename__ = "chain_head"
+
+    election_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    head_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+    height: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class MerkleNode(Base):
+    """
+    Node hashes of each election's Merkle tree over ballot receipts.
+    level 0 holds the leaves (idx = chain seq - 1); a node without a right
+    sibling is promoted unchanged.  Maintained in the chain-append transaction.
+    """
+    __tablename__ = "merkle_nodes"
+
+    election_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    level: Mapped[int] = mapped_column(Integer, primary_key=True)
+    idx: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+
+
+class ChainVerifyCheckpoint(Base):
+    """
+    Last chain position that passed verification, per election.
+    Verifiers resume after it, so each call only checks newly appended links.
+    """
+    __tablename__ = "chain_verify_checkpoints"
+
+    election_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+    last_created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    verified_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=UTCNOW)
+
+
+class ChainCheckpoint(Base):
+    """
+    Ed25519-signed snapshot of an election's chain (height, tip, Merkle root).
+    `signature` covers the canonical JSON of the other published fields.
+    """
+    __tablename__ = "chain_checkpoints"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    election_id: Mapped[str] = mapped_column(String(64), index=True)
+    height: Mapped[int] = mapped_column(Integer, nullable=False)
+    tip_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    merkle_root: Mapped[str] = mapped_column(String(64), nullable=False)
+    timestamp: Mapped[str] = mapped_column(String(40), nullable=False)  # ISO-8601, as signed
+    signature: Mapped[str] = mapped_column(String(128), nullable=False)
+    public_key: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("election_id", "height", name="uq_checkpoint_election_height"),
+    )
+
+class ResultsAggregate(Base):
+    """
+    Live first-preference counts per election, division and candidate.
+    Incremented as tally batches finish; see common/tally/live.py.
+    """
+    __tablename__ = "results_aggregate"
+
+    election_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    division: Mapped[str] = mapped_column(String(64), primary_key=True)
+    candidate_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    votes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ResultsDivision(Base):
+    """
+    Progress of each division's live count: ballots counted up to
+    `counted_upto` (Ballot.id).  `version` grows with every applied batch;
+    an election's results version is the sum over its divisions.
+    A division is registered once, for exactly one election.
+    """
+    __tablename__ = "results_divisions"
+    __table_args__ = (
+        UniqueConstraint("division", name="uq_results_division"),
+    )
+
+    election_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    division: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    counted_upto: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ballots: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    informal: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=UTCNOW)
+
 # ---------------------------------------------------------------------
 # Optional token + admin models
 # ---------------------------------------------------------------------
@@ -107,6 +211,8 @@ class AdminUser(Base):
 class ResultAction(Base):
     """
     Records actions (e.g., tally requests, approvals).
+    `approvals_count` caches the number of Approval rows and moves with them
+    in the same transaction; the action leaves PENDING when it reaches `quorum`.
     """
     __tablename__ = "result_actions"
 
@@ -114,6 +220,8 @@ class ResultAction(Base):
     type: Mapped[str] = mapped_column(String(64))
     payload: Mapped[str] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String(32), default="PENDING")
+    approvals_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    quorum: Mapped[int] = mapped_column(Integer, nullable=False, default=2)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=UTCNOW)
 
 
@@ -131,3 +239,39 @@ class Approval(Base):
     __table_args__ = (
         UniqueConstraint("action_id", "admin_id", name="uq_action_admin"),
     )
+
+
+# ---------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------
+
+class Job(Base):
+    """
+    Durable background job (exports, tallies, backups); see common/jobs.py.
+    A RUNNING job holds one of its type's `slot`s, which caps per-type
+    concurrency across all workers; `dedupe_key` makes scheduled and
+    idempotent submissions insert once however many processes try.
+    """
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    type: Mapped[str] = mapped_column(String(64), index=True)
+    payload: Mapped[str] = mapped_column(Text, default="{}")
+    status: Mapped[str] = mapped_column(String(16), default="QUEUED", index=True)
+    dedupe_key: Mapped[str | None] = mapped_column(String(128), unique=True, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=UTCNOW, index=True)
+    slot: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    worker: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    progress: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=UTCNOW)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("type", "slot", name="uq_job_type_slot"),
+    )
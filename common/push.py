@@ -0,0 +1,271 @@
+# common/push.py
+"""
+Push channel for results and chain height (SSE and WebSocket).
+
+One Broadcaster per process watches only the elections that have
+subscribers.  A watched election is checked once per PUSH_POLL_S, and right
+away when this process appends to its chain or applies a results batch.
+The check reads the tip cache and the results cache, so cost is independent
+of the number of clients.  On a change the event is serialized once and put
+on every subscriber's queue.  One change costs O(subscribers) queue puts and
+socket writes, instead of every client re-polling full responses.
+
+Events (JSON):
+    {"type": "chain",   "election_id", "height", "tip_hash"}
+    {"type": "results", "election_id", "version", "etag", "tally": {changed candidates only}}
+    {"type": "dropped", "reason"}                     (last event of a slow client)
+
+A new subscriber first gets the latest chain and full results events.
+Per-client queues hold PUSH_QUEUE_SIZE events; a client that falls that far
+behind is dropped and must reconnect (and re-sync via the snapshot events).
+
+Only elections that exist (a chain head or a results division) can be
+watched, and a process holds at most PUSH_MAX_SUBSCRIBERS subscriptions,
+PUSH_MAX_PER_ELECTION of them for any one election.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect  # type: ignore
+from sqlalchemy import select  # type: ignore
+
+from common.chain.appender import chain_appender
+from common.chain.tip import tip_cache
+from common.db import SessionLocal
+from common.models.models import ChainHead, ResultsDivision
+from common.tally import live
+from common.tally.live import Snapshot, results_cache
+
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "64"))
+PUSH_POLL_S = float(os.getenv("PUSH_POLL_S", "1.0"))
+PUSH_HEARTBEAT_S = float(os.getenv("PUSH_HEARTBEAT_S", "15"))
+PUSH_MAX_SUBSCRIBERS = int(os.getenv("PUSH_MAX_SUBSCRIBERS", "10000"))
+PUSH_MAX_PER_ELECTION = int(os.getenv("PUSH_MAX_PER_ELECTION", "5000"))
+
+
+class PushLimit(RuntimeError):
+    """This process already holds as many subscriptions as it allows."""
+
+
+@dataclass(frozen=True)
+class Event:
+    data: str          # JSON, serialized once per change
+    sse: str           # the same event as an SSE frame
+
+    @classmethod
+    def of(cls, body: dict) -> "Event":
+        data = json.dumps(body, separators=(",", ":"))
+        return cls(data=data, sse=f"event: {body['type']}\ndata: {data}\n\n")
+
+
+class Subscription:
+    def __init__(self, election_id: str, size: int):
+        self.election_id = election_id
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(size)
+        self.dropped = False
+
+
+async def _results_snapshot(election_id: str) -> Snapshot:
+    return await asyncio.to_thread(results_cache.get, election_id)
+
+
+def _election_exists(election_id: str) -> bool:
+    with SessionLocal() as db:
+        return db.get(ChainHead, election_id) is not None or db.execute(
+            select(ResultsDivision.division).where(ResultsDivision.election_id == election_id).limit(1)
+        ).first() is not None
+
+
+async def _known_election(election_id: str) -> bool:
+    return await asyncio.to_thread(_election_exists, election_id)
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        tip_loader: Callable[[str], Awaitable[dict]] = tip_cache.get,
+        results_loader: Callable[[str], Awaitable[Snapshot]] = _results_snapshot,
+        queue_size: int = PUSH_QUEUE_SIZE,
+        poll_s: float = PUSH_POLL_S,
+        known: Callable[[str], Awaitable[bool]] = _known_election,
+        max_subscribers: int = PUSH_MAX_SUBSCRIBERS,
+        max_per_election: int = PUSH_MAX_PER_ELECTION,
+    ):
+        self._tip_loader = tip_loader
+        self._results_loader = results_loader
+        self._known = known
+        self._known_ids: set[str] = set()  # only ids that exist, so bounded by real elections
+        self._max_subscribers = max_subscribers
+        self._max_per_election = max_per_election
+        self._queue_size = queue_size
+        self._poll_s = poll_s
+        self._subs: dict[str, set[Subscription]] = {}
+        self._chain: dict[str, Event] = {}                   # latest chain event per election
+        self._results: dict[str, tuple[int, dict, Event]] = {}  # version, tally, full event
+        self._dirty: set[str] = set()
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self.events = 0
+        self.dropped = 0
+
+    # ---- subscribers ----
+    async def admit(self, election_id: str) -> Subscription:
+        """Subscribe to an existing election; LookupError if unknown, PushLimit if full."""
+        if election_id not in self._known_ids:
+            if not await self._known(election_id):
+                raise LookupError(f"unknown election {election_id}")
+            self._known_ids.add(election_id)
+        return self.subscribe(election_id)
+
+    def subscribe(self, election_id: str) -> Subscription:
+        if sum(len(s) for s in self._subs.values()) >= self._max_subscribers:
+            raise PushLimit("too many push subscribers on this server")
+        if len(self._subs.get(election_id, ())) >= self._max_per_election:
+            raise PushLimit(f"too many push subscribers for {election_id}")
+        sub = Subscription(election_id, self._queue_size)
+        self._subs.setdefault(election_id, set()).add(sub)
+        for snap in (self._chain.get(election_id), self._results.get(election_id, (0, {}, None))[2]):
+            if snap is not None:
+                sub.queue.put_nowait(snap)
+        self.notify(election_id)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subs.get(sub.election_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.election_id]
+                self._chain.pop(sub.election_id, None)
+                self._results.pop(sub.election_id, None)
+
+    def _drop(self, sub: Subscription) -> None:
+        self.unsubscribe(sub)
+        sub.dropped = True
+        self.dropped += 1
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(Event.of({"type": "dropped", "reason": "client too slow"}))
+
+    def _fanout(self, election_id: str, event: Event) -> None:
+        self.events += 1
+        for sub in list(self._subs.get(election_id, ())):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(sub)
+
+    # ---- change detection ----
+    def notify(self, election_id: str) -> None:
+        """Schedule an immediate check (safe from any thread, e.g. the chain appender)."""
+        if self._loop is None or election_id not in self._subs:
+            return
+        self._loop.call_soon_threadsafe(self._mark, election_id)
+
+    def _mark(self, election_id: str) -> None:
+        self._dirty.add(election_id)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def check(self, election_id: str) -> None:
+        tip = await self._tip_loader(election_id)
+        last = self._chain.get(election_id)
+        ev = Event.of({"type": "chain", "election_id": election_id,
+                       "height": tip["height"], "tip_hash": tip["tip_hash"]})
+        if last is None or last.data != ev.data:
+            self._chain[election_id] = ev
+            self._fanout(election_id, ev)
+
+        snap = await self._results_loader(election_id)
+        version, tally, _ = self._results.get(election_id, (-1, {}, None))
+        if snap.version != version:
+            new = json.loads(snap.body).get("tally", {})
+            head = {"type": "results", "election_id": election_id, "version": snap.version, "etag": snap.etag}
+            self._results[election_id] = (snap.version, new, Event.of({**head, "tally": new}))
+            changed = {c: v for c, v in new.items() if tally.get(c) != v}
+            self._fanout(election_id, Event.of({**head, "tally": changed}))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_poll = loop.time() + self._poll_s
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(next_poll - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            due, self._dirty = self._dirty, set()
+            if loop.time() >= next_poll:
+                # changes made by other processes only show up here
+                due |= set(self._subs)
+                next_poll = loop.time() + self._poll_s
+            for election_id in due & set(self._subs):
+                try:
+                    await self.check(election_id)
+                except Exception as e:  # keep pushing other elections across DB hiccups
+                    print(f"⚠️ push check failed for {election_id}: {e}")
+
+    # ---- lifecycle (call from the app lifespan) ----
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._loop = self._wake = None
+
+    def stats(self) -> dict:
+        return {
+            "elections": len(self._subs),
+            "subscribers": sum(len(s) for s in self._subs.values()),
+            "events": self.events,
+            "dropped": self.dropped,
+            "queue_size": self._queue_size,
+        }
+
+    # ---- transports ----
+    async def sse(self, sub: Subscription, heartbeat: float = PUSH_HEARTBEAT_S) -> AsyncIterator[str]:
+        """SSE frames for one subscription; unsubscribes when the client goes away."""
+        try:
+            while not (sub.dropped and sub.queue.empty()):
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield ev.sse
+        finally:
+            self.unsubscribe(sub)
+
+    async def websocket(self, ws: WebSocket, sub: Subscription, heartbeat: float = PUSH_HEARTBEAT_S) -> None:
+        """Forward a subscription over an accepted WebSocket until either side stops."""
+        try:
+            while not (sub.dropped and sub.queue.empty()):
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    await ws.send_text('{"type":"ping"}')
+                    continue
+                await ws.send_text(ev.data)
+            await ws.close(code=1013)  # dropped: try again later
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.unsubscribe(sub)
+
+
+broadcaster = Broadcaster()
+chain_appender.subscribe(broadcaster.notify)
+live.subscribe(broadcaster.notify)
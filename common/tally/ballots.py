@@ -0,0 +1,134 @@
+# common/tally/ballots.py
+"""
+Decrypt an election's ballots and pack their preferences into a dense matrix.
+
+    M[i, r] = dense index of ballot i's (r+1)-th preference, or -1 (unused)
+
+Candidate ids from canonical_prefs() are mapped to 0..C-1 via `candidates`
+(sorted ids), so counting rounds can use np.bincount directly.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterable, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session  # type: ignore
+
+from cryptoutils.ballots import ballot_key
+from cryptoutils.pool import CryptoPool, crypto_pool
+
+from .decrypt import TALLY_DECRYPT_BATCH, iter_preferences
+
+
+@dataclass
+class PreferenceMatrix:
+    matrix: np.ndarray          # (n_ballots, max_rank) int32, -1 = no preference
+    candidates: np.ndarray      # dense index -> candidate id
+    weights: np.ndarray         # (n_ballots,) int64 ballot weights (1 unless aggregated)
+    informal: int = 0           # ballots skipped as malformed / for another election / unknown candidate
+
+    @property
+    def n_ballots(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def digest(self) -> str:
+        """SHA-256 over candidates, weights and matrix: identifies a count's input."""
+        h = hashlib.sha256()
+        for arr in (self.candidates.astype(np.int64), self.weights.astype(np.int64), self.matrix.astype(np.int32)):
+            h.update(str(arr.shape).encode())
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+
+def pack_preferences(
+    prefs: Sequence[Sequence[int]],
+    candidates: Iterable[int] | None = None,
+    weights: Sequence[int] | None = None,
+) -> PreferenceMatrix:
+    """
+    Vectorized packing: one flat array + lengths, scattered into the matrix.
+    With `candidates`, a ballot naming anyone outside the list is left out
+    and counted (by its weight) as informal.
+    """
+    n = len(prefs)
+    lengths = np.fromiter((len(p) for p in prefs), dtype=np.int64, count=n)
+    flat = np.fromiter(chain.from_iterable(prefs), dtype=np.int64, count=int(lengths.sum()))
+    ids = np.unique(flat) if candidates is None else np.unique(np.fromiter(candidates, dtype=np.int64))
+    if candidates is not None and flat.size:
+        unknown = ~np.isin(flat, ids)
+        if unknown.any():
+            bad = np.zeros(n, dtype=bool)
+            bad[np.repeat(np.arange(n), lengths)[unknown]] = True
+            keep = np.flatnonzero(~bad)
+            w = np.ones(n, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+            packed = pack_preferences([prefs[i] for i in keep], ids, w[keep])
+            packed.informal = int(w[bad].sum())
+            return packed
+
+    max_rank = int(lengths.max()) if n else 0
+    matrix = np.full((n, max_rank), -1, dtype=np.int32)
+    if flat.size:
+        rows = np.repeat(np.arange(n), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cols = np.arange(flat.size) - starts
+        matrix[rows, cols] = np.searchsorted(ids, flat)
+    w = np.ones(n, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+    return PreferenceMatrix(matrix=matrix, candidates=ids, weights=w)
+
+
+def advance(matrix: np.ndarray, ptr: np.ndarray, cur: np.ndarray, idx: np.ndarray, active: np.ndarray) -> None:
+    """Move ballots `idx` to their next still-active preference (or -1 = exhausted)."""
+    max_rank = matrix.shape[1]
+    while idx.size:
+        ptr[idx] += 1
+        inside = ptr[idx] < max_rank
+        nxt = np.full(idx.size, -1, dtype=matrix.dtype)
+        nxt[inside] = matrix[idx[inside], ptr[idx[inside]]]
+        cur[idx] = nxt
+        # keep going only for ballots that landed on an inactive candidate
+        idx = idx[(nxt >= 0) & ~active[np.maximum(nxt, 0)]]
+
+
+def pick_lowest(tallies: np.ndarray, active: np.ndarray, history: list[np.ndarray]) -> tuple[int, str | None]:
+    """
+    Lowest active candidate; ties broken backwards (lowest in the latest earlier
+    round where the tied candidates differ), then by lowest id.
+    Returns (dense index, tie-break rule used or None).
+    """
+    live = np.flatnonzero(active)
+    low = live[tallies[live] == tallies[live].min()]
+    if low.size == 1:
+        return int(low[0]), None
+    for past in reversed(history):
+        sub = low[past[low] == past[low].min()]
+        if sub.size < low.size:
+            low = sub
+            if low.size == 1:
+                return int(low[0]), "backwards"
+    return int(low[0]), "lowest_id"
+
+
+def load_preferences(
+    db: Session,
+    election_id: str,
+    candidates: Iterable[int] | None = None,
+    pool: CryptoPool | None = crypto_pool,
+    batch: int = TALLY_DECRYPT_BATCH,
+) -> PreferenceMatrix:
+    """
+    Decrypt every ballot of `election_id` (fanned out over the crypto pool when
+    given) and pack the preference lists.  Ballots that do not decode for this
+    election (see decrypt.decode_prefs), that repeat a candidate or that name
+    one outside `candidates` are counted as informal.
+    """
+    prefs: list[list[int]] = []
+    informal = 0
+    for chunk in iter_preferences(db, election_id, pool, batch, key=ballot_key.key):
+        prefs.extend(chunk.prefs)
+        informal += chunk.informal
+    packed = pack_preferences(prefs, candidates)
+    packed.informal += informal
+    return packed
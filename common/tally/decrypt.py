@@ -0,0 +1,149 @@
+# common/tally/decrypt.py
+"""
+Streaming ballot decryption: `ballots` rows in, preference lists out.
+
+Both writers produce the same ciphertext layout: AES-GCM ciphertext with
+the 16-byte tag appended (the pycryptodome `ciphertext + tag` of the
+registration service is byte-for-byte what AESGCM.encrypt returns) and the
+nonce in its own column.  They differ in the plaintext:
+
+    voting        canonical_prefs():  {"e": election, "t": ts, "p": [ids]}
+    registration  the submitted ballot dict, keys sorted, election only on
+                  the row: {"preferences": [ids], ...} (or "p")
+
+decode_prefs() accepts both.  iter_preferences() reads (ciphertext, nonce)
+rows in TALLY_DECRYPT_BATCH batches through a server-side cursor and keeps
+at most `window` chunks in flight on the crypto pool.  Workers decrypt and
+decode, so only compact preference lists come back, and memory stays
+bounded however large the election is.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import deque
+from typing import Iterator, NamedTuple, Sequence
+
+from sqlalchemy import select  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.models.models import Ballot
+from cryptoutils.ballots import ballot_key
+from cryptoutils.pool import CRYPTO_POOL_CHUNK, CryptoPool, decrypt_chunk, crypto_pool
+
+TALLY_DECRYPT_BATCH = int(os.getenv("TALLY_DECRYPT_BATCH", "50000"))
+
+
+class DecodedChunk(NamedTuple):
+    prefs: list[list[int]]
+    informal: int
+
+
+def decode_prefs(plaintext: bytes, election_id: str) -> list[int] | None:
+    """Preference list of a decrypted ballot in either format, or None if informal."""
+    try:
+        doc = json.loads(plaintext)
+        if "e" in doc:
+            if doc["e"] != election_id:
+                return None
+            p = doc["p"]
+        else:
+            p = doc["preferences"] if "preferences" in doc else doc["p"]
+        ok = (
+            isinstance(p, list) and p
+            and all(type(c) is int for c in p)
+            and len(set(p)) == len(p)
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    return p if ok else None
+
+
+_INT_ARRAYS = b"0123456789,-[]"
+
+
+def decode_chunk(plaintexts: Sequence[bytes], election_id: str) -> DecodedChunk:
+    """
+    Decode many plaintexts at once.  canonical_prefs() payloads for this
+    election take a fast path: their "p" arrays are sliced out and parsed
+    with a single json.loads per chunk.  Anything else (registration
+    ballots, other elections, odd values) goes through decode_prefs().
+    """
+    prefix = b'{"e":' + json.dumps(election_id).encode() + b',"t":'
+    arrays: list[bytes] = []
+    slow: list[bytes] = []
+    for pt in plaintexts:
+        # the last ',"p":[' is the real key: only integers may follow it
+        i = pt.rfind(b',"p":[') if pt.startswith(prefix) and pt.endswith(b"]}") else -1
+        if i > 0:
+            arrays.append(pt[i + 5 : -1])
+        else:
+            slow.append(pt)
+
+    prefs: list[list[int]] = []
+    informal = 0
+    blob = b"[" + b",".join(arrays) + b"]"
+    if blob.translate(None, _INT_ARRAYS):
+        # something other than integer arrays slipped in: decode one by one
+        arrays, slow = [], list(plaintexts)
+    if arrays:
+        try:
+            parsed = json.loads(blob)
+            prefs = [p for p in parsed if p and len(set(p)) == len(p)]
+            informal = len(parsed) - len(prefs)
+        except (ValueError, TypeError):  # e.g. nested arrays
+            prefs, slow = [], list(plaintexts)
+    for pt in slow:
+        p = decode_prefs(pt, election_id)
+        if p is None:
+            informal += 1
+        else:
+            prefs.append(p)
+    return DecodedChunk(prefs, informal)
+
+
+def decrypt_decode_chunk(items: Sequence[tuple[bytes, bytes]], key: bytes, election_id: str) -> DecodedChunk:
+    """Worker: decrypt and decode one chunk."""
+    return decode_chunk(decrypt_chunk(items, key), election_id)
+
+
+def iter_encrypted(db: Session, election_id: str, batch: int = TALLY_DECRYPT_BATCH) -> Iterator[list[tuple[bytes, bytes]]]:
+    # Core-level cursor on the session's connection: no ORM row processing
+    rows = db.connection().execution_options(yield_per=batch).execute(
+        select(Ballot.ciphertext, Ballot.nonce)
+        .where(Ballot.election_id == election_id)
+        .order_by(Ballot.id)
+    )
+    for part in rows.partitions(batch):
+        yield [(ct, nonce) for ct, nonce in part]
+
+
+def iter_preferences(
+    db: Session,
+    election_id: str,
+    pool: CryptoPool | None = crypto_pool,
+    batch: int = TALLY_DECRYPT_BATCH,
+    chunk_size: int = CRYPTO_POOL_CHUNK,
+    window: int | None = None,
+    key: bytes | None = None,
+) -> Iterator[DecodedChunk]:
+    """
+    Yield decoded chunks in Ballot.id order.  With a pool, up to `window`
+    chunks (default 2 per worker) are decrypted ahead of the consumer;
+    without one, chunks are decoded inline.
+    """
+    key = key or ballot_key.key
+    if pool is None:
+        for items in iter_encrypted(db, election_id, batch):
+            yield decrypt_decode_chunk(items, key, election_id)
+        return
+
+    window = window or 2 * pool.workers
+    pending: deque = deque()
+    for items in iter_encrypted(db, election_id, batch):
+        for i in range(0, len(items), chunk_size):
+            pending.append(pool.submit(decrypt_decode_chunk, items[i : i + chunk_size], key, election_id))
+            while len(pending) >= window:
+                yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
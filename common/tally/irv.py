@@ -0,0 +1,96 @@
+# common/tally/irv.py
+"""
+Instant-runoff (preferential, single-winner) count over a PreferenceMatrix.
+
+Each ballot carries a pointer to its current preference.  A round is one
+np.bincount over the current preferences; after an exclusion only the
+ballots sitting on the excluded candidate advance their pointer (vectorized,
+at most max_rank steps).  No per-ballot Python loop runs at any point.
+
+Exclusion ties are broken backwards (lowest tally in the latest earlier
+round where the tied candidates differ), then by lowest candidate id; the
+rule used is recorded in the round table.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .ballots import PreferenceMatrix, advance, pick_lowest
+
+
+@dataclass
+class Round:
+    round: int
+    tallies: dict[int, int]          # candidate id -> votes this round
+    exhausted: int
+    transfers: dict[int, int] = field(default_factory=dict)  # change vs previous round
+    excluded: int | None = None
+    tie_break: str | None = None
+
+
+@dataclass
+class IRVResult:
+    winner: int | None
+    rounds: list[Round]
+    candidates: list[int]
+    total: int
+    informal: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "method": "IRV",
+            "winner": self.winner,
+            "candidates": self.candidates,
+            "total": self.total,
+            "informal": self.informal,
+            "rounds": [r.__dict__ for r in self.rounds],
+        }
+
+
+def count_irv(pm: PreferenceMatrix) -> IRVResult:
+    matrix, weights = pm.matrix, pm.weights
+    n, n_cand = matrix.shape[0], len(pm.candidates)
+    ids = [int(c) for c in pm.candidates]
+
+    active = np.ones(n_cand, dtype=bool)
+    ptr = np.zeros(n, dtype=np.int64)
+    cur = matrix[:, 0].copy() if matrix.shape[1] else np.full(n, -1, dtype=np.int32)
+    total = int(weights.sum())
+
+    rounds: list[Round] = []
+    history: list[np.ndarray] = []
+    prev = None
+    winner = None
+    while True:
+        live_ballots = cur >= 0
+        tallies = np.bincount(cur[live_ballots], weights=weights[live_ballots], minlength=n_cand).astype(np.int64)
+        exhausted = total - int(tallies.sum())
+        rnd = Round(
+            round=len(rounds) + 1,
+            tallies={ids[c]: int(tallies[c]) for c in np.flatnonzero(active)},
+            exhausted=exhausted,
+        )
+        if prev is not None:
+            delta = tallies - prev
+            rnd.transfers = {ids[c]: int(delta[c]) for c in np.flatnonzero(delta)}
+        rounds.append(rnd)
+
+        continuing = int(tallies.sum())
+        live = np.flatnonzero(active)
+        leader = int(live[np.argmax(tallies[live])]) if live.size else None
+        if leader is not None and (2 * int(tallies[leader]) > continuing or live.size <= 1):
+            winner = ids[leader]
+            break
+        if live.size == 0 or continuing == 0:
+            break
+
+        excluded, rule = pick_lowest(tallies, active, history)
+        rnd.excluded, rnd.tie_break = ids[excluded], rule
+        active[excluded] = False
+        advance(matrix, ptr, cur, np.flatnonzero(cur == excluded), active)
+        history.append(tallies)
+        prev = tallies
+
+    return IRVResult(winner=winner, rounds=rounds, candidates=ids, total=total, informal=pm.informal)
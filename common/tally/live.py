@@ -0,0 +1,296 @@
+# common/tally/live.py
+"""
+Materialized live results (first preferences) for results-night traffic.
+
+Ballots are stored per contest, so a division's ballots are those whose
+Ballot.election_id is the division id.  A division is registered once, for
+one election (register_division); only registered divisions are counted.
+count_division() maps the ballots after the division's `counted_upto` mark
+through the sharded tally and
+applies each shard's first-preference counts as it finishes, in id order:
+one transaction per shard bumps the division's version (compare-and-swap on
+the previous mark, so concurrent counters never double count) and adds the
+shard's counts to `results_aggregate`.
+
+ResultsCache serves an election's aggregate from memory.  The body and its
+SHA-256 ETag are built once per version; a request costs a dict lookup, plus
+one indexed SUM(version) query per RESULTS_CACHE_TTL_S to notice batches
+applied by other processes.
+
+Ballot ids are handed out when a ballot is inserted, not when it commits, so
+a slow transaction can commit id N after id N+1 is already visible.  The mark
+therefore only moves up to the newest ballot older than LIVE_COUNT_SETTLE_S:
+any ballot inserted before it has committed or rolled back by then, so
+nothing below the mark can still appear.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import func, insert, select, update  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.db import SessionLocal, worker_dsn
+from common.jobs import JobContext, handler
+from common.models.models import Ballot, ResultsAggregate, ResultsDivision
+from cryptoutils.ballots import ballot_key
+from cryptoutils.pool import crypto_pool
+
+from .decrypt import TALLY_DECRYPT_BATCH
+from .mapreduce import TALLY_SHARD_SIZE, ShardPartial, TallyExecutor, _map_shard, shard_bounds
+
+RESULTS_CACHE_TTL_S = float(os.getenv("RESULTS_CACHE_TTL_S", "1.0"))
+LIVE_COUNT_SETTLE_S = float(os.getenv("LIVE_COUNT_SETTLE_S", "60"))
+RESULTS_CACHE_SIZE = int(os.getenv("RESULTS_CACHE_SIZE", "1000"))
+
+_listeners: list[Callable[[str], None]] = []
+
+
+def subscribe(listener: Callable[[str], None]) -> None:
+    """Call `listener(election_id)` after every batch applied by this process."""
+    _listeners.append(listener)
+
+
+def register_division(db: Session, election_id: str, division: str) -> ResultsDivision:
+    """
+    Register `division` for live counting under `election_id` (idempotent).
+    ValueError if the division already belongs to another election.
+    """
+    owner = db.execute(select(ResultsDivision.election_id).where(ResultsDivision.division == division)).scalar()
+    if owner is None:
+        db.add(ResultsDivision(election_id=election_id, division=division))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # registered concurrently
+        owner = db.execute(select(ResultsDivision.election_id).where(ResultsDivision.division == division)).scalar()
+    if owner != election_id:
+        raise ValueError(f"division {division} belongs to election {owner}")
+    return db.get(ResultsDivision, (election_id, division))
+
+
+def division_row(db: Session, election_id: str, division: str) -> ResultsDivision:
+    """The division's progress row; LookupError unless it is registered under `election_id`."""
+    row = db.get(ResultsDivision, (election_id, division))
+    if row is None:
+        raise LookupError(f"division {division} is not registered for election {election_id}")
+    return row
+
+
+def settled_upto(db: Session, division: str, settle_s: float = LIVE_COUNT_SETTLE_S) -> int:
+    """Highest ballot id of the division below which no ballot can still commit."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settle_s)
+    return db.execute(
+        select(func.coalesce(func.max(Ballot.id), 0)).where(Ballot.election_id == division, Ballot.created_at <= cutoff)
+    ).scalar()
+
+
+def apply_partial(
+    db: Session, election_id: str, division: str, part: ShardPartial, expected_upto: int, upto: int
+) -> bool:
+    """
+    Add one shard's counts if the division is still counted up to
+    `expected_upto`; the mark moves to `upto`.  False if another counter got
+    there first (nothing is applied).
+    """
+    moved = db.execute(
+        update(ResultsDivision)
+        .where(
+            ResultsDivision.election_id == election_id,
+            ResultsDivision.division == division,
+            ResultsDivision.counted_upto == expected_upto,
+        )
+        .values(
+            version=ResultsDivision.version + 1,
+            counted_upto=upto,
+            ballots=ResultsDivision.ballots + part.ballots,
+            informal=ResultsDivision.informal + part.informal,
+            updated_at=datetime.now(timezone.utc),
+        )
+    ).rowcount
+    if not moved:
+        db.rollback()
+        return False
+    # the division row is now locked by this transaction, so read-modify-write is safe
+    have = dict(
+        db.execute(
+            select(ResultsAggregate.candidate_id, ResultsAggregate.votes).where(
+                ResultsAggregate.election_id == election_id, ResultsAggregate.division == division
+            )
+        ).all()
+    )
+    fresh = []
+    for cand, n in part.first_prefs.items():
+        if cand in have:
+            db.execute(
+                update(ResultsAggregate)
+                .where(
+                    ResultsAggregate.election_id == election_id,
+                    ResultsAggregate.division == division,
+                    ResultsAggregate.candidate_id == cand,
+                )
+                .values(votes=ResultsAggregate.votes + n)
+            )
+        else:
+            fresh.append({"election_id": election_id, "division": division, "candidate_id": cand, "votes": n})
+    if fresh:
+        db.execute(insert(ResultsAggregate), fresh)
+    db.commit()
+    results_cache.invalidate(election_id)
+    for listener in _listeners:
+        listener(election_id)
+    return True
+
+
+def count_division(
+    db: Session,
+    election_id: str,
+    division: str,
+    executor: TallyExecutor = crypto_pool,
+    shard_size: int = TALLY_SHARD_SIZE,
+    batch: int = TALLY_DECRYPT_BATCH,
+    progress: Callable[[int, int], None] | None = None,
+    settle_s: float = LIVE_COUNT_SETTLE_S,
+) -> dict:
+    """
+    Count the division's settled ballots after its mark, applying shards as
+    they finish; `progress(shards_applied, shards)` is called after each one.
+    LookupError if the division is not registered for the election.
+    """
+    mark = division_row(db, election_id, division).counted_upto
+    dsn = worker_dsn(db)
+    key_id = ballot_key.key_id
+    bounds = shard_bounds(db, division, shard_size, after_id=mark, upto=settled_upto(db, division, settle_s))
+    futures = [executor.submit(_map_shard, dsn, key_id, division, lo, hi, batch) for lo, hi in bounds]
+    applied = 0
+    for (_lo, hi), fut in zip(bounds, futures):
+        if not apply_partial(db, election_id, division, fut.result(), mark, hi):
+            for rest in futures:
+                rest.cancel()
+            break
+        mark, applied = hi, applied + 1
+        if progress is not None:
+            progress(applied, len(bounds))
+    row = db.get(ResultsDivision, (election_id, division))
+    db.refresh(row)
+    return {
+        "election_id": election_id,
+        "division": division,
+        "version": row.version,
+        "counted_upto": row.counted_upto,
+        "ballots": row.ballots,
+        "informal": row.informal,
+        "batches_applied": applied,
+    }
+
+
+@handler("live_count")
+def live_count_job(ctx: JobContext, election_id: str, division: str) -> dict:
+    with ctx.session_factory() as db:
+        return count_division(db, election_id, division, progress=ctx.progress)
+
+
+# ---------- cached read side ----------
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    body: bytes
+    etag: str          # SHA-256 hex of body (also sent as X-Checksum-SHA256)
+
+
+def build_snapshot(db: Session, election_id: str) -> Snapshot:
+    divisions = db.execute(
+        select(ResultsDivision).where(ResultsDivision.election_id == election_id).order_by(ResultsDivision.division)
+    ).scalars().all()
+    rows = db.execute(
+        select(ResultsAggregate.division, ResultsAggregate.candidate_id, ResultsAggregate.votes)
+        .where(ResultsAggregate.election_id == election_id)
+        .order_by(ResultsAggregate.division, ResultsAggregate.candidate_id)
+    ).all()
+    per_div: dict[str, dict[str, int]] = {}
+    totals: dict[str, int] = {}
+    for div, cand, votes in rows:
+        per_div.setdefault(div, {})[str(cand)] = votes
+        totals[str(cand)] = totals.get(str(cand), 0) + votes
+    version = sum(d.version for d in divisions)
+    payload = {
+        "electionId": election_id,
+        "version": version,
+        "tally": totals,
+        "divisions": {
+            d.division: {
+                "version": d.version,
+                "ballots": d.ballots,
+                "informal": d.informal,
+                "updatedAt": d.updated_at.isoformat() if d.updated_at else None,
+                "tally": per_div.get(d.division, {}),
+            }
+            for d in divisions
+        },
+    }
+    body = json.dumps(payload, sort_keys=True).encode()
+    return Snapshot(version=version, body=body, etag=hashlib.sha256(body).hexdigest())
+
+
+class ResultsCache:
+    def __init__(self, session_factory=SessionLocal, ttl: float = RESULTS_CACHE_TTL_S, max_entries: int = RESULTS_CACHE_SIZE):
+        self._session_factory = session_factory
+        self._ttl = ttl
+        self._max_entries = max_entries
+        # election -> (checked_until, snapshot), LRU order: election_id comes from the caller
+        self._entries: OrderedDict[str, tuple[float, Snapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def invalidate(self, election_id: str) -> None:
+        self._entries.pop(election_id, None)
+
+    def _fresh(self, election_id: str) -> Snapshot | None:
+        entry = self._entries.get(election_id)
+        if entry and entry[0] > time.monotonic():
+            try:
+                self._entries.move_to_end(election_id)
+            except KeyError:  # invalidated meanwhile
+                pass
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def get(self, election_id: str) -> Snapshot:
+        snap = self._fresh(election_id)
+        if snap is not None:
+            return snap
+        with self._lock:
+            snap = self._fresh(election_id)
+            if snap is not None:
+                return snap
+            entry = self._entries.get(election_id)
+            with self._session_factory() as db:
+                version = db.execute(
+                    select(func.coalesce(func.sum(ResultsDivision.version), 0)).where(
+                        ResultsDivision.election_id == election_id
+                    )
+                ).scalar()
+                if entry and entry[1].version == version:
+                    snap = entry[1]
+                else:
+                    snap = build_snapshot(db, election_id)
+                    self.builds += 1
+            self._entries[election_id] = (time.monotonic() + self._ttl, snap)
+            self._entries.move_to_end(election_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return snap
+
+
+results_cache = ResultsCache()
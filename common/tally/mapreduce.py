@@ -0,0 +1,200 @@
+# common/tally/mapreduce.py
+"""
+Sharded (map-reduce) loading of an election's preferences.
+
+Map: the election's ballots are cut into Ballot.id ranges of about
+TALLY_SHARD_SIZE rows.  A worker reads its range straight from the database,
+decrypts it and reduces it to a ShardPartial: first-preference counts plus
+the distinct preference sequences with their multiplicities.  Real ballots
+repeat a lot, so a partial is far smaller than its shard.
+
+Reduce: partials are summed.  Merging is associative and commutative, so
+partials can be combined in any order (or tree-wise, node by node) and the
+result is packed into a weighted PreferenceMatrix that count_irv() and
+count_stv() consume unchanged.  The coordinator never holds ciphertexts.
+
+The executor only needs `submit(fn, *args) -> Future`.  CryptoPool (local
+processes) and InlineExecutor (same process) qualify today; shard jobs carry
+only plain arguments (DSN name, key fingerprint, election, id range) and no
+secrets: workers open the database and load the ballot key from their own
+environment.  A remote executor can be dropped in later.
+"""
+from __future__ import annotations
+
+import os
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Protocol
+
+import numpy as np
+from sqlalchemy import func, select  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.db import worker_dsn, worker_engine
+from common.models.models import Ballot
+from cryptoutils.ballots import ballot_key
+from cryptoutils.pool import crypto_pool
+
+from .ballots import PreferenceMatrix, pack_preferences
+from .decrypt import TALLY_DECRYPT_BATCH, DecodedChunk, decrypt_decode_chunk
+
+TALLY_SHARD_SIZE = int(os.getenv("TALLY_SHARD_SIZE", "200000"))
+
+
+class TallyExecutor(Protocol):
+    def submit(self, fn: Callable, *args: Any) -> Future: ...
+
+
+class InlineExecutor:
+    """Runs shard jobs in the calling process (tests, small elections)."""
+
+    workers = 1
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        fut: Future = Future()
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+        return fut
+
+
+@dataclass
+class ShardPartial:
+    ballots: int = 0
+    informal: int = 0
+    first_prefs: Counter = field(default_factory=Counter)   # candidate id -> ballots
+    sequences: Counter = field(default_factory=Counter)     # preference tuple -> ballots
+
+    def add(self, prefs: list[int] | None) -> None:
+        self.ballots += 1
+        if prefs is None:
+            self.informal += 1
+        else:
+            self.first_prefs[prefs[0]] += 1
+            self.sequences[tuple(prefs)] += 1
+
+    def add_chunk(self, chunk: DecodedChunk) -> None:
+        for p in chunk.prefs:
+            self.add(p)
+        self.ballots += chunk.informal
+        self.informal += chunk.informal
+
+    def merge(self, other: "ShardPartial") -> "ShardPartial":
+        self.ballots += other.ballots
+        self.informal += other.informal
+        self.first_prefs.update(other.first_prefs)
+        self.sequences.update(other.sequences)
+        return self
+
+    def to_dict(self) -> dict:
+        """JSON-safe form for shipping partials between nodes."""
+        return {
+            "ballots": self.ballots,
+            "informal": self.informal,
+            "first_prefs": {str(c): n for c, n in sorted(self.first_prefs.items())},
+            "sequences": [[list(s), n] for s, n in sorted(self.sequences.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ShardPartial":
+        return cls(
+            ballots=d["ballots"],
+            informal=d["informal"],
+            first_prefs=Counter({int(c): n for c, n in d["first_prefs"].items()}),
+            sequences=Counter({tuple(s): n for s, n in d["sequences"]}),
+        )
+
+
+def shard_bounds(
+    db: Session,
+    election_id: str,
+    shard_size: int = TALLY_SHARD_SIZE,
+    after_id: int = 0,
+    upto: int | None = None,
+) -> list[tuple[int, int]]:
+    """
+    Inclusive Ballot.id ranges (after_id < id <= upto) holding `shard_size`
+    ballots of the election each.
+    """
+    in_range = [Ballot.election_id == election_id, Ballot.id > after_id]
+    if upto is not None:
+        in_range.append(Ballot.id <= upto)
+    numbered = (
+        select(Ballot.id.label("id"), func.row_number().over(order_by=Ballot.id).label("rn"))
+        .where(*in_range)
+        .subquery()
+    )
+    starts = db.execute(
+        select(numbered.c.id).where((numbered.c.rn - 1) % shard_size == 0).order_by(numbered.c.id)
+    ).scalars().all()
+    if not starts:
+        return []
+    last = db.execute(select(func.max(Ballot.id)).where(*in_range)).scalar()
+    return [(lo, hi - 1) for lo, hi in zip(starts, starts[1:])] + [(starts[-1], last)]
+
+
+def _map_shard(dsn: str, key_id: str, election_id: str, lo: int, hi: int, batch: int) -> ShardPartial:
+    """
+    Worker: decrypt ballots lo..hi (by id) of one election into a ShardPartial.
+    The key comes from the worker's own BALLOT_AES_KEY; `key_id` only checks
+    that it is the coordinator's.
+    """
+    key = ballot_key.require(key_id)
+    part = ShardPartial()
+    with Session(worker_engine(dsn)) as db:
+        rows = db.execute(
+            select(Ballot.ciphertext, Ballot.nonce)
+            .where(Ballot.election_id == election_id, Ballot.id.between(lo, hi))
+            .execution_options(yield_per=batch)
+        )
+        for chunk in rows.partitions(batch):
+            part.add_chunk(decrypt_decode_chunk(chunk, key, election_id))
+    return part
+
+
+def reduce_partials(partials: Iterable[ShardPartial]) -> ShardPartial:
+    merged = ShardPartial()
+    for part in partials:
+        merged.merge(part)
+    return merged
+
+
+def pack_partial(part: ShardPartial, candidates: Iterable[int] | None = None) -> PreferenceMatrix:
+    """One weighted row per distinct sequence, in sorted order so the digest is stable."""
+    seqs = sorted(part.sequences)
+    pm = pack_preferences(seqs, candidates, weights=[part.sequences[s] for s in seqs])
+    expected = Counter(part.first_prefs)
+    if pm.informal:
+        # sequences naming a candidate outside the list were left out as informal
+        known = set(pm.candidates.tolist())
+        for s in seqs:
+            if not known.issuperset(s):
+                expected[s[0]] -= part.sequences[s]
+        expected = +expected
+    pm.informal += part.informal
+    if pm.n_ballots:
+        # the mapped first preferences must agree with the packed sequences
+        firsts = np.bincount(pm.matrix[:, 0], weights=pm.weights, minlength=len(pm.candidates))
+        if {int(pm.candidates[c]): int(firsts[c]) for c in np.flatnonzero(firsts)} != dict(expected):
+            raise RuntimeError("first-preference counts disagree with merged sequences")
+    return pm
+
+
+def load_preferences_sharded(
+    db: Session,
+    election_id: str,
+    candidates: Iterable[int] | None = None,
+    executor: TallyExecutor = crypto_pool,
+    shard_size: int = TALLY_SHARD_SIZE,
+    batch: int = TALLY_DECRYPT_BATCH,
+) -> PreferenceMatrix:
+    """Map every shard on `executor`, merge the partials and pack the result."""
+    dsn = worker_dsn(db)
+    key_id = ballot_key.key_id
+    futures = [
+        executor.submit(_map_shard, dsn, key_id, election_id, lo, hi, batch)
+        for lo, hi in shard_bounds(db, election_id, shard_size)
+    ]
+    return pack_partial(reduce_partials(f.result() for f in futures), candidates)
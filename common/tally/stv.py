@@ -0,0 +1,168 @@
+# common/tally/stv.py
+"""
+Multi-seat single transferable vote (Senate-style) over a PreferenceMatrix.
+
+Arithmetic is fixed-point: every ballot carries an integer transfer value
+in units of 1/SCALE of a vote, so results are exact and reproducible on any
+machine.  Quota is Droop: floor(valid / (seats + 1)) + 1.
+
+Surpluses use the weighted inclusive Gregory method: all ballots of an
+elected candidate move on at
+
+    new_tv = tv * floor(surplus * SCALE / votes) // SCALE
+
+and the fractions dropped by the floors are reported as `loss`.  Surpluses
+are transferred largest first, one per step; with no surplus pending the
+lowest continuing candidate is excluded (ties as in IRV).  Each step is one
+np.bincount plus a vectorized pointer advance for the ballots that move.
+
+Every step is appended to `log`.  The log begins with the input digest and
+parameters; replay_stv() re-runs the count and checks it step for step.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import IO
+
+import numpy as np
+
+from .ballots import PreferenceMatrix, advance, pick_lowest
+
+SCALE = 1_000_000
+
+
+@dataclass
+class STVResult:
+    elected: list[int]
+    quota: int
+    seats: int
+    log: list[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "method": "STV",
+            "seats": self.seats,
+            "quota": self.quota,
+            "scale": SCALE,
+            "elected": self.elected,
+            "steps": self.log,
+        }
+
+    def write_log(self, fp: IO[str]) -> None:
+        """One JSON object per line: the audit log replay_stv() consumes."""
+        for entry in self.log:
+            fp.write(json.dumps(entry, separators=(",", ":"), sort_keys=True) + "\n")
+
+
+def count_stv(pm: PreferenceMatrix, seats: int) -> STVResult:
+    matrix, weights = pm.matrix, pm.weights
+    n, n_cand = matrix.shape[0], len(pm.candidates)
+    ids = [int(c) for c in pm.candidates]
+    if not 0 < seats <= n_cand:
+        raise ValueError(f"seats must be between 1 and {n_cand}")
+
+    total = int(weights.sum())
+    quota = total // (seats + 1) + 1
+    quota_fp = quota * SCALE
+    total_fp = total * SCALE
+    if total_fp >= 2**53:
+        raise ValueError("ballot total too large for exact fixed-point counting")
+
+    continuing = np.ones(n_cand, dtype=bool)
+    ptr = np.zeros(n, dtype=np.int64)
+    cur = matrix[:, 0].copy() if matrix.shape[1] else np.full(n, -1, dtype=np.int32)
+    tv = np.full(n, SCALE, dtype=np.int64)          # transfer value per ballot
+    elected: list[int] = []
+    kept: dict[int, int] = {}                       # elected (surplus done) -> retained value
+    pending: list[int] = []                         # elected, surplus not yet transferred
+    history: list[np.ndarray] = []
+
+    log: list[dict] = [{
+        "step": 0, "action": "start", "digest": pm.digest(), "ballots": n,
+        "total": total, "seats": seats, "quota": quota, "scale": SCALE,
+        "candidates": ids,
+    }]
+
+    def tallies() -> np.ndarray:
+        live = cur >= 0
+        # float64 sums are exact below 2**53 (checked above)
+        return np.rint(
+            np.bincount(cur[live], weights=(tv[live] * weights[live]).astype(np.float64), minlength=n_cand)
+        ).astype(np.int64)
+
+    def record(action: str, t: np.ndarray, **extra) -> None:
+        shown = {ids[c]: int(t[c]) for c in np.flatnonzero(continuing)}
+        shown.update({ids[c]: int(t[c]) for c in pending})
+        shown.update({ids[c]: v for c, v in kept.items()})
+        live = cur >= 0
+        exhausted = int((tv[~live] * weights[~live]).sum())
+        held = int(t[continuing].sum()) + sum(int(t[c]) for c in pending) + sum(kept.values())
+        log.append({
+            "step": len(log), "action": action, **extra,
+            "tallies": shown, "exhausted": exhausted, "loss": total_fp - held - exhausted,
+        })
+
+    t = tallies()
+    while True:
+        newly = [c for c in np.flatnonzero(continuing) if t[c] >= quota_fp]
+        for c in sorted(newly, key=lambda c: (-t[c], ids[c])):
+            if len(elected) == seats:
+                break
+            continuing[c] = False
+            elected.append(ids[c])
+            pending.append(c)
+            record("elect", t, candidate=ids[c], votes=int(t[c]))
+        if len(elected) == seats:
+            break
+        if int(continuing.sum()) + len(elected) <= seats:
+            rest = sorted(np.flatnonzero(continuing), key=lambda c: (-t[c], ids[c]))
+            for c in rest:
+                continuing[c] = False
+                elected.append(ids[c])
+                kept[int(c)] = int(t[c])
+            record("elect_remaining", t, candidates=[ids[c] for c in rest])
+            break
+
+        if pending:
+            c = max(pending, key=lambda c: (t[c], -ids[c]))
+            pending.remove(c)
+            surplus = int(t[c]) - quota_fp
+            factor = surplus * SCALE // int(t[c]) if t[c] else 0
+            idx = np.flatnonzero(cur == c)
+            tv[idx] = tv[idx] * factor // SCALE
+            kept[int(c)] = quota_fp
+            advance(matrix, ptr, cur, idx, continuing)
+            t_next = tallies()
+            record("surplus", t_next, candidate=ids[c], surplus=surplus,
+                   transfer_value=factor, ballots_moved=int(idx.size))
+        else:
+            c, rule = pick_lowest(t, continuing, history)
+            continuing[c] = False
+            idx = np.flatnonzero(cur == c)
+            advance(matrix, ptr, cur, idx, continuing)
+            t_next = tallies()
+            record("exclude", t_next, candidate=ids[c], votes=int(t[c]),
+                   tie_break=rule, ballots_moved=int(idx.size))
+        history.append(t)
+        t = t_next
+
+    return STVResult(elected=elected, quota=quota, seats=seats, log=log)
+
+
+def replay_stv(pm: PreferenceMatrix, log: list[dict]) -> tuple[bool, int | None]:
+    """
+    Re-run a count from its logged parameters and compare step by step.
+    Returns (ok, first differing step or None).  Fails at step 0 if the
+    ballots are not the ones the log was produced from.
+    """
+    if not log or log[0].get("digest") != pm.digest():
+        return False, 0
+    again = count_stv(pm, log[0]["seats"]).log
+    norm = lambda e: json.loads(json.dumps(e, sort_keys=True))  # int keys -> str, as in the file
+    for i, (a, b) in enumerate(zip(again, log)):
+        if norm(a) != norm(b):
+            return False, i
+    if len(again) != len(log):
+        return False, min(len(again), len(log))
+    return True, None
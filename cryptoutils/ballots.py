@@ -4,6 +4,8 @@ from __future__ import annotations
 import os
 import json
 import hashlib
+import threading
+from typing import Iterable
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 
@@ -24,6 +26,85 @@ def _get_aes_key() -> bytes:
         raise ValueError("BALLOT_AES_KEY must be valid hex.")
 
 
+class BallotKeyContext:
+    """
+    Loads and validates BALLOT_AES_KEY once and keeps the ready AESGCM object.
+    AESGCM is stateless per call, so one context is shared by all threads.
+    Call reload() after rotating the key in the environment.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key: bytes | None = None
+        self._aead: AESGCM | None = None
+
+    @property
+    def aead(self) -> AESGCM:
+        aead = self._aead
+        if aead is None:
+            with self._lock:
+                if self._aead is None:
+                    self._key = _get_aes_key()
+                    self._aead = AESGCM(self._key)
+                aead = self._aead
+        return aead
+
+    @property
+    def key(self) -> bytes:
+        """Raw key bytes, for handing batches to worker processes (cryptoutils/pool.py)."""
+        self.aead  # loads the key on first use
+        return self._key  # type: ignore[return-value]
+
+    @property
+    def key_id(self) -> str:
+        """Short SHA-256 fingerprint of the key: names it to worker processes without revealing it."""
+        return hashlib.sha256(b"ballot-key-id|" + self.key).hexdigest()[:16]
+
+    def require(self, key_id: str) -> bytes:
+        """
+        Raw key for a worker process, checked against the coordinator's key_id;
+        re-reads the environment once if the key was rotated since it was loaded.
+        """
+        if self.key_id != key_id:
+            self.reload()
+            if self.key_id != key_id:
+                raise RuntimeError(f"ballot key {key_id} is not configured in this process")
+        return self.key
+
+    def reload(self) -> None:
+        """Re-read and validate the key; the old context stays if it is invalid."""
+        key = _get_aes_key()
+        aead = AESGCM(key)
+        with self._lock:
+            self._key, self._aead = key, aead
+
+    def encrypt(self, blob: bytes) -> tuple[bytes, bytes]:
+        nonce = os.urandom(12)
+        return self.aead.encrypt(nonce, blob, None), nonce
+
+    def decrypt(self, ct: bytes, nonce: bytes) -> bytes:
+        return self.aead.decrypt(nonce, ct, None)
+
+    def encrypt_many(self, blobs: Iterable[bytes]) -> list[tuple[bytes, bytes]]:
+        """Encrypt a batch with one key lookup and one urandom() read for all nonces."""
+        blobs = list(blobs)
+        aead = self.aead
+        nonces = os.urandom(12 * len(blobs))
+        out = []
+        for i, blob in enumerate(blobs):
+            nonce = nonces[12 * i : 12 * i + 12]
+            out.append((aead.encrypt(nonce, blob, None), nonce))
+        return out
+
+    def decrypt_many(self, items: Iterable[tuple[bytes, bytes]]) -> list[bytes]:
+        """Decrypt (ciphertext, nonce) pairs; raises InvalidTag on the first bad one."""
+        aead = self.aead
+        return [aead.decrypt(nonce, ct, None) for ct, nonce in items]
+
+
+ballot_key = BallotKeyContext()
+
+
 def canonical_prefs(prefs: list[int], election_id: str, ts: str) -> bytes:
     """
     Produces a stable, order-preserving representation of the ballot.
@@ -46,10 +127,12 @@ def encrypt_ballot(blob: bytes) -> tuple[bytes, bytes]:
     AES-GCM encryption (confidentiality + integrity).
     Returns (ciphertext, nonce).
     """
-    key = _get_aes_key()
-    nonce = os.urandom(12)
-    ct = AESGCM(key).encrypt(nonce, blob, None)
-    return ct, nonce
+    return ballot_key.encrypt(blob)
+
+
+def decrypt_ballot(ct: bytes, nonce: bytes) -> bytes:
+    """Inverse of encrypt_ballot(); raises InvalidTag if the ballot was altered."""
+    return ballot_key.decrypt(ct, nonce)
 
 
 def hash_chain(prev_hash: bytes, ct: bytes, nonce: bytes) -> bytes:
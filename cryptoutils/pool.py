@@ -0,0 +1,153 @@
+"""
+cryptoutils/pool.py
+Bounded worker pools for CPU-bound crypto (AES-GCM, SHA-256 chains, bcrypt).
+
+Two executors share one in-flight budget:
+  - a process pool for bulk work that holds the GIL (tally decryption,
+    chain verification); jobs are fanned out in chunks across cores;
+  - a thread pool for libraries that release the GIL (bcrypt, hashlib on
+    large buffers, OpenSSL AEAD on large buffers).
+
+Callers get concurrent.futures.Future objects (or awaitables via run()/
+run_thread()).  When CRYPTO_POOL_MAX_PENDING jobs are in flight, sync
+submitters block and async submitters get CryptoPoolBusy, so a burst can
+never queue unbounded work behind the request threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+CRYPTO_POOL_WORKERS = int(os.getenv("CRYPTO_POOL_WORKERS", "0")) or (os.cpu_count() or 1)
+CRYPTO_POOL_MAX_PENDING = int(os.getenv("CRYPTO_POOL_MAX_PENDING", "1024"))
+CRYPTO_POOL_CHUNK = int(os.getenv("CRYPTO_POOL_CHUNK", "2048"))
+
+
+class CryptoPoolBusy(RuntimeError):
+    """Raised to async callers when the pool's in-flight budget is exhausted."""
+
+
+class CryptoPool:
+    def __init__(
+        self,
+        workers: int = CRYPTO_POOL_WORKERS,
+        max_pending: int = CRYPTO_POOL_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._procs: ProcessPoolExecutor | None = None
+        self._threads: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+
+    # ---------- executors (created on first use) ----------
+    def _process_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._procs is None:
+                self._procs = ProcessPoolExecutor(max_workers=self.workers)
+            return self._procs
+
+    def _thread_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="crypto"
+                )
+            return self._threads
+
+    # ---------- submission ----------
+    def _acquire(self, block: bool) -> None:
+        if not self._slots.acquire(blocking=block):
+            raise CryptoPoolBusy(f"crypto pool saturated ({self.max_pending} jobs in flight)")
+        with self._lock:
+            self._pending += 1
+            self.submitted += 1
+
+    def _done(self, _fut: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def _submit(self, executor, fn: Callable, args: tuple, block: bool) -> Future:
+        self._acquire(block)
+        try:
+            fut = executor.submit(fn, *args)
+        except BaseException:
+            self._done(Future())
+            raise
+        fut.add_done_callback(self._done)
+        return fut
+
+    def submit(self, fn: Callable, *args: Any, block: bool = True) -> Future:
+        """Run a picklable module-level function in a worker process."""
+        return self._submit(self._process_executor(), fn, args, block)
+
+    def submit_thread(self, fn: Callable, *args: Any, block: bool = True) -> Future:
+        """Run a GIL-releasing function on the crypto thread pool."""
+        return self._submit(self._thread_executor(), fn, args, block)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, block=False))
+
+    async def run_thread(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit_thread(fn, *args, block=False))
+
+    def map_chunks(
+        self, fn: Callable, items: Sequence, *args: Any, chunk_size: int = CRYPTO_POOL_CHUNK
+    ) -> list[Future]:
+        """Fan `items` out as fn(chunk, *args) jobs; results come back in order."""
+        return [
+            self.submit(fn, items[i : i + chunk_size], *args)
+            for i in range(0, len(items), chunk_size)
+        ]
+
+    # ---------- introspection / lifecycle ----------
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            procs, threads = self._procs, self._threads
+            self._procs = self._threads = None
+        for ex in (procs, threads):
+            if ex is not None:
+                ex.shutdown(wait=wait)
+
+
+crypto_pool = CryptoPool()
+
+
+# ---------- worker functions (module-level so they pickle) ----------
+_AEADS: dict[bytes, AESGCM] = {}
+
+
+def _aead(key: bytes) -> AESGCM:
+    # one AESGCM per key per worker process
+    aead = _AEADS.get(key)
+    if aead is None:
+        aead = _AEADS[key] = AESGCM(key)
+    return aead
+
+
+def decrypt_chunk(items: Sequence[tuple[bytes, bytes]], key: bytes) -> list[bytes]:
+    """Worker: decrypt (ciphertext, nonce) pairs; shared by the tally fan-outs."""
+    aead = _aead(key)
+    return [aead.decrypt(nonce, ct, None) for ct, nonce in items]
+
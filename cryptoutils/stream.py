@@ -0,0 +1,185 @@
+"""
+cryptoutils/stream.py
+Chunked, streaming AES-256-GCM container for large files.
+
+Layout:
+    header   = MAGIC(8) | version(1) | chunk_size(u32) | nonce_prefix(7)
+    record_i = length(u32) | AESGCM(nonce_i, chunk_i, aad=header)
+    trailer  = final record carrying (total_plaintext_bytes u64, chunk_count u64)
+
+nonce_i = nonce_prefix(7) | i (u32, big-endian) | final_flag(1)
+Deriving the nonce from the chunk index authenticates the order of chunks;
+the final flag on the trailer makes truncation detectable.  Memory use is
+bounded by one chunk on both the writing and the reading side.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import BinaryIO, Iterator
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"EVSTRM\x00\x01"
+VERSION = 1
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+_HEADER = struct.Struct(">8sBI7s")
+_LEN = struct.Struct(">I")
+_TRAILER = struct.Struct(">QQ")
+TAG_LEN = 16
+
+
+def _nonce(prefix: bytes, index: int, final: bool) -> bytes:
+    return prefix + struct.pack(">IB", index, 1 if final else 0)
+
+
+class StreamFormatError(ValueError):
+    """The stream is malformed, truncated or was not produced by this module."""
+
+
+class EncryptedStreamWriter:
+    """
+    File-like writer: buffers plaintext and emits one sealed record per chunk.
+    Always call close() (or use as a context manager) to write the trailer.
+    """
+
+    def __init__(self, fp: BinaryIO, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if len(key) != 32:
+            raise ValueError("stream key must be 32 bytes (AES-256)")
+        self._fp = fp
+        self._aead = AESGCM(key)
+        self._chunk_size = chunk_size
+        self._prefix = os.urandom(7)
+        self._header = _HEADER.pack(MAGIC, VERSION, chunk_size, self._prefix)
+        self._buf = bytearray()
+        self._index = 0
+        self._total = 0
+        self._closed = False
+        fp.write(self._header)
+
+    def _seal(self, data: bytes | memoryview, final: bool) -> None:
+        ct = self._aead.encrypt(_nonce(self._prefix, self._index, final), data, self._header)
+        self._fp.write(_LEN.pack(len(ct)))
+        self._fp.write(ct)
+        self._index += 1
+
+    def write(self, data: bytes) -> int:
+        if self._closed:
+            raise ValueError("write to closed EncryptedStreamWriter")
+        self._total += len(data)
+        view = memoryview(data)
+        if self._buf:
+            # top up the pending chunk first
+            take = self._chunk_size - len(self._buf)
+            self._buf += view[:take]
+            view = view[take:]
+            if len(self._buf) < self._chunk_size:
+                return len(data)
+            self._seal(bytes(self._buf), final=False)
+            self._buf.clear()
+        # whole chunks are sealed straight from the caller's buffer (no copy)
+        while len(view) >= self._chunk_size:
+            self._seal(view[: self._chunk_size], final=False)
+            view = view[self._chunk_size :]
+        self._buf += view
+        return len(data)
+
+    def flush(self) -> None:
+        """
+        Seal any buffered plaintext as a (short) record and push it to disk,
+        so everything written so far survives a crash of the caller.
+        """
+        if self._closed:
+            raise ValueError("flush of closed EncryptedStreamWriter")
+        if self._buf:
+            self._seal(bytes(self._buf), final=False)
+            self._buf.clear()
+        self._fp.flush()
+        try:
+            os.fsync(self._fp.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass  # in-memory or non-file stream
+
+    def close(self) -> dict:
+        if self._closed:
+            return self.summary()
+        if self._buf:
+            self._seal(bytes(self._buf), final=False)
+            self._buf.clear()
+        chunks = self._index
+        self._seal(_TRAILER.pack(self._total, chunks), final=True)
+        self._closed = True
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {"bytes": self._total, "chunks": self._index - (1 if self._closed else 0)}
+
+    def __enter__(self) -> "EncryptedStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # still seal what was written, but never mask the original error
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _read_exact(fp: BinaryIO, n: int) -> bytes:
+    buf = fp.read(n)
+    if len(buf) != n:
+        raise StreamFormatError("stream truncated")
+    return buf
+
+
+def iter_decrypted(fp: BinaryIO, key: bytes) -> Iterator[bytes]:
+    """
+    Yield plaintext chunks, verifying each one before it is released.
+    Raises StreamFormatError on truncation/reordering and
+    cryptography.exceptions.InvalidTag on tampering or a wrong key.
+    """
+    header = _read_exact(fp, _HEADER.size)
+    magic, version, chunk_size, prefix = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise StreamFormatError("not an encrypted stream (bad magic/version)")
+
+    aead = AESGCM(key)
+    max_record = chunk_size + TAG_LEN
+    index = 0
+    total = 0
+    while True:
+        (length,) = _LEN.unpack(_read_exact(fp, _LEN.size))
+        if length > max_record:
+            raise StreamFormatError(f"record {index} larger than chunk size")
+        ct = _read_exact(fp, length)
+        if length == _TRAILER.size + TAG_LEN:
+            # could be the trailer; only the final nonce will authenticate it
+            try:
+                pt = aead.decrypt(_nonce(prefix, index, True), ct, header)
+            except Exception:
+                pt = None
+            if pt is not None:
+                exp_total, exp_chunks = _TRAILER.unpack(pt)
+                if exp_total != total or exp_chunks != index:
+                    raise StreamFormatError("trailer does not match stream contents")
+                if fp.read(1):
+                    raise StreamFormatError("data after trailer")
+                return
+        pt = aead.decrypt(_nonce(prefix, index, False), ct, header)
+        total += len(pt)
+        index += 1
+        yield pt
+
+
+def decrypt_to(fp_in: BinaryIO, fp_out: BinaryIO, key: bytes) -> dict:
+    """Stream-decrypt `fp_in` into `fp_out`; returns byte and chunk counts."""
+    total = chunks = 0
+    for pt in iter_decrypted(fp_in, key):
+        fp_out.write(pt)
+        total += len(pt)
+        chunks += 1
+    return {"bytes": total, "chunks": chunks}
@@ -0,0 +1,15 @@
+-- Signed chain checkpoints published at /results/audit/checkpoints.
+-- signature = Ed25519 over canonical JSON of
+--   {election_id, height, merkle_root, timestamp, tip_hash}
+CREATE TABLE IF NOT EXISTS chain_checkpoints (
+  id          SERIAL PRIMARY KEY,
+  election_id VARCHAR(64)  NOT NULL,
+  height      INTEGER      NOT NULL,
+  tip_hash    VARCHAR(64)  NOT NULL,
+  merkle_root VARCHAR(64)  NOT NULL,
+  timestamp   VARCHAR(40)  NOT NULL,
+  signature   VARCHAR(128) NOT NULL,
+  public_key  VARCHAR(64)  NOT NULL,
+  CONSTRAINT uq_checkpoint_election_height UNIQUE (election_id, height)
+);
+CREATE INDEX IF NOT EXISTS ix_chain_checkpoints_election_id ON chain_checkpoints (election_id);
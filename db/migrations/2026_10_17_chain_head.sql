@@ -0,0 +1,9 @@
+-- Single-row pointer to the head of ballot_chain (common/chain/appender.py).
+-- Appenders advance it with a compare-and-swap on `version`; the first
+-- append bootstraps the row from the newest existing link.
+CREATE TABLE IF NOT EXISTS chain_head (
+  id        INTEGER PRIMARY KEY,
+  head_hash BYTEA   NOT NULL,
+  height    INTEGER NOT NULL DEFAULT 0,
+  version   INTEGER NOT NULL DEFAULT 0
+);
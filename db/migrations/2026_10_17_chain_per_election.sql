@@ -0,0 +1,25 @@
+-- Per-election hash chains: every election gets its own head and sequence.
+-- Rows written before this migration keep election_id = NULL and stay on the
+-- legacy global chain; election-scoped audit endpoints only see new rows.
+ALTER TABLE ballot_chain ADD COLUMN IF NOT EXISTS election_id VARCHAR(64);
+ALTER TABLE ballot_chain ADD COLUMN IF NOT EXISTS seq INTEGER;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_chain_election_seq
+  ON ballot_chain (election_id, seq);
+
+-- chain_head is now keyed by election (was a single id=1 row).  The old
+-- global head is kept as chain_head_legacy; re-running this file is a no-op.
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_name = 'chain_head' AND column_name = 'id') THEN
+    ALTER TABLE chain_head RENAME TO chain_head_legacy;
+    ALTER TABLE chain_head_legacy RENAME CONSTRAINT chain_head_pkey TO chain_head_legacy_pkey;
+  END IF;
+END$$;
+
+CREATE TABLE IF NOT EXISTS chain_head (
+  election_id VARCHAR(64) PRIMARY KEY,
+  head_hash   BYTEA   NOT NULL,
+  height      INTEGER NOT NULL DEFAULT 0,
+  version     INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,9 @@
+-- Verified prefix of each election's chain; audit verify resumes after it.
+CREATE TABLE IF NOT EXISTS chain_verify_checkpoints (
+  election_id     VARCHAR(64) PRIMARY KEY,
+  last_seq        INTEGER     NOT NULL,
+  last_id         INTEGER     NOT NULL,
+  last_hash       BYTEA       NOT NULL,
+  last_created_at TIMESTAMPTZ,
+  verified_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,26 @@
+-- Durable background jobs (common/jobs.py), polled at /api/jobs/{id}.
+-- A running job holds (type, slot) with slot < its type's concurrency limit;
+-- NULL slots (queued / finished jobs) never collide.
+CREATE TABLE IF NOT EXISTS jobs (
+  id           SERIAL PRIMARY KEY,
+  type         VARCHAR(64)  NOT NULL,
+  payload      TEXT         NOT NULL DEFAULT '{}',
+  status       VARCHAR(16)  NOT NULL DEFAULT 'QUEUED',
+  dedupe_key   VARCHAR(128) UNIQUE,
+  attempts     INTEGER      NOT NULL DEFAULT 0,
+  max_attempts INTEGER      NOT NULL DEFAULT 3,
+  run_after    TIMESTAMPTZ  NOT NULL DEFAULT now(),
+  slot         INTEGER,
+  worker       VARCHAR(128),
+  heartbeat_at TIMESTAMPTZ,
+  progress     INTEGER      NOT NULL DEFAULT 0,
+  total        INTEGER,
+  result       TEXT,
+  error        TEXT,
+  created_at   TIMESTAMPTZ  NOT NULL DEFAULT now(),
+  finished_at  TIMESTAMPTZ,
+  CONSTRAINT uq_job_type_slot UNIQUE (type, slot)
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_type ON jobs (type);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS ix_jobs_run_after ON jobs (run_after);
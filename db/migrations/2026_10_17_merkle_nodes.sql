@@ -0,0 +1,11 @@
+-- Incremental Merkle tree over ballot receipts, one tree per election.
+-- level 0 = leaves (idx = ballot_chain.seq - 1); nodes are rewritten only
+-- along the right edge as ballots are appended.  Existing chains are
+-- backfilled lazily on their next append (common/chain/merkle.py).
+CREATE TABLE IF NOT EXISTS merkle_nodes (
+  election_id VARCHAR(64) NOT NULL,
+  level       INTEGER     NOT NULL,
+  idx         INTEGER     NOT NULL,
+  hash        BYTEA       NOT NULL,
+  PRIMARY KEY (election_id, level, idx)
+);
@@ -0,0 +1,7 @@
+-- Approval counter and quorum on result actions (common/approvals.py).
+-- approvals_count is updated in the same transaction as each approvals insert.
+ALTER TABLE result_actions ADD COLUMN IF NOT EXISTS approvals_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE result_actions ADD COLUMN IF NOT EXISTS quorum INTEGER NOT NULL DEFAULT 2;
+
+UPDATE result_actions a
+   SET approvals_count = (SELECT COUNT(*) FROM approvals p WHERE p.action_id = a.id);
@@ -0,0 +1,23 @@
+-- Live results: first-preference counts per (election, division, candidate)
+-- and per-division progress; served by GET /api/results/latest.
+CREATE TABLE IF NOT EXISTS results_aggregate (
+  election_id  VARCHAR(64) NOT NULL,
+  division     VARCHAR(64) NOT NULL,
+  candidate_id INTEGER     NOT NULL,
+  votes        INTEGER     NOT NULL DEFAULT 0,
+  PRIMARY KEY (election_id, division, candidate_id)
+);
+
+CREATE TABLE IF NOT EXISTS results_divisions (
+  election_id  VARCHAR(64) NOT NULL,
+  division     VARCHAR(64) NOT NULL,
+  version      INTEGER     NOT NULL DEFAULT 0,
+  counted_upto INTEGER     NOT NULL DEFAULT 0,
+  ballots      INTEGER     NOT NULL DEFAULT 0,
+  informal     INTEGER     NOT NULL DEFAULT 0,
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (election_id, division)
+);
+
+-- a division (contest) is counted into exactly one election
+CREATE UNIQUE INDEX IF NOT EXISTS uq_results_division ON results_divisions (division);
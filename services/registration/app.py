@@ -1,6 +1,6 @@
 from fastapi import FastAPI  # type: ignore
 from contextlib import asynccontextmanager
-from common.db import engine, Base
+from common.db import engine, Base, dispose_async_engine
 from common.models.models import *  # noqa
 from .routes import router
 from .routes_ballot import router as ballot_router  # 🟢 NEW: SR-09 ballots
@@ -21,6 +21,7 @@ async def lifespan(app: FastAPI):
         Base.metadata.create_all(bind=engine)
         print("✅ Database tables created.")
     yield
+    await dispose_async_engine()
 
 app = FastAPI(
     lifespan=lifespan,
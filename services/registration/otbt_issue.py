@@ -0,0 +1,161 @@
+# services/registration/otbt_issue.py
+"""
+Bulk issuance of one-time ballot tokens (OTBTs, SR-10).
+
+Tokens are generated from one urandom() call per batch and inserted with
+COPY on PostgreSQL (multi-row INSERT elsewhere).  The voter_ref -> token
+mapping for the mailing house is streamed into a chunked AES-GCM file
+(cryptoutils/stream.py), so memory stays bounded by one batch.
+
+Each batch's mapping rows are written and flushed *before* its tokens are
+committed: a token is never live in the database without a mapping line.
+If the commit fails, the batch is rolled back and a `#rolled-back,<n>` line
+marks the preceding n mapping lines as not issued.
+
+    python -m services.registration.otbt_issue --count 1000000 \\
+        --expires 2026-11-01T00:00:00+00:00 --out tokens.enc
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert  # type: ignore
+
+from common.db import SessionLocal
+from common.models.models import BallotToken
+from cryptoutils.stream import EncryptedStreamWriter
+
+OTBT_BATCH_SIZE = int(os.getenv("OTBT_BATCH_SIZE", "50000"))
+TOKEN_BYTES = 32  # 64 hex chars == BallotToken.token length
+
+
+def _export_key() -> bytes:
+    key_hex = os.environ.get("OTBT_EXPORT_KEY", "")
+    if len(key_hex) != 64:
+        raise RuntimeError("OTBT_EXPORT_KEY must be set to a 64-hex string (32-byte key)")
+    return bytes.fromhex(key_hex)
+
+
+def generate_tokens(n: int) -> list[str]:
+    """n random 256-bit tokens, hex encoded, from a single CSPRNG read."""
+    raw = os.urandom(TOKEN_BYTES * n).hex()
+    step = TOKEN_BYTES * 2
+    return [raw[i : i + step] for i in range(0, len(raw), step)]
+
+
+def _batches(it: Iterable[str], size: int) -> Iterator[list[str]]:
+    it = iter(it)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _copy_rows(db, rows: list[tuple[str, str]], exp_iso: str) -> None:
+    """PostgreSQL fast path: COPY ... FROM STDIN (csv)."""
+    buf = io.StringIO()
+    csv.writer(buf).writerows((token, voter_ref, exp_iso) for voter_ref, token in rows)
+    buf.seek(0)
+    cur = db.connection().connection.cursor()
+    try:
+        cur.copy_expert(
+            "COPY ballot_tokens (token, voter_ref, exp_at) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cur.close()
+
+
+def issue_tokens(
+    voter_refs: Iterable[str],
+    exp_at: datetime,
+    out,
+    key: bytes,
+    batch_size: int = OTBT_BATCH_SIZE,
+    session_factory=SessionLocal,
+) -> dict:
+    """
+    Mint one token per voter_ref, persist them and stream the mapping
+    ("voter_ref,token" lines) into `out` (a binary file) encrypted under `key`.
+    Each batch is committed on its own, after its mapping rows are flushed
+    to `out`, so a crash loses at most one batch and never leaves committed
+    tokens without a mapping.  A failed commit is marked in the mapping
+    (`#rolled-back,<n>`) and re-raised.
+    """
+    exp_iso = exp_at.isoformat()
+    issued = 0
+    t0 = time.perf_counter()
+
+    with EncryptedStreamWriter(out, key) as enc, session_factory() as db:
+        use_copy = db.get_bind().dialect.name == "postgresql"
+        mapping = io.StringIO()
+        for refs in _batches(voter_refs, batch_size):
+            tokens = generate_tokens(len(refs))
+            rows = list(zip(refs, tokens))
+            if use_copy:
+                _copy_rows(db, rows, exp_iso)
+            else:
+                db.execute(
+                    insert(BallotToken),
+                    [{"token": t, "voter_ref": r, "exp_at": exp_at} for r, t in rows],
+                )
+            mapping.seek(0)
+            mapping.truncate()
+            csv.writer(mapping, lineterminator="\n").writerows(rows)
+            enc.write(mapping.getvalue().encode("utf-8"))
+            enc.flush()
+            try:
+                db.commit()
+            except BaseException:
+                db.rollback()
+                enc.write(f"#rolled-back,{len(rows)}\n".encode("utf-8"))
+                raise
+            issued += len(rows)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "issued": issued,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_sec": round(issued / elapsed, 1) if elapsed else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Bulk-issue one-time ballot tokens")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--voters", help="file with one voter_ref per line")
+    src.add_argument("--count", type=int, help="issue N tokens for synthetic voter refs")
+    ap.add_argument("--expires", required=True, help="ISO-8601 expiry, e.g. 2026-11-01T00:00:00+00:00")
+    ap.add_argument("--out", required=True, help="encrypted mapping file to write")
+    ap.add_argument("--batch-size", type=int, default=OTBT_BATCH_SIZE)
+    args = ap.parse_args(argv)
+
+    exp_at = datetime.fromisoformat(args.expires)
+    if exp_at.tzinfo is None:
+        exp_at = exp_at.replace(tzinfo=timezone.utc)
+
+    if args.voters:
+        fh = open(args.voters, encoding="utf-8")
+        refs: Iterable[str] = (line.strip() for line in fh if line.strip())
+    else:
+        fh = None
+        refs = (f"V{i:09d}" for i in range(args.count))
+
+    try:
+        with open(args.out, "wb") as out:
+            stats = issue_tokens(refs, exp_at, out, _export_key(), args.batch_size)
+    finally:
+        if fh:
+            fh.close()
+    print(f"✅ Issued {stats['issued']} tokens in {stats['elapsed_s']}s "
+          f"({stats['rows_per_sec']} rows/sec) -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
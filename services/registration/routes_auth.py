@@ -13,6 +13,7 @@ import jwt  # type: ignore  # PyJWT
 from common.db import get_session
 from common.models.models import UserAuth
 from cryptoutils.encryption import encrypt_bytes, decrypt_bytes
+from cryptoutils.pool import crypto_pool
 
 # --- Config ---
 JWT_SECRET = os.environ.get("JWT_SECRET", "dev-secret")
@@ -45,11 +46,13 @@ class TokenOut(BaseModel):
     token_type: str = "bearer"
 
 # ---------- Helpers ----------
+# bcrypt releases the GIL; running it on the bounded crypto pool caps how many
+# hashes compete for the CPU instead of letting every request thread start one.
 def _hash(pw: str) -> str:
-    return pwd_ctx.hash(pw)
+    return crypto_pool.submit_thread(pwd_ctx.hash, pw).result()
 
 def _verify(pw: str, h: str) -> bool:
-    return pwd_ctx.verify(pw, h)
+    return crypto_pool.submit_thread(pwd_ctx.verify, pw, h).result()
 
 def _make_jwt(sub: str) -> str:
     now = int(time.time())
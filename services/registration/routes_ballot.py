@@ -2,16 +2,21 @@
 from __future__ import annotations
 
 from hashlib import sha256
-from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Path  # type: ignore
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request  # type: ignore
+from fastapi.responses import StreamingResponse              # type: ignore
 from pydantic import BaseModel                                # type: ignore
+from sqlalchemy import select                                 # type: ignore
 from sqlalchemy.orm import Session                            # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession               # type: ignore
 
-from common.db import get_session
-from common.models.models import Ballot, BallotChain
-from common.crypto.kms import LocalKMS                        # type: ignore
+from common.db import get_session, get_async_session
+from common.models.models import Ballot
+from common.crypto.kms import default_kms                      # type: ignore
 from common.crypto.ballot_crypto import encrypt_ballot
+from common.chain.appender import chain_appender
+from common.chain.tip import tip_cache
+from common.chain.verify import iter_verify_ndjson, verify_chain as verify_chain_links
 
 router = APIRouter(tags=["ballots"])
 
@@ -20,51 +25,54 @@ router = APIRouter(tags=["ballots"])
 class BallotSubmitRequest(BaseModel):
     election_id: str
     ballot: dict
-    voter_hash: str  # not stored; used only to derive the chain link hash
+    voter_hash: str | None = None  # accepted for compatibility; neither stored nor hashed
 
 
 # ---------- Routes ----------
 @router.post("/ballot/submit", status_code=201)
 def submit_ballot(payload: BallotSubmitRequest, db: Session = Depends(get_session)):
     # 1) Encrypt the ballot (AES-GCM via LocalKMS)
-    kms = LocalKMS()
+    kms = default_kms()
     ciphertext, nonce = encrypt_ballot(payload.ballot, kms)
 
     # Deterministic receipt derived from ciphertext
     receipt = sha256(ciphertext).hexdigest()
 
     # 2) Persist the encrypted ballot (no voter_hash column)
-    rec = Ballot(
-        election_id=payload.election_id,
-        ciphertext=ciphertext,
-        nonce=nonce,
-        receipt=receipt,
-    )
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
-
-    # 3) Append to audit chain (prev = zero32 for genesis)
-    zero32 = b"\x00" * 32
-    prev = db.query(BallotChain).order_by(BallotChain.id.desc()).first()
-    prev_bytes = prev.curr_hash if prev else zero32
-    curr = sha256(
-        prev_bytes + bytes.fromhex(receipt) + payload.voter_hash.encode("utf-8")
-    ).digest()
-
-    db.add(BallotChain(ballot_id=rec.id, prev_hash=prev_bytes, curr_hash=curr))
-    db.commit()
+    def _persist(tx: Session) -> None:
+        rec = Ballot(
+            election_id=payload.election_id,
+            ciphertext=ciphertext,
+            nonce=nonce,
+            receipt=receipt,
+        )
+        tx.add(rec)
+        tx.flush()
+
+        # 3) Append to audit chain: H(prev || ciphertext || nonce), genesis = zero32,
+        #    the same link format as the voting service, so deep verification can recompute it
+        chain_appender.append(
+            tx,
+            payload.election_id,
+            [(rec.id, ciphertext, nonce)],
+            receipts=[bytes.fromhex(receipt)],
+        )
+
+    # ballot + link commit together; retried if another replica moved the head
+    chain_appender.run(lambda: db, _persist)
 
     # 4) Return receipt
     return {"receipt": receipt}
 
 
 @router.get("/ballot/receipt/{receipt}")
-def get_by_receipt(
+async def get_by_receipt(
     receipt: str = Path(..., min_length=64, max_length=64),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
 ):
-    rec = db.query(Ballot).filter(Ballot.receipt == receipt).first()
+    rec = (
+        await db.execute(select(Ballot).where(Ballot.receipt == receipt).limit(1))
+    ).scalar_one_or_none()
     if not rec:
         raise HTTPException(status_code=404, detail="Receipt not found")
     return {
@@ -77,70 +85,49 @@ def get_by_receipt(
 
 
 @router.get("/ballot/chain/tip")
-def chain_tip(db: Session = Depends(get_session)):
-    tip = db.query(BallotChain).order_by(BallotChain.id.desc()).first()
-    if not tip:
-        return {"height": 0, "tip_hash": "00" * 32, "ballot_id": None}
-    return {
-        "height": tip.id,
-        "tip_hash": tip.curr_hash.hex()
-        if isinstance(tip.curr_hash, (bytes, bytearray))
-        else None,
-        "ballot_id": tip.ballot_id,
-    }
+async def chain_tip(
+    request: Request,
+    election_id: str = Query(..., max_length=64),
+    wait: float = Query(0, ge=0),
+):
+    """Cached tip; invalidated by this service's own appends (ETag / 304 / long-poll)."""
+    return await tip_cache.respond(request, election_id, wait)
 
 
 @router.get("/ballot/chain/verify")
-def verify_chain(db: Session = Depends(get_session)):
+def verify_chain(
+    election_id: str = Query(..., max_length=64),
+    full: bool = Query(False),
+    db: Session = Depends(get_session),
+):
     """
-    Tamper-detection: validates the append-only chain structure.
-    Since voter_hash is not stored, we verify:
+    Tamper-detection: validates the append-only chain of one election.
+    This structural check covers (see /audit/verify?deep=true for re-hashing):
       - genesis prev_hash is zero32,
+      - seq runs 1..n without gaps,
       - each prev_hash equals the previous curr_hash,
       - hashes are present and 32 bytes,
       - created_at exists and is non-decreasing.
+    Resumes after the last verified checkpoint unless full=true.
     """
-    recs: List[BallotChain] = db.query(BallotChain).order_by(BallotChain.id.asc()).all()
-
-    errors: List[str] = []
-    zero32 = b"\x00" * 32
-
-    if not recs:
-        return {"ok": True, "height": 0, "tip_hash": None, "errors": [], "message": "No chain records."}
-
-    expected_prev = zero32
-    last_ts = None
-
-    for i, r in enumerate(recs, start=1):
-        # shape checks
-        if not isinstance(r.prev_hash, (bytes, bytearray)) or len(r.prev_hash or b"") != 32:
-            errors.append(f"id={r.id}: prev_hash missing or wrong length")
-        if not isinstance(r.curr_hash, (bytes, bytearray)) or len(r.curr_hash or b"") != 32:
-            errors.append(f"id={r.id}: curr_hash missing or wrong length")
-        if r.created_at is None:
-            errors.append(f"id={r.id}: created_at is NULL")
-
-        # link continuity
-        if r.prev_hash != expected_prev:
-            if i == 1 and r.prev_hash != zero32:
-                errors.append(f"id={r.id}: genesis prev_hash is not zero32")
-            else:
-                exp = expected_prev.hex() if expected_prev else None
-                got = r.prev_hash.hex() if r.prev_hash else None
-                errors.append(f"id={r.id}: prev_hash does not match prior curr_hash (expected {exp}, got {got})")
-
-        # monotonic timestamps
-        if last_ts and r.created_at and r.created_at < last_ts:
-            errors.append(f"id={r.id}: created_at older than previous record")
-        if r.created_at:
-            last_ts = r.created_at
-
-        expected_prev = r.curr_hash
-
-    tip = recs[-1]
-    return {
-        "ok": len(errors) == 0,
-        "height": len(recs),
-        "tip_hash": tip.curr_hash.hex() if isinstance(tip.curr_hash, (bytes, bytearray)) else None,
-        "errors": errors[:20],
-    }
\ No newline at end of file
+    res = verify_chain_links(db, election_id, full=full)
+    out = {
+        "ok": res["ok"],
+        "election_id": election_id,
+        "height": res["height"],
+        "tip_hash": res["tip_hash"],
+        "checked": res["checked"],
+        "errors": [f"id={b['at_id']}: {b['reason']}" for b in res["breaks"]][:20],
+    }
+    if res["height"] == 0:
+        out["message"] = "No chain records."
+    return out
+
+
+@router.get("/ballot/chain/verify/stream")
+def verify_chain_stream(
+    election_id: str = Query(..., max_length=64),
+    full: bool = Query(False),
+):
+    """Every break as an NDJSON line (no errors[:20] cap), plus progress and summary."""
+    return StreamingResponse(iter_verify_ndjson(election_id, full), media_type="application/x-ndjson")
@@ -1,11 +1,16 @@
 # services/results/app.py
 from fastapi import FastAPI  # type: ignore
 from contextlib import asynccontextmanager
-from common.db import engine, Base
+from common.db import engine, Base, dispose_async_engine
 from common.models.models import *  # noqa
 from .routes import router
 from .routes_audit import router as audit_router
 from .routes_signing import router as signing_router
+from .routes_push import router as push_router
+from cryptoutils.pool import crypto_pool
+from common.chain.checkpoints import checkpointer
+from common.push import broadcaster
+from common.jobs import in_app_worker
 import os
 
 @asynccontextmanager
@@ -13,7 +18,19 @@ async def lifespan(app: FastAPI):
     if os.getenv("RUN_DB_MIGRATIONS", "false").lower() == "true":
         Base.metadata.create_all(bind=engine)
         print("✅ Database tables created by results service (RUN_DB_MIGRATIONS=true).")
+    if os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true":
+        checkpointer.start()
+    broadcaster.start()
+    worker = in_app_worker()
+    if worker is not None:
+        worker.start()
     yield
+    if worker is not None:
+        worker.stop(timeout=5)  # an unfinished job is re-queued when its lease expires
+    await broadcaster.stop()
+    checkpointer.stop()
+    crypto_pool.shutdown()
+    await dispose_async_engine()
 
 app = FastAPI(
     title="Results Service",
@@ -31,4 +48,5 @@ def readyz(): return {"db": "ok"}
 
 app.include_router(router,        prefix="/results")
 app.include_router(audit_router,  prefix="/results")
-app.include_router(signing_router, prefix="/results")   # 🔗 add signing endpoints
\ No newline at end of file
+app.include_router(signing_router, prefix="/results")   # 🔗 add signing endpoints
+app.include_router(push_router,   prefix="/results")
\ No newline at end of file
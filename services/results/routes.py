@@ -1,46 +1,134 @@
-from fastapi import APIRouter, HTTPException, Depends # type: ignore
+from fastapi import APIRouter, HTTPException, Depends, Query # type: ignore
 from sqlalchemy.orm import Session # type: ignore
 from common.db import get_session
-from common.models.models import AdminUser, ResultAction, Approval
+from common.models.roles import Role
+from api.security.api_key import require_admin_or_api_key
+from api.security.rbac import require_role
+from common.models.models import Job, ResultAction
+from common.approvals import DuplicateApproval, approve_export, new_export_action
+from common.jobs import job_view, submit
+import common.export  # noqa: F401  (registers the export job handler)
+from common.tally.mapreduce import load_preferences_sharded
+from common.tally.irv import count_irv
+from common.tally.live import count_division, division_row, register_division
+from common.tally.stv import count_stv
 import json
 
 router = APIRouter()
 
-def get_admin(db: Session, email: str) -> AdminUser:
-    user = db.query(AdminUser).filter(AdminUser.email == email).one_or_none()
-    if not user:
-        user = AdminUser(email=email, is_active=True)
-        db.add(user); db.commit(); db.refresh(user)
-    return user
-
 @router.post("/results/export/request")
-def export_request(requested_by: str, db: Session = Depends(get_session)):
+def export_request(
+    requested_by: str,
+    election_id: str = Query(..., max_length=64),
+    quorum: int | None = Query(None, ge=1, description="approvals required (never below EXPORT_APPROVAL_QUORUM)"),
+    db: Session = Depends(get_session),
+):
     # Create a pending action (payload can contain parameters if needed)
-    act = ResultAction(type="EXPORT", payload=json.dumps({"by": requested_by}))
-    db.add(act); db.commit(); db.refresh(act)
-    return {"action_id": act.id, "status": act.status}
+    act = new_export_action(db, requested_by, election_id, quorum)
+    return {"action_id": act.id, "status": act.status, "quorum": act.quorum}
 
 @router.post("/results/export/approve/{action_id}")
 def export_approve(action_id: int, admin_email: str, db: Session = Depends(get_session)):
-    act = db.query(ResultAction).get(action_id)
-    if not act: raise HTTPException(404, "action not found")
+    # one transaction: counter bump under the action's row lock, approval row
+    # and (on reaching quorum) the export job commit together
+    try:
+        res = approve_export(db, action_id, admin_email)
+    except LookupError:
+        raise HTTPException(404, "action not found")
+    except DuplicateApproval as e:
+        raise HTTPException(409, str(e))
+    out = res.to_dict()
+    if res.job_id is not None:
+        # a job worker streams the ballots to EXPORT_DIR; poll /results/jobs/{job_id}
+        out["message"] = "export queued"
+    return out
+
+@router.get("/results/export/{action_id}")
+def export_status(action_id: int, db: Session = Depends(get_session)):
+    """Status of an export action; once DONE, the signed manifest as written next to the file."""
+    act = db.get(ResultAction, action_id)
+    if not act or act.type != "EXPORT": raise HTTPException(404, "action not found")
+    params = json.loads(act.payload or "{}")
+    out = {"action_id": act.id, "status": act.status, **params}
     if act.status == "DONE":
-        return {"action_id": act.id, "status": act.status}
-
-    admin = get_admin(db, admin_email)
-    # insert approval; unique constraint stops double-approve by same admin
-    appr = Approval(action_id=act.id, admin_id=admin.id)
-    db.add(appr)
-    db.commit()
-
-    # count distinct approvals
-    n = db.query(Approval).filter(Approval.action_id == act.id).count()
-    if n >= 2:
-        act.status = "DONE"
-        db.add(act); db.commit()
-        # Here you would compute/sign/publish results bundle
-        return {"action_id": act.id, "status": act.status, "message": "export executed"}
-    return {"action_id": act.id, "status": act.status, "approvals": n}
+        try:
+            with open(params["manifest"], encoding="utf-8") as f:
+                out["manifest"] = json.load(f)
+        except FileNotFoundError:
+            out["manifest"] = None  # removed from EXPORT_DIR since the export ran
+            out["error"] = "manifest file not found"
+    return out
+
+@router.get("/results/tally/irv", dependencies=[Depends(require_role([Role.ADMIN]))])
+def tally_irv(
+    election_id: str = Query(..., max_length=64),
+    candidates: list[int] | None = Query(None, description="full candidate list (includes zero-vote candidates)"),
+    db: Session = Depends(get_session),
+):
+    """
+    Decrypt and count one election (single-winner IRV); returns the
+    round-by-round table.  Admin only: it reads every ballot.
+    """
+    try:
+        pm = load_preferences_sharded(db, election_id, candidates)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"election_id": election_id, **count_irv(pm).to_dict()}
+
+@router.get("/results/tally/stv", dependencies=[Depends(require_role([Role.ADMIN]))])
+def tally_stv(
+    election_id: str = Query(..., max_length=64),
+    seats: int = Query(..., ge=1),
+    candidates: list[int] | None = Query(None, description="full candidate list (includes zero-vote candidates)"),
+    db: Session = Depends(get_session),
+):
+    """
+    Decrypt and count one election (multi-seat STV); returns the replayable
+    step log.  Admin only, like the IRV count.
+    """
+    try:
+        pm = load_preferences_sharded(db, election_id, candidates)
+        result = count_stv(pm, seats)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"election_id": election_id, **result.to_dict()}
+
+@router.post("/results/live/divisions", dependencies=[Depends(require_role([Role.ADMIN]))])
+def live_register_division(
+    election_id: str = Query(..., max_length=64),
+    division: str = Query(..., max_length=64, description="contest id the division's ballots are stored under"),
+    db: Session = Depends(get_session),
+):
+    """Register a division (contest) for live counting under one election."""
+    try:
+        row = register_division(db, election_id, division)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    return {"election_id": row.election_id, "division": row.division, "counted_upto": row.counted_upto}
+
+@router.post("/results/live/count", dependencies=[Depends(require_admin_or_api_key)])
+def live_count(
+    election_id: str = Query(..., max_length=64),
+    division: str = Query(..., max_length=64, description="contest id the division's ballots are stored under"),
+    background: bool = Query(False, description="queue as a job and return its id"),
+    db: Session = Depends(get_session),
+):
+    """Count the division's ballots received since its last live count into the results aggregate."""
+    try:
+        division_row(db, election_id, division)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    if background:
+        job = submit(db, "live_count", {"election_id": election_id, "division": division})
+        return job_view(job)
+    return count_division(db, election_id, division)
+
+@router.get("/results/jobs/{job_id}")
+def job_status(job_id: int, db: Session = Depends(get_session)):
+    """Status, progress and result of a background job."""
+    job = db.get(Job, job_id)
+    if not job: raise HTTPException(404, "job not found")
+    return job_view(job)
 
 @router.get("/healthz")
 def healthz():
@@ -1,47 +1,142 @@
 # services/results/routes_audit.py
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException # type: ignore
+import json
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
+from sqlalchemy import select # type: ignore
 from sqlalchemy.orm import Session # type: ignore
 from common.db import get_session
-from common.models.models import BallotChain
+from common.models.models import Ballot, BallotChain, ChainCheckpoint, ChainHead
+from common.chain.checkpoints import to_dict as checkpoint_dict
+from common.chain.merkle import merkle_index
+from common.chain.tip import tip_cache
+from common.chain.verify import deep_verify, iter_verify_ndjson, verify_chain
+from common.crypto.signing import get_public_key_b64, sign_detached_b64
+from common.jobs import submit_live
 
 router = APIRouter(tags=["audit"])
 
 @router.get("/audit/tip")
-def audit_tip(db: Session = Depends(get_session)):
-    tip = db.query(BallotChain).order_by(BallotChain.id.desc()).first()
-    if not tip:
-        return {"height": 0, "tip_hash": "00" * 32, "ballot_id": None}
-    return {
-        "height": tip.id,
-        "tip_hash": tip.curr_hash.hex() if isinstance(tip.curr_hash, bytes) else None,
-        "ballot_id": tip.ballot_id,
-    }
+async def audit_tip(
+    request: Request,
+    election_id: str = Query(..., max_length=64),
+    wait: float = Query(0, ge=0, description="with If-None-Match: long-poll up to N seconds for a new tip"),
+):
+    """Chain tip from the process-local tip cache (ETag / 304 / long-poll)."""
+    return await tip_cache.respond(request, election_id, wait)
 
 @router.get("/audit/verify")
-def audit_verify(db: Session = Depends(get_session)):
+def audit_verify(
+    election_id: str = Query(..., max_length=64),
+    full: bool = Query(False, description="ignore the checkpoint and re-verify from genesis"),
+    deep: bool = Query(False, description="also recompute every curr_hash from the ballot ciphertexts"),
+    db: Session = Depends(get_session),
+):
     """
-    Verifies append-only linkage:
+    Verifies append-only linkage of one election's chain (ordered by seq):
     - record 1 must have prev_hash = 32 zero-bytes
     - for every i>1: chain[i].prev_hash == chain[i-1].curr_hash
-    NOTE: This checks tamper-evidence of the chain structure. It doesn't
-    re-compute curr_hash (which may depend on data not stored here).
-    """
-    chain = db.query(BallotChain).order_by(BallotChain.id.asc()).all()
-    if not chain:
-        return {"ok": True, "height": 0, "breaks": []}
-
-    breaks = []
-    zero32 = b"\x00" * 32
-    if chain[0].prev_hash != zero32:
-        breaks.append({"at_id": chain[0].id, "reason": "first.prev_hash != 0x00..00"})
-
-    for i in range(1, len(chain)):
-        if chain[i].prev_hash != chain[i-1].curr_hash:
-            breaks.append({
-                "at_id": chain[i].id,
-                "expected_prev": chain[i-1].curr_hash.hex(),
-                "actual_prev": chain[i].prev_hash.hex(),
-            })
-
-    return {"ok": len(breaks) == 0, "height": chain[-1].id, "breaks": breaks}
\ No newline at end of file
+    Only links after the last verified checkpoint are read unless full=true.
+    deep=true additionally recomputes curr_hash = H(prev || ct || nonce) for
+    every link, in parallel seq ranges (always from genesis), so a tampered
+    ciphertext is detected too.
+    """
+    if deep:
+        return deep_verify(db, election_id)
+    return verify_chain(db, election_id, full=full)
+
+
+@router.get("/audit/verify/stream")
+def audit_verify_stream(
+    election_id: str = Query(..., max_length=64),
+    full: bool = Query(False, description="ignore the checkpoint and re-verify from genesis"),
+):
+    """
+    Same checks as /audit/verify, streamed as NDJSON in constant memory:
+    one {"type":"break"} line per problem (never truncated), periodic
+    {"type":"progress"} lines and a final {"type":"summary"} line.
+    """
+    return StreamingResponse(iter_verify_ndjson(election_id, full), media_type="application/x-ndjson")
+
+
+def _signed_root(election_id: str, size: int, root: bytes) -> dict:
+    """Ed25519 over the same canonical JSON as /results/sign, so /results/verify accepts it."""
+    tree = {"election_id": election_id, "size": size, "root": root.hex()}
+    message = json.dumps(tree, separators=(",", ":"), sort_keys=True).encode()
+    return {
+        **tree,
+        "algorithm": "Ed25519",
+        "public_key": get_public_key_b64(),
+        "signature": sign_detached_b64(message),
+    }
+
+
+@router.get("/audit/proof/{receipt}")
+def audit_proof(
+    receipt: str = Path(..., min_length=64, max_length=64),
+    db: Session = Depends(get_session),
+):
+    """
+    O(log n) Merkle inclusion proof for a ballot receipt plus the signed root
+    of its election's tree.  Check with common.chain.merkle.verify_proof():
+    fold the leaf hash with each path step; bit `level` of the index says
+    whether the sibling is on the left ("side" repeats it for readers).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # one snapshot for head + nodes while ballots keep being appended
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    link = db.execute(
+        select(BallotChain.election_id, BallotChain.seq)
+        .join(Ballot, Ballot.id == BallotChain.ballot_id)
+        .where(Ballot.receipt == receipt, BallotChain.election_id.is_not(None))
+        .limit(1)
+    ).first()
+    if not link:
+        raise HTTPException(status_code=404, detail="receipt not found")
+    election_id, seq = link
+    head = db.get(ChainHead, election_id)
+    size = head.height if head else 0
+    if seq > size:
+        raise HTTPException(status_code=404, detail="receipt not yet committed")
+
+    try:
+        path, root = merkle_index.proof(db, election_id, seq - 1, size)
+    except LookupError:
+        # index missing or part-built (never sign a root of fewer leaves than `size`):
+        # build it in the background, one live job per election
+        job = submit_live(db, "merkle_backfill", {"election_id": election_id},
+                          dedupe_key=f"merkle_backfill:{election_id}")
+        raise HTTPException(status_code=503, detail={"detail": "merkle index not built for this election",
+                                                     "job_id": job.id})
+    return {
+        "receipt": receipt,
+        "election_id": election_id,
+        "index": seq - 1,
+        "leaf": "sha256(0x00 || receipt)",
+        "node": "sha256(0x01 || left || right)",
+        "path": path,
+        "signed_root": _signed_root(election_id, size, root),
+    }
+
+
+@router.get("/audit/checkpoints")
+def audit_checkpoints(
+    election_id: str = Query(..., max_length=64),
+    after_height: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_session),
+):
+    """
+    Signed chain checkpoints, oldest first.  Each signature is Ed25519 over the
+    canonical JSON of {election_id, height, tip_hash, merkle_root, timestamp}
+    (same format as /results/sign, so /results/verify can check it).
+    Page with after_height=<last height seen>.
+    """
+    rows = db.execute(
+        select(ChainCheckpoint)
+        .where(ChainCheckpoint.election_id == election_id, ChainCheckpoint.height > after_height)
+        .order_by(ChainCheckpoint.height.asc())
+        .limit(limit)
+    ).scalars().all()
+    return {"election_id": election_id, "checkpoints": [checkpoint_dict(r) for r in rows]}
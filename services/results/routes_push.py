@@ -0,0 +1,59 @@
+# services/results/routes_push.py
+from __future__ import annotations
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
+from api.security.api_key import api_key_ok, require_api_key
+from common.push import PushLimit, broadcaster
+
+router = APIRouter(tags=["push"])
+
+
+async def _admit(election_id: str):
+    try:
+        return await broadcaster.admit(election_id)
+    except LookupError:
+        raise HTTPException(404, "unknown election")
+    except PushLimit as e:
+        raise HTTPException(503, str(e))
+
+
+@router.get("/push/sse", dependencies=[Depends(require_api_key)])
+async def push_sse(election_id: str = Query(..., max_length=64)):
+    """
+    Server-Sent Events for one election: `chain` (height/tip) and `results`
+    (version + changed candidate totals).  The first events are the current state.
+    Requires the results API key (X-API-Key, or ?api_key= for EventSource).
+    """
+    sub = await _admit(election_id)
+    return StreamingResponse(
+        broadcaster.sse(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/push/ws")
+async def push_ws(
+    ws: WebSocket,
+    election_id: str = Query(..., max_length=64),
+    api_key: str | None = Query(None),
+):
+    """Same events as /push/sse, one JSON text message each (same API key)."""
+    if not api_key_ok(ws.headers.get("x-api-key") or api_key):
+        await ws.close(code=1008)  # policy violation
+        return
+    try:
+        sub = await broadcaster.admit(election_id)
+    except LookupError:
+        await ws.close(code=1008)
+        return
+    except PushLimit:
+        await ws.close(code=1013)  # try again later
+        return
+    await ws.accept()
+    await broadcaster.websocket(ws, sub)
+
+
+@router.get("/push/stats")
+def push_stats():
+    return broadcaster.stats()
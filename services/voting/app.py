@@ -1,8 +1,10 @@
 from fastapi import FastAPI # type: ignore
 from contextlib import asynccontextmanager
-from common.db import engine, Base
+from common.db import engine, Base, dispose_async_engine
 from common.models.models import *  # noqa: F401,F403
 from .routes import router
+from .ingest import ingestor
+from cryptoutils.pool import crypto_pool
 import os
 
 
@@ -15,8 +17,12 @@ async def lifespan(app: FastAPI):
     if os.getenv("RUN_DB_MIGRATIONS", "false").lower() == "true":
         Base.metadata.create_all(bind=engine)
         print("✅ Database tables created by voting service (RUN_DB_MIGRATIONS=true).")
+    ingestor.start()
     yield
-    # optional: shutdown/cleanup goes here
+    # flush any ballots still waiting for a group commit
+    ingestor.stop()
+    crypto_pool.shutdown()
+    await dispose_async_engine()
 
 
 app = FastAPI(
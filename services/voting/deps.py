@@ -1,32 +1,93 @@
 from __future__ import annotations
-from fastapi import Depends, HTTPException, Header, Query # type: ignore
+from fastapi import HTTPException, Header, Query # type: ignore
+from sqlalchemy import update # type: ignore
 from sqlalchemy.orm import Session # type: ignore
+from collections import OrderedDict
 from datetime import datetime, timezone
-from common.db import get_session
+from typing import Iterable
+import os
+import threading
+import time
 from common.models.models import BallotToken
 
-def require_valid_otbt(
+OTBT_NEG_CACHE_SIZE = int(os.getenv("OTBT_NEG_CACHE_SIZE", "100000"))
+OTBT_NEG_CACHE_TTL_S = float(os.getenv("OTBT_NEG_CACHE_TTL_S", "900"))
+OTBT_REJECTED = "invalid, expired or already used token"
+
+
+class NegativeTokenCache:
+    """
+    Bounded LRU of tokens known to be unusable (unknown, expired or spent).
+    Replay floods are answered from memory and never reach the database.
+    """
+
+    def __init__(self, maxsize: int = OTBT_NEG_CACHE_SIZE, ttl: float = OTBT_NEG_CACHE_TTL_S):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def add(self, token: str) -> None:
+        with self._lock:
+            self._entries[token] = time.monotonic() + self._ttl
+            self._entries.move_to_end(token)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, token: str) -> bool:
+        with self._lock:
+            exp = self._entries.get(token)
+            if exp is None:
+                return False
+            if exp < time.monotonic():
+                del self._entries[token]
+                return False
+            self.hits += 1
+            return True
+
+
+bad_tokens = NegativeTokenCache()
+
+
+async def require_valid_otbt(
     x_otbt: str | None = Header(default=None, alias="X-OTBT"),
     otbt_q: str | None = Query(default=None, alias="otbt"),
-    db: Session = Depends(get_session),
-) -> BallotToken:
+) -> str:
+    """
+    Cheap pre-check only: the token is actually validated and consumed by
+    consume_otbts() inside the ballot's group-commit transaction.
+    """
     token = x_otbt or otbt_q
     if not token:
         raise HTTPException(status_code=422, detail="otbt missing")
+    if len(token) > 64 or token in bad_tokens:
+        raise HTTPException(status_code=401, detail=OTBT_REJECTED)
+    return token
 
-    bt = db.query(BallotToken).filter(BallotToken.token == token).first()
-    if not bt:
-        raise HTTPException(status_code=401, detail="invalid token")
 
+def consume_otbts(db: Session, tokens: Iterable[str]) -> set[str]:
+    """
+    Atomically consume every still-valid token in `tokens` with ONE statement:
+        UPDATE ballot_tokens SET consumed_at = now
+         WHERE token IN (...) AND consumed_at IS NULL AND exp_at > now
+        RETURNING token
+    Returns the tokens that were consumed; concurrent double-spends cannot
+    both match `consumed_at IS NULL`.
+    """
+    wanted = set(tokens)
+    if not wanted:
+        return set()
     now = datetime.now(timezone.utc)
-    if bt.exp_at and bt.exp_at < now:
-        raise HTTPException(status_code=401, detail="token expired")
-    if bt.consumed_at is not None:
-        raise HTTPException(status_code=401, detail="token already used")
-
-    return bt
-
-def consume_otbt(bt: BallotToken, db: Session) -> None:
-    bt.consumed_at = datetime.now(timezone.utc)
-    db.add(bt)
-    # commit happens in the route
+    res = db.execute(
+        update(BallotToken)
+        .where(
+            BallotToken.token.in_(wanted),
+            BallotToken.consumed_at.is_(None),
+            BallotToken.exp_at > now,
+        )
+        .values(consumed_at=now)
+        .returning(BallotToken.token)
+        .execution_options(synchronize_session=False)
+    )
+    return set(res.scalars().all())
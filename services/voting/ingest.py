@@ -0,0 +1,232 @@
+# services/voting/ingest.py
+"""
+Group-commit ingestion stage for ballot submissions.
+
+Request handlers encrypt their ballot and hand it to a single writer thread.
+The writer waits a few milliseconds for concurrent submissions and persists
+the whole group (ballots, chain links, token consumptions) in ONE transaction,
+so the per-vote commit/fsync cost is shared across the batch.
+Each caller still receives its own receipt and chain head through a Future.
+Futures are marked running when enqueued, so a caller that gives up (e.g. an
+asyncio timeout) cannot cancel one the writer is about to resolve.
+A group that fails for any reason other than a chain conflict is retried
+one ballot per transaction, so a single bad row only fails its own caller.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from common.chain.appender import ChainAppender, chain_appender
+from common.db import SessionLocal
+from common.models.models import Ballot
+from .deps import OTBT_REJECTED, bad_tokens, consume_otbts
+
+INGEST_WINDOW_MS = float(os.getenv("INGEST_WINDOW_MS", "5"))
+INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "256"))
+INGEST_TIMEOUT_S = float(os.getenv("INGEST_TIMEOUT_S", "30"))
+
+
+@dataclass
+class PendingBallot:
+    """One encrypted ballot waiting for the next group commit."""
+    election_id: str
+    ciphertext: bytes
+    nonce: bytes
+    receipt: str
+    token: str
+    future: Future = field(default_factory=Future)
+
+
+def _settle(fut: Future, result=None, exc: BaseException | None = None) -> None:
+    """Resolve `fut` unless it already is (a caller may have cancelled it)."""
+    try:
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class BallotIngestor:
+    """
+    Collects concurrent submissions for up to `window_ms` (or `max_batch`
+    items) and writes them in a single transaction on a background thread.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        window_ms: float = INGEST_WINDOW_MS,
+        max_batch: int = INGEST_MAX_BATCH,
+        appender: ChainAppender = chain_appender,
+    ):
+        self._session_factory = session_factory
+        self._appender = appender
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        # entries are groups that must share one transaction (None = stop)
+        self._queue: queue.Queue[list[PendingBallot] | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # simple counters for /stats style introspection and tests
+        self.batches_written = 0
+        self.ballots_written = 0
+
+    # ---- lifecycle ----
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="ballot-ingestor", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush whatever is queued and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    # ---- producer side ----
+    def submit(self, item: PendingBallot) -> Future:
+        self.submit_many([item])
+        return item.future
+
+    def submit_many(self, items: list[PendingBallot]) -> list[Future]:
+        """
+        Enqueue `items` as one unit: they are never split across group
+        commits (unless a failed commit is retried item by item) and are
+        appended to the chain in the given order.
+        """
+        self.start()
+        for item in items:
+            # from here on the writer owns the outcome: cancel() is a no-op
+            item.future.set_running_or_notify_cancel()
+        if items:
+            self._queue.put(list(items))
+        return [item.future for item in items]
+
+    # ---- writer side ----
+    def _collect(self, first: list[PendingBallot]) -> tuple[list[PendingBallot], bool]:
+        batch = list(first)
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                nxt = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if nxt is None:
+                return batch, True
+            batch.extend(nxt)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            try:
+                self._write(batch)
+            except Exception as e:  # never let one batch stop the writer
+                print(f"⚠️ ballot ingestor: batch of {len(batch)} failed: {e}")
+                for item in batch:
+                    _settle(item.future, exc=e)
+            if stopping:
+                return
+
+    def _stage(self, db: Session, batch: list[PendingBallot]):
+        """Stage one group commit; re-run from scratch on chain conflicts."""
+        # SR-10: one conditional UPDATE consumes every still-valid token;
+        # a token used twice in the same batch only authorises its first ballot.
+        consumed = consume_otbts(db, (item.token for item in batch))
+        accepted: list[PendingBallot] = []
+        rejected: list[PendingBallot] = []
+        for item in batch:
+            if item.token in consumed:
+                consumed.discard(item.token)
+                accepted.append(item)
+            else:
+                rejected.append(item)
+
+        if not accepted:
+            return accepted, rejected, [], []
+
+        # Persist ballots (NOTE: no voter_id stored—SR-10 unlinkability)
+        ballots = [
+            Ballot(
+                election_id=item.election_id,
+                ciphertext=item.ciphertext,
+                nonce=item.nonce,
+                receipt=item.receipt,
+            )
+            for item in accepted
+        ]
+        db.add_all(ballots)
+        db.flush()
+        ballot_ids = [b.id for b in ballots]
+
+        # SR-12: extend each election's hash chain (and Merkle index) in submission
+        # order; heads are locked in sorted election order, the same on every
+        # replica, so two multi-election batches cannot deadlock on them
+        by_election: dict[str, list[int]] = {}
+        for pos, item in enumerate(accepted):
+            by_election.setdefault(item.election_id, []).append(pos)
+        heads: list[bytes] = [b""] * len(accepted)
+        for election_id, positions in sorted(by_election.items()):
+            links = self._appender.append(
+                db,
+                election_id,
+                [(ballot_ids[p], accepted[p].ciphertext, accepted[p].nonce) for p in positions],
+                receipts=[bytes.fromhex(accepted[p].receipt) for p in positions],
+            )
+            for p, curr in zip(positions, links):
+                heads[p] = curr
+        return accepted, rejected, ballot_ids, heads
+
+    def _write(self, batch: list[PendingBallot]) -> None:
+        try:
+            accepted, rejected, ballot_ids, heads = self._appender.run(
+                self._session_factory, lambda db: self._stage(db, batch)
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # not a chain conflict (run() retries those): isolate the
+                # poisoned item instead of failing every co-batched voter
+                print(f"⚠️ ballot ingestor: batch of {len(batch)} failed ({e}); retrying one by one")
+                for item in batch:
+                    self._write([item])
+                return
+            for item in batch:
+                _settle(item.future, exc=e)
+            return
+
+        # spent or unusable tokens never need another database round-trip
+        for item in batch:
+            bad_tokens.add(item.token)
+        for item in rejected:
+            _settle(item.future, exc=HTTPException(status_code=401, detail=OTBT_REJECTED))
+        if accepted:
+            self.batches_written += 1
+            self.ballots_written += len(accepted)
+        for item, ballot_id, curr in zip(accepted, ballot_ids, heads):
+            _settle(item.future, {"ballot_id": ballot_id, "receipt": item.receipt, "chain_head": curr.hex()})
+
+
+# process-wide ingestor used by the voting routes
+ingestor = BallotIngestor()
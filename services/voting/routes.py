@@ -1,35 +1,42 @@
 # services/voting/routes.py
+import asyncio
+import os
 from fastapi import APIRouter, HTTPException, Depends, Body # type: ignore
+from pydantic import BaseModel, Field # type: ignore
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session # type: ignore
 
-from common.db import get_session
-from common.models.models import Ballot, BallotChain
-from common.cryptoutils.ballots import ( # type: ignore
+from cryptoutils.ballots import (
     canonical_prefs,
     receipt_hash,
     encrypt_ballot,
-    hash_chain,
+    ballot_key,
 )
-from .deps import require_valid_otbt, consume_otbt
+from common.chain.appender import chain_appender
+from cryptoutils.pool import crypto_pool
+from .deps import require_valid_otbt, bad_tokens, OTBT_REJECTED
+from .ingest import ingestor, PendingBallot, INGEST_TIMEOUT_S
 
 router = APIRouter()
 
+BALLOT_BATCH_MAX = int(os.getenv("BALLOT_BATCH_MAX", "1000"))
+
+
+# ---------- Schemas ----------
+class BatchBallot(BaseModel):
+    prefs: list[int]
+    otbt: str
 
-def get_chain_head(db: Session) -> bytes:
-    """
-    Returns the current head of the hash chain (or 32 zero bytes if none).
-    """
-    last = db.query(BallotChain).order_by(BallotChain.id.desc()).first()
-    return last.curr_hash if last else bytes(32)  # genesis = 32 zero bytes
+
+class BatchSubmitRequest(BaseModel):
+    election_id: str = Field(..., max_length=64)
+    items: list[BatchBallot] = Field(..., min_length=1, max_length=BALLOT_BATCH_MAX)
 
 
 @router.post("/ballot/submit")
-def submit_ballot(
+async def submit_ballot(
     # Make JSON body binding explicit so you can POST a JSON object
     prefs: list[int] = Body(..., embed=True, description="Ordered preference list"),
-    election_id: str = Body(..., embed=True),
-    db: Session = Depends(get_session),
+    election_id: str = Body(..., embed=True, max_length=64),
     tok=Depends(require_valid_otbt),
 ):
     """
@@ -39,6 +46,8 @@ def submit_ballot(
       - Encrypts ballot with AES-GCM (SR-12)
       - Appends to hash chain (SR-12)
       - Consumes one-time ballot token (SR-10)
+    Persistence is group-committed by the ingestor (see ingest.py); the
+    handler awaits the result without holding a threadpool worker.
     Returns: ballot_id, receipt, and chain head.
     """
     # Basic validation (no duplicates, non-empty, ints assumed)
@@ -54,23 +63,112 @@ def submit_ballot(
     # SR-12: confidentiality + integrity via AEAD
     ct, nonce = encrypt_ballot(blob)
 
-    # Persist ballot (NOTE: no voter_id stored—SR-10 unlinkability)
-    b = Ballot(election_id=election_id, ciphertext=ct, nonce=nonce, receipt=rcp)
-    db.add(b)
-    db.commit()
-    db.refresh(b)
-
-    # SR-12: tamper-evident ledger via hash chain
-    prev = get_chain_head(db)
-    curr = hash_chain(prev, ct, nonce)
-    db.add(BallotChain(ballot_id=b.id, prev_hash=prev, curr_hash=curr))
-
-    # SR-10: consume the one-time token
-    consume_otbt(tok, db)
+    # Persist ballot + chain link + token consumption in the next group commit
+    fut = ingestor.submit(
+        PendingBallot(
+            election_id=election_id,
+            ciphertext=ct,
+            nonce=nonce,
+            receipt=rcp,
+            token=tok,
+        )
+    )
+    # shield: a timeout must not cancel the writer's future (the ballot may
+    # still commit); the voter gets the receipt to check it against the chain
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), INGEST_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail={"code": "ingest_timeout",
+                                                     "detail": "ballot is still being recorded",
+                                                     "receipt": rcp})
+
+
+@router.post("/ballot/submit/batch")
+async def submit_ballot_batch(payload: BatchSubmitRequest):
+    """
+    Bulk upload for polling-place / assisted-voting terminals.
+    Ballots are encrypted, then all tokens are consumed with one conditional
+    UPDATE and the ballots appended in request order within ONE transaction.
+    Returns a per-item receipt or error; one bad item never fails the batch.
+    """
+    results: list[dict | None] = [None] * len(payload.items)
+    now = datetime.now(timezone.utc)
+
+    staged: list[tuple[int, str, bytes]] = []
+    seen: set[str] = set()
+    for i, it in enumerate(payload.items):
+        if not it.prefs or len(set(it.prefs)) != len(it.prefs):
+            results[i] = {"index": i, "ok": False, "error": "invalid preference order"}
+            continue
+        err = None
+        if it.otbt in seen:
+            err = "duplicate token in batch"
+        elif it.otbt in bad_tokens:
+            err = OTBT_REJECTED
+        if err:
+            results[i] = {"index": i, "ok": False, "error": err}
+            continue
+        seen.add(it.otbt)
+        staged.append((i, it.otbt, canonical_prefs(it.prefs, payload.election_id, now.isoformat())))
+
+    # one key-context lookup and one nonce read for the whole upload
+    sealed = ballot_key.encrypt_many(blob for _, _, blob in staged)
+    pending: list[tuple[int, PendingBallot]] = [
+        (
+            i,
+            PendingBallot(
+                election_id=payload.election_id,
+                ciphertext=ct,
+                nonce=nonce,
+                receipt=receipt_hash(blob),
+                token=token,
+            ),
+        )
+        for (i, token, blob), (ct, nonce) in zip(staged, sealed)
+    ]
+
+    futures = ingestor.submit_many([p for _, p in pending])
+    # asyncio.wait never cancels: items still in flight at the timeout may yet commit
+    waiters = [asyncio.wrap_future(f) for f in futures]
+    done: set = set()
+    if waiters:
+        done, _ = await asyncio.wait(waiters, timeout=INGEST_TIMEOUT_S)
+    for (i, item), w in zip(pending, waiters):
+        if w not in done:
+            results[i] = {"index": i, "ok": False, "error": "ballot is still being recorded", "receipt": item.receipt}
+            continue
+        exc = w.exception()
+        if isinstance(exc, HTTPException):
+            results[i] = {"index": i, "ok": False, "error": exc.detail}
+        elif exc is not None:
+            print(f"⚠️ batch item {i} failed: {exc!r}")
+            results[i] = {"index": i, "ok": False, "error": "ballot could not be recorded"}
+        else:
+            results[i] = {"index": i, "ok": True, **w.result()}
+
+    accepted = sum(1 for r in results if r["ok"])
+    return {
+        "election_id": payload.election_id,
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }
+
+
+@router.get("/chain/stats")
+def chain_stats():
+    """
+    Chain-append counters for this replica (appends/sec, CAS conflict rate).
+    """
+    return chain_appender.stats()
 
-    db.commit()
 
-    return {"ballot_id": b.id, "receipt": rcp, "chain_head": curr.hex()}
+@router.get("/crypto/stats")
+def crypto_stats():
+    """
+    Crypto worker pool size and queue depth for this replica.
+    """
+    return crypto_pool.stats()
 
 
 # ---- Service health routes (for Nginx and manual checks) ----
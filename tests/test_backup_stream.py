@@ -0,0 +1,96 @@
+"""
+tests/test_backup_stream.py
+Validates streaming AES-GCM backups: chunked round trip, bounded memory,
+and a restore that rejects tampered or truncated files.
+"""
+
+import hashlib
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.routers.backup import daily_voter_backup
+from utils import backup_utils
+from utils.backup_utils import perform_encrypted_backup, restore_from_backup
+
+KEY = "ab" * 32
+
+
+@pytest.fixture()
+def db_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("BACKUP_AES_KEY", KEY)
+    monkeypatch.setattr(backup_utils, "BACKUP_CHUNK_BYTES", 64 * 1024)
+    path = tmp_path / "live.db"
+    path.write_bytes(backup_utils.SQLITE_HEADER + os.urandom(300_000))
+    return path
+
+
+def test_backup_round_trip_in_chunks(db_file, tmp_path):
+    """✅ The backup is chunked ciphertext and restores byte-for-byte."""
+    res = perform_encrypted_backup(str(db_file), str(tmp_path / "b.enc"))
+    assert res["restorable"] and res["chunks"] == 5 and res["bytes"] == db_file.stat().st_size
+    blob = (tmp_path / "b.enc").read_bytes()
+    assert b"SQLite format" not in blob
+
+    out = restore_from_backup(res["backup_file"], restore_to=str(tmp_path / "restored.db"))
+    assert out["verified"] and out["sqlite"] and out["chunks"] == 5
+    assert out["sha256"] == res["sha256"] == hashlib.sha256(db_file.read_bytes()).hexdigest()
+    assert (tmp_path / "restored.db").read_bytes() == db_file.read_bytes()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_restore_rejects_tampering_and_truncation(db_file, tmp_path):
+    """❌ A flipped byte, a cut-off file or a wrong key fails verification and restores nothing."""
+    res = perform_encrypted_backup(str(db_file), str(tmp_path / "b.enc"))
+    blob = bytearray((tmp_path / "b.enc").read_bytes())
+
+    flipped = tmp_path / "flipped.enc"
+    blob[100_000] ^= 1
+    flipped.write_bytes(bytes(blob))
+    out = restore_from_backup(str(flipped), restore_to=str(tmp_path / "r1.db"))
+    assert not out["verified"] and not (tmp_path / "r1.db").exists()
+    assert not list(tmp_path.glob("*.part"))  # the per-run temporary file is removed
+
+    cut = tmp_path / "cut.enc"
+    cut.write_bytes((tmp_path / "b.enc").read_bytes()[:-40])
+    assert not restore_from_backup(str(cut))["verified"]
+    assert not restore_from_backup(res["backup_file"], key=bytes(32))["verified"]
+
+
+def test_backup_memory_is_bounded_by_chunk(tmp_path, monkeypatch):
+    """✅ Backing up a file much larger than a chunk never holds the file in memory."""
+    monkeypatch.setenv("BACKUP_AES_KEY", KEY)
+    monkeypatch.setattr(backup_utils, "BACKUP_CHUNK_BYTES", 256 * 1024)
+    big = tmp_path / "big.db"
+    with open(big, "wb") as f:
+        for _ in range(32):
+            f.write(os.urandom(1 << 20))
+    tracemalloc.start()
+    try:
+        perform_encrypted_backup(str(big), str(tmp_path / "big.enc"))
+        restore_from_backup(str(tmp_path / "big.enc"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 8 << 20
+
+
+def test_backup_without_key_is_not_restorable(db_file, tmp_path, monkeypatch):
+    """❌ Without BACKUP_AES_KEY the one-off key is never stored, and the drill says so."""
+    monkeypatch.delenv("BACKUP_AES_KEY")
+    res = perform_encrypted_backup(str(db_file), str(tmp_path / "b.enc"))
+    assert res["status"] == "success" and not res["restorable"] and "key_preview" in res
+    out = restore_from_backup(res["backup_file"])
+    assert not out["verified"] and "BACKUP_AES_KEY" in out["error"]
+
+
+def test_scheduled_backup_without_key_fails(monkeypatch):
+    """❌ The voter_backup job refuses to report an unrestorable backup as done."""
+    monkeypatch.delenv("BACKUP_AES_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="BACKUP_AES_KEY"):
+        daily_voter_backup(None)
@@ -0,0 +1,88 @@
+"""
+tests/test_ballot_decrypt.py
+Validates the streaming ballot decryption: both ciphertext writers, both
+plaintext formats, the chunked fast path and pooled streaming from the DB.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from Crypto.Cipher import AES
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.models.models import Ballot
+from common.tally.decrypt import decode_chunk, decode_prefs, iter_preferences
+from cryptoutils.ballots import BallotKeyContext, canonical_prefs
+from cryptoutils.pool import CryptoPool
+
+KEY = bytes.fromhex("66" * 32)
+
+
+def _registration_encrypt(ballot: dict) -> tuple[bytes, bytes]:
+    # the pycryptodome layout common/crypto/ballot_crypto.py used to write
+    plaintext = json.dumps(ballot, separators=(",", ":"), sort_keys=True).encode()
+    nonce = os.urandom(12)
+    ct, tag = AES.new(KEY, AES.MODE_GCM, nonce=nonce).encrypt_and_digest(plaintext)
+    return ct + tag, nonce
+
+
+def test_decode_both_plaintext_formats():
+    """✅ Voting and registration payloads decode; foreign or malformed ones are informal."""
+    assert decode_prefs(canonical_prefs([3, 1], "e1", "t"), "e1") == [3, 1]
+    assert decode_prefs(b'{"preferences":[2,4],"voter":"x"}', "e1") == [2, 4]
+    assert decode_prefs(b'{"p":[5]}', "e1") == [5]
+    for bad in (canonical_prefs([1], "e2", "t"), canonical_prefs([1, 1], "e1", "t"),
+                canonical_prefs([], "e1", "t"), b'{"preferences":["a"]}', b"not json", b"[1,2]"):
+        assert decode_prefs(bad, "e1") is None
+
+
+def test_chunk_fast_path_matches_per_ballot_decode():
+    """✅ The one-json.loads-per-chunk path agrees with decode_prefs on mixed input."""
+    plains = [
+        canonical_prefs([1, 2, 3], "e1", "t"),
+        canonical_prefs([2], "e1", 'x,"p":[9,9]'),       # decoy in the timestamp
+        canonical_prefs([4, 4], "e1", "t"),                # repeated candidate
+        canonical_prefs([1], "other", "t"),
+        b'{"preferences":[7,8]}',
+    ]
+    chunk = decode_chunk(plains, "e1")
+    expected = [p for p in (decode_prefs(x, "e1") for x in plains) if p is not None]
+    assert sorted(chunk.prefs) == sorted(expected) == [[1, 2, 3], [2], [7, 8]]
+    assert chunk.informal == 2
+
+    odd = decode_chunk(plains + [b'{"e":"e1","t":"t","p":[[1]]}', b'{"e":"e1","t":"t","p":[1.5]}'], "e1")
+    assert sorted(odd.prefs) == sorted(expected) and odd.informal == 4
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_stream_from_db_with_both_writers(tmp_path, monkeypatch, pooled):
+    """✅ Rows from both writers stream back in order, decrypted inline or on the pool."""
+    monkeypatch.setenv("BALLOT_AES_KEY", KEY.hex())
+    key = BallotKeyContext()
+    monkeypatch.setattr("common.tally.decrypt.ballot_key", key)
+    engine = create_engine(f"sqlite:///{tmp_path / 'dec.db'}")
+    Base.metadata.create_all(bind=engine)
+    voting = [canonical_prefs([i % 5 + 1, (i + 1) % 5 + 1], "e1", "t") for i in range(900)]
+    with sessionmaker(bind=engine)() as db:
+        rows = key.encrypt_many(voting)
+        rows += [_registration_encrypt({"preferences": [9, 8]}) for _ in range(100)]
+        rows += [_registration_encrypt({"choice": "x"})]
+        db.add_all(Ballot(election_id="e1", ciphertext=ct, nonce=n, receipt="00" * 32) for ct, n in rows)
+        db.commit()
+
+        pool = CryptoPool(workers=1) if pooled else None
+        try:
+            chunks = list(iter_preferences(db, "e1", pool=pool, batch=256, chunk_size=64, window=2))
+        finally:
+            if pool:
+                pool.shutdown()
+    prefs = [p for c in chunks for p in c.prefs]
+    assert len(prefs) == 1000 and sum(c.informal for c in chunks) == 1
+    assert prefs[:2] == [[1, 2], [2, 3]] and prefs[-1] == [9, 8]
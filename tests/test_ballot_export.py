@@ -0,0 +1,143 @@
+"""
+tests/test_ballot_export.py
+Validates the streaming binary ballot export: record round trip, chunk
+hashes, signed manifest, tamper detection and the dual-approval export job.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base, get_session
+from common.export import export_election, iter_records, manifest_message, verify_export, write_export
+from common.jobs import JobWorker
+from common.models.models import Ballot, BallotChain
+from cryptoutils.pool import CryptoPool
+import services.results.routes as results_routes
+
+
+@pytest.fixture()
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        for i in range(1, 301):
+            b = Ballot(election_id="e1", ciphertext=os.urandom(40 + i % 7), nonce=os.urandom(12),
+                       receipt=f"{i:064x}")
+            db.add(b)
+            db.flush()
+            if i % 2:  # every other ballot has a chain link
+                db.add(BallotChain(ballot_id=b.id, election_id="e1", seq=(i + 1) // 2,
+                                   prev_hash=bytes(32), curr_hash=i.to_bytes(32, "big")))
+        db.add(Ballot(election_id="other", ciphertext=b"x", nonce=bytes(12), receipt="ff" * 32))
+        db.commit()
+    return factory
+
+
+def test_records_round_trip_in_chunks(factory):
+    """✅ Every ballot of the election comes back byte-for-byte, split into bounded chunks."""
+    buf = io.BytesIO()
+    with factory() as db:
+        manifest = write_export(db, "e1", buf, chunk_bytes=2048)
+        rows = db.query(Ballot).filter_by(election_id="e1").order_by(Ballot.id).all()
+        links = {l.ballot_id: l.curr_hash for l in db.query(BallotChain)}
+    assert manifest["records"] == 300 and len(manifest["chunks"]) > 5
+    assert all(c["length"] <= 2048 for c in manifest["chunks"])
+    assert manifest["bytes"] == len(buf.getvalue())
+
+    buf.seek(0)
+    recs = list(iter_records(buf))
+    assert [r["id"] for r in recs] == [b.id for b in rows]
+    for r, b in zip(recs, rows):
+        assert (r["nonce"], r["ciphertext"], r["receipt"]) == (b.nonce, b.ciphertext, b.receipt)
+        assert r["chain_hash"] == links.get(b.id)
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_signed_manifest_and_parallel_chunk_check(factory, tmp_path, pooled):
+    """❌ A flipped byte fails exactly its chunk; an edited manifest fails the signature."""
+    with factory() as db:
+        path, manifest = export_election(db, "e1", "x", str(tmp_path / "out"), chunk_bytes=2048, action_id=7)
+    pool = CryptoPool(workers=2) if pooled else None
+    try:
+        assert verify_export(path, manifest, pool)["ok"]
+        victim = manifest["chunks"][1]
+        with open(path, "r+b") as f:
+            f.seek(victim["offset"] + 5)
+            byte = f.read(1)
+            f.seek(victim["offset"] + 5)
+            f.write(bytes([byte[0] ^ 1]))
+        res = verify_export(path, manifest, pool)
+        assert not res["ok"] and res["bad_chunks"] == [1]
+    finally:
+        if pool:
+            pool.shutdown()
+    on_disk = json.loads((tmp_path / "out" / "x.manifest.json").read_text())
+    assert on_disk == manifest
+    on_disk["records"] += 1
+    assert verify_export(path, on_disk, None)["signature"] is False
+
+
+def test_manifest_signed_by_other_key_rejected(factory, tmp_path):
+    """❌ A manifest re-signed with a different key (and carrying that key) fails verification."""
+    with factory() as db:
+        path, manifest = export_election(db, "e1", "x", str(tmp_path / "out"), chunk_bytes=2048)
+    forged = {**manifest, "records": manifest["records"] - 1}
+    other = Ed25519PrivateKey.generate()
+    forged["signature"] = base64.b64encode(other.sign(manifest_message(forged))).decode()
+    forged["public_key"] = base64.b64encode(
+        other.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    ).decode()
+    assert verify_export(path, forged, None)["signature"] is False
+    assert verify_export(path, forged, None, public_key=forged["public_key"])["signature"] is True
+    assert verify_export(path, manifest, None, public_key=forged["public_key"])["signature"] is False
+
+
+def test_export_runs_after_second_approval(factory, tmp_path, monkeypatch):
+    """✅ One approval waits; the second distinct admin queues the export job, which finishes DONE."""
+    monkeypatch.setattr("common.export.EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr("common.jobs._schedules", {})  # no daily backups in this worker
+    app = FastAPI()
+    app.include_router(results_routes.router, prefix="/results")
+
+    def session():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    client = TestClient(app)
+    act = client.post("/results/results/export/request", params={"requested_by": "a@x", "election_id": "e1"}).json()
+    aid = act["action_id"]
+    first = client.post(f"/results/results/export/approve/{aid}", params={"admin_email": "a1@x"}).json()
+    assert first["status"] == "PENDING" and first["approvals"] == 1
+    second = client.post(f"/results/results/export/approve/{aid}", params={"admin_email": "a2@x"}).json()
+    assert second["status"] == "EXPORTING"
+    assert client.get(f"/results/results/jobs/{second['job_id']}").json()["status"] == "QUEUED"
+
+    assert JobWorker(session_factory=factory, name="w").run_until_idle() == 1
+    job = client.get(f"/results/results/jobs/{second['job_id']}").json()
+    assert job["status"] == "DONE" and job["result"]["records"] == 300
+
+    status = client.get(f"/results/results/export/{aid}").json()
+    assert status["status"] == "DONE" and status["records"] == 300
+    manifest = status["manifest"]
+    assert manifest["approvers"] == ["a1@x", "a2@x"] and manifest["action_id"] == aid
+    assert verify_export(status["file"], manifest, None)["ok"]
+
+    os.remove(tmp_path / f"export_{aid}.manifest.json")
+    gone = client.get(f"/results/results/export/{aid}")
+    assert gone.status_code == 200 and gone.json()["manifest"] is None
@@ -0,0 +1,48 @@
+"""
+tests/test_ballot_key_context.py
+Validates the cached ballot key context (SR-12 AEAD on the hot path).
+The key is loaded once, batches round-trip, and rotation is explicit.
+"""
+
+import os
+import sys
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cryptoutils.ballots import BallotKeyContext
+
+
+def test_batch_round_trip_with_unique_nonces(monkeypatch):
+    """✅ encrypt_many/decrypt_many round-trip and never reuse a nonce."""
+    monkeypatch.setenv("BALLOT_AES_KEY", "11" * 32)
+    ctx = BallotKeyContext()
+    blobs = [f"ballot-{i}".encode() for i in range(200)]
+    sealed = ctx.encrypt_many(blobs)
+    assert len({nonce for _, nonce in sealed}) == 200
+    assert ctx.decrypt_many(sealed) == blobs
+    ct, nonce = ctx.encrypt(b"single")
+    assert ctx.decrypt(ct, nonce) == b"single"
+
+
+def test_key_is_cached_until_reload(monkeypatch):
+    """❌ Env changes are ignored until reload(); old ciphertexts then fail."""
+    monkeypatch.setenv("BALLOT_AES_KEY", "11" * 32)
+    ctx = BallotKeyContext()
+    ct, nonce = ctx.encrypt(b"vote")
+
+    monkeypatch.setenv("BALLOT_AES_KEY", "22" * 32)
+    assert ctx.decrypt(ct, nonce) == b"vote"   # still the cached key
+
+    ctx.reload()
+    with pytest.raises(InvalidTag):
+        ctx.decrypt(ct, nonce)
+
+    monkeypatch.setenv("BALLOT_AES_KEY", "not-hex")
+    with pytest.raises(ValueError):
+        ctx.reload()
+    ct, nonce = ctx.encrypt(b"x")
+    assert ctx.decrypt(ct, nonce) == b"x"      # rotated key kept
@@ -0,0 +1,92 @@
+"""
+tests/test_chain_checkpoints.py
+Validates periodic Ed25519-signed chain checkpoints.
+Checkpoints are taken every N ballots, match the chain, and verify offline.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.chain.appender import ChainAppender
+from common.chain.checkpoints import Checkpointer, checkpoint_message, to_dict
+from common.chain.merkle import merkle_index
+from common.crypto.signing import verify_detached_b64
+from common.models.models import Ballot, ChainCheckpoint, ChainHead
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cp.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _append(appender, factory, n, election_id="e1", with_index=True):
+    def work(db):
+        ballots = []
+        for _ in range(n):
+            r = os.urandom(32)
+            ballots.append(Ballot(election_id=election_id, ciphertext=r, nonce=b"n" * 12, receipt=r.hex()))
+        db.add_all(ballots)
+        db.flush()
+        appender.append(db, election_id, [(b.id, b.ciphertext, b.nonce) for b in ballots],
+                        receipts=[b.ciphertext for b in ballots] if with_index else None)
+    appender.run(factory, work)
+
+
+def test_checkpoint_every_n_ballots_is_signed_and_matches_chain(session_factory):
+    """✅ A checkpoint is signed once N ballots accrue, not before; it verifies."""
+    appender = ChainAppender()
+    cpr = Checkpointer(session_factory, every_n=10, every_s=3600)
+
+    _append(appender, session_factory, 10)
+    assert cpr.run_once() == 1            # first checkpoint (no previous one)
+    _append(appender, session_factory, 4)
+    assert cpr.run_once() == 0            # only 4 new ballots, not stale yet
+    _append(appender, session_factory, 6)
+    assert cpr.run_once() == 1
+
+    with session_factory() as db:
+        rows = db.query(ChainCheckpoint).order_by(ChainCheckpoint.height).all()
+        head = db.get(ChainHead, "e1")
+        assert [r.height for r in rows] == [10, 20]
+        latest = to_dict(rows[-1])
+        assert latest["tip_hash"] == head.head_hash.hex()
+        assert latest["merkle_root"] == merkle_index.root(db, "e1", 20).hex()
+    assert verify_detached_b64(checkpoint_message(latest), latest["signature"], latest["public_key"])
+
+
+def test_tampered_checkpoint_fails_verification(session_factory):
+    """❌ Changing any signed field invalidates the signature."""
+    _append(ChainAppender(), session_factory, 3)
+    cpr = Checkpointer(session_factory, every_n=1, every_s=3600)
+    assert cpr.run_once() == 1
+    assert cpr.run_once() == 0            # nothing new, no duplicate
+    with session_factory() as db:
+        cp = to_dict(db.query(ChainCheckpoint).one())
+    cp["height"] = 4
+    assert not verify_detached_b64(checkpoint_message(cp), cp["signature"], cp["public_key"])
+
+
+def test_checkpoint_deferred_until_merkle_index_is_built(session_factory):
+    """❌ No checkpoint is signed while the Merkle index lags the head."""
+    _append(ChainAppender(), session_factory, 5, with_index=False)
+    cpr = Checkpointer(session_factory, every_n=1, every_s=3600)
+    with session_factory() as db:
+        assert merkle_index.backfill_step(db, "e1", chunk=3) == (3, 5)
+    assert cpr.run_once() == 0
+    with session_factory() as db:
+        assert db.query(ChainCheckpoint).count() == 0
+        assert merkle_index.backfill_step(db, "e1") == (5, 5)
+    assert cpr.run_once() == 1
+    with session_factory() as db:
+        cp = db.query(ChainCheckpoint).one()
+        assert cp.height == 5 and cp.merkle_root == merkle_index.root(db, "e1", 5).hex()
@@ -0,0 +1,89 @@
+"""
+tests/test_chain_tip.py
+Validates the cached chain-tip endpoint: ETag, 304, long-poll wake-up on
+invalidation, one DB load per TTL under polling and an LRU bound on elections.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.chain.tip import TipCache
+
+
+def _app(state):
+    async def loader(election_id):
+        state["loads"] += 1
+        return {"election_id": election_id, "height": state["height"],
+                "tip_hash": f"{state['height']:064x}", "ballot_id": state["height"]}
+
+    cache = TipCache(loader=loader, ttl=60)
+    app = FastAPI()
+
+    @app.get("/tip")
+    async def tip(request: Request, election_id: str, wait: float = 0):
+        return await cache.respond(request, election_id, wait)
+
+    return app, cache
+
+
+def test_etag_and_conditional_get_hit_cache():
+    """✅ Repeat polls are served from memory; matching If-None-Match gives 304."""
+    state = {"height": 3, "loads": 0}
+    app, _ = _app(state)
+    with TestClient(app) as c:
+        r = c.get("/tip", params={"election_id": "e1"})
+        assert r.status_code == 200 and r.json()["height"] == 3
+        etag = r.headers["etag"]
+        for _ in range(20):
+            assert c.get("/tip", params={"election_id": "e1"},
+                         headers={"If-None-Match": etag}).status_code == 304
+    assert state["loads"] == 1
+
+
+def test_long_poll_returns_when_tip_moves():
+    """✅ wait=N blocks on an unchanged tip and returns promptly after an append."""
+    state = {"height": 1, "loads": 0}
+    app, cache = _app(state)
+    with TestClient(app) as c:
+        etag = c.get("/tip", params={"election_id": "e1"}).headers["etag"]
+
+        def append():
+            time.sleep(0.3)
+            state["height"] = 2
+            cache.invalidate("e1")      # what the chain appender does after commit
+
+        threading.Thread(target=append).start()
+        t0 = time.monotonic()
+        r = c.get("/tip", params={"election_id": "e1", "wait": 5}, headers={"If-None-Match": etag})
+        assert r.status_code == 200 and r.json()["height"] == 2
+        assert 0.25 < time.monotonic() - t0 < 2
+
+        r = c.get("/tip", params={"election_id": "e1", "wait": 0.2},
+                  headers={"If-None-Match": r.headers["etag"]})
+        assert r.status_code == 304       # timed out without a change
+
+
+def test_cache_is_bounded_lru():
+    """❌ Polling many election ids keeps at most max_entries tips and no idle locks."""
+    async def loader(election_id):
+        return {"election_id": election_id, "height": 0, "tip_hash": "00" * 32, "ballot_id": None}
+
+    cache = TipCache(loader=loader, ttl=60, max_entries=3)
+
+    async def poll():
+        for eid in ("a", "b", "c", "a", "d", "e"):
+            await cache.get(eid)
+
+    asyncio.run(poll())
+    assert list(cache._entries) == ["a", "d", "e"]  # "a" was used again, so "b" and "c" went first
+    assert cache._locks == {}
+    assert cache.loads == 5 and cache.hits == 1
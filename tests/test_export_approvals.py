@@ -0,0 +1,110 @@
+"""
+tests/test_export_approvals.py
+Validates the single-transaction export approval: cached approval counter,
+configurable quorum, duplicate rejection and one export job under races.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.approvals import DuplicateApproval, approve_export, new_export_action
+from common.db import Base, get_session
+from common.models.models import Approval, Job, ResultAction
+import services.results.routes as results_routes
+
+
+@pytest.fixture()
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'approvals.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_quorum_reached_in_one_commit(factory, monkeypatch):
+    """✅ Each approval commits once; the one reaching quorum also queues the export job."""
+    monkeypatch.setattr("common.approvals.EXPORT_APPROVAL_QUORUM", 3)
+    with factory() as db:
+        aid = new_export_action(db, "req@x", "e1").id
+        assert db.get(ResultAction, aid).quorum == 3
+    commits = []
+    results = []
+    for email in ("a@x", "b@x", "c@x"):
+        with factory() as db:
+            event.listen(db, "after_commit", lambda s: commits.append(1))
+            results.append(approve_export(db, aid, email))
+    assert len(commits) == 3
+    assert [(r.status, r.approvals, r.job_id is not None) for r in results] == [
+        ("PENDING", 1, False), ("PENDING", 2, False), ("EXPORTING", 3, True),
+    ]
+    with factory() as db:
+        job = db.get(Job, results[-1].job_id)
+        assert job.type == "export" and job.status == "QUEUED"
+        late = approve_export(db, aid, "d@x")
+        assert not late.applied and late.status == "EXPORTING" and late.approvals == 3
+        assert db.query(Approval).filter_by(action_id=aid).count() == 3
+
+
+def test_duplicate_and_unknown_approvals_rejected(factory):
+    """❌ The same admin cannot approve twice (409); unknown actions are 404."""
+    app = FastAPI()
+    app.include_router(results_routes.router, prefix="/results")
+
+    def session():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    client = TestClient(app)
+    act = client.post("/results/results/export/request",
+                      params={"requested_by": "r@x", "election_id": "e1", "quorum": 1}).json()
+    assert act["quorum"] == 2  # never below the configured minimum
+    aid = act["action_id"]
+    assert client.post(f"/results/results/export/approve/{aid}", params={"admin_email": "a@x"}).json()["approvals"] == 1
+    dup = client.post(f"/results/results/export/approve/{aid}", params={"admin_email": "a@x"})
+    assert dup.status_code == 409
+    assert client.post("/results/results/export/approve/999", params={"admin_email": "a@x"}).status_code == 404
+    with factory() as db:
+        assert db.get(ResultAction, aid).approvals_count == 1
+        with pytest.raises(DuplicateApproval):
+            approve_export(db, aid, "a@x")
+
+
+def test_concurrent_approvals_trigger_one_export(factory):
+    """✅ Many admins approving at once: counter matches rows and exactly one job is queued."""
+    with factory() as db:
+        aid = new_export_action(db, "req@x", "e1").id
+    barrier = threading.Barrier(8)
+    results, errors = [], []
+
+    def approve(i):
+        barrier.wait()
+        try:
+            with factory() as db:
+                results.append(approve_export(db, aid, f"admin{i}@x"))
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=approve, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    applied = [r for r in results if r.applied]
+    assert len(applied) == 2
+    assert sum(r.job_id is not None for r in results) == 1
+    with factory() as db:
+        act = db.get(ResultAction, aid)
+        assert act.status == "EXPORTING" and act.approvals_count == 2
+        assert db.query(Approval).filter_by(action_id=aid).count() == 2
+        assert db.query(Job).filter_by(type="export").count() == 1
@@ -0,0 +1,170 @@
+"""
+tests/test_jobs.py
+Validates the database-backed job queue: claim and completion, retries with
+backoff, per-type concurrency slots, deduplicated schedules and lease expiry.
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common import jobs
+from common.db import Base
+from common.jobs import JobLost, JobWorker, handler, schedule, submit
+from common.models.models import Job
+
+
+@pytest.fixture()
+def factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "_registry", {})
+    monkeypatch.setattr(jobs, "_schedules", {})
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def get(factory, job_id):
+    with factory() as db:
+        return db.get(Job, job_id)
+
+
+def test_job_runs_with_progress_and_result(factory):
+    """✅ A queued job is claimed once, reports progress and ends DONE with its result."""
+    @handler("sum")
+    def add(ctx, a, b):
+        ctx.progress(1, total=2, force=True)
+        return {"sum": a + b}
+
+    with factory() as db:
+        job_id = submit(db, "sum", {"a": 2, "b": 3}).id
+        submit(db, "unknown", {})  # no handler in this process: left alone
+    worker = JobWorker(session_factory=factory, name="w1")
+    assert worker.run_until_idle() == 1
+    job = get(factory, job_id)
+    assert job.status == "DONE" and job.attempts == 1 and job.slot is None
+    assert jobs.job_view(job)["result"] == {"sum": 5}
+    assert (job.progress, job.total) == (1, 2)
+
+
+def test_failed_job_is_retried_then_failed(factory):
+    """❌ A failing handler is re-queued with backoff and FAILED after max_attempts."""
+    calls = []
+
+    @handler("flaky", max_attempts=2)
+    def flaky(ctx):
+        calls.append(ctx.job_id)
+        raise OSError("disk full")
+
+    with factory() as db:
+        job_id = submit(db, "flaky").id
+    worker = JobWorker(session_factory=factory, name="w1", retry_base_s=3600)
+    assert worker.run_once()
+    job = get(factory, job_id)
+    assert job.status == "QUEUED" and "disk full" in job.error
+    assert job.run_after.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(minutes=50)
+    assert not worker.run_once()  # backoff not yet elapsed
+
+    with factory() as db:
+        db.execute(update(Job).values(run_after=datetime.now(timezone.utc)))
+        db.commit()
+    assert worker.run_once()
+    job = get(factory, job_id)
+    assert job.status == "FAILED" and job.attempts == 2 and job.finished_at is not None
+    assert len(calls) == 2
+
+
+def test_per_type_concurrency_limit(factory):
+    """✅ No more jobs of a type run at once than its slots, across workers."""
+    release = threading.Event()
+    running = []
+
+    @handler("slow", concurrency=2)
+    def slow(ctx):
+        running.append(ctx.job_id)
+        release.wait(5)
+
+    with factory() as db:
+        ids = [submit(db, "slow").id for _ in range(3)]
+    workers = [JobWorker(session_factory=factory, name=f"w{i}") for i in range(3)]
+    threads = [threading.Thread(target=w.run_once) for w in workers]
+    for t in threads:
+        t.start()
+    for _ in range(100):
+        if len(running) == 2:
+            break
+        threading.Event().wait(0.05)
+    with factory() as db:
+        statuses = sorted(db.get(Job, i).status for i in ids)
+    assert statuses == ["QUEUED", "RUNNING", "RUNNING"]
+    release.set()
+    for t in threads:
+        t.join()
+    assert workers[0].run_until_idle() == 1
+    assert all(get(factory, i).status == "DONE" for i in ids)
+
+
+def test_schedule_enqueues_once_across_workers(factory):
+    """✅ Two workers polling the same schedule run one job per period."""
+    ran = []
+    handler("nightly")(lambda ctx: ran.append(ctx.worker))
+    schedule("nightly", 3600)
+
+    a = JobWorker(session_factory=factory, name="a")
+    b = JobWorker(session_factory=factory, name="b")
+    a.run_once()
+    b.run_once()
+    a.run_once()
+    assert len(ran) == 1
+    with factory() as db:
+        assert db.query(Job).filter_by(type="nightly").count() == 1
+        assert submit(db, "nightly", dedupe_key=db.query(Job).one().dedupe_key).status == "DONE"
+
+
+def test_expired_lease_is_requeued(factory):
+    """❌ A job whose worker stopped heartbeating is re-queued; the old worker loses it."""
+    handler("noop")(lambda ctx: "ok")
+    with factory() as db:
+        job_id = submit(db, "noop").id
+        dead = JobWorker(session_factory=factory, name="dead")
+        claimed = dead.claim(db)
+        assert claimed[0] == job_id
+        db.execute(update(Job).values(heartbeat_at=datetime.now(timezone.utc) - timedelta(hours=1)))
+        db.commit()
+
+    alive = JobWorker(session_factory=factory, name="alive", lease_s=60)
+    assert alive.run_once()
+    job = get(factory, job_id)
+    assert job.status == "DONE" and job.worker == "alive" and job.attempts == 2
+
+    ctx = jobs.JobContext(factory, job_id, "dead")
+    with pytest.raises(JobLost):
+        ctx.progress(5, force=True)
+
+
+def test_lost_lease_is_noticed_without_progress(factory):
+    """❌ A handler that never reports progress still loses its result once re-queued elsewhere."""
+    seen = []
+
+    @handler("quiet")
+    def quiet(ctx):
+        with factory() as db:  # another worker takes the job over
+            db.execute(update(Job).where(Job.id == ctx.job_id).values(worker="other"))
+            db.commit()
+        seen.append(ctx.lost.wait(5))
+        return "stale"
+
+    with factory() as db:
+        job_id = submit(db, "quiet").id
+    worker = JobWorker(session_factory=factory, name="w1", lease_s=0.3)
+    assert worker.run_once()
+    assert seen == [True] and worker.ran == 0
+    job = get(factory, job_id)
+    assert job.status == "RUNNING" and job.worker == "other" and job.result is None
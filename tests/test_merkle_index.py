@@ -0,0 +1,168 @@
+"""
+tests/test_merkle_index.py
+Validates the incremental Merkle index over ballot receipts (SR-12 audit).
+Proofs must verify against the root, and fail for any altered input or
+index; chains that predate the index are built by the backfill job.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base, get_session
+from common.chain.appender import ChainAppender
+from common.chain.merkle import leaf_hash, merkle_index, node_hash, verify_proof
+from common.jobs import JobWorker, submit
+from common.models.models import Ballot, ChainHead, Job
+import services.results.routes_audit as audit_routes
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'merkle.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _reference_root(receipts):
+    level = [leaf_hash(r) for r in receipts]
+    while len(level) > 1:
+        level = [
+            node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def _append(appender, factory, receipts, election_id="e1", with_index=True):
+    def work(db):
+        ballots = [Ballot(election_id=election_id, ciphertext=r, nonce=b"n" * 12, receipt=r.hex())
+                   for r in receipts]
+        db.add_all(ballots)
+        db.flush()
+        appender.append(
+            db, election_id, [(b.id, b.ciphertext, b.nonce) for b in ballots],
+            receipts=list(receipts) if with_index else None,
+        )
+    appender.run(factory, work)
+
+
+def test_incremental_tree_matches_full_rebuild_and_proves(session_factory):
+    """✅ Batched appends give the reference root; every leaf has a valid proof."""
+    appender = ChainAppender()
+    receipts = [hashlib.sha256(bytes([i])).digest() for i in range(37)]
+    pos = 0
+    for size in (1, 2, 5, 1, 8, 3, 17):
+        _append(appender, session_factory, receipts[pos : pos + size])
+        pos += size
+        with session_factory() as db:
+            assert merkle_index.root(db, "e1", pos) == _reference_root(receipts[:pos])
+
+    with session_factory() as db:
+        root = merkle_index.root(db, "e1", 37)
+        for i, r in enumerate(receipts):
+            path, proof_root = merkle_index.proof(db, "e1", i, 37)
+            assert proof_root == root
+            assert len(path) <= 6
+            assert verify_proof(r, i, 37, path, root)
+
+
+def test_tampered_proof_fails(session_factory):
+    """❌ A wrong receipt or altered sibling hash does not reach the root."""
+    receipts = [hashlib.sha256(bytes([i])).digest() for i in range(9)]
+    _append(ChainAppender(), session_factory, receipts)
+    with session_factory() as db:
+        path, root = merkle_index.proof(db, "e1", 4, 9)
+    assert verify_proof(receipts[4], 4, 9, path, root)
+    assert not verify_proof(receipts[5], 4, 9, path, root)
+    path[0]["hash"] = "00" * 32
+    assert not verify_proof(receipts[4], 4, 9, path, root)
+
+
+def test_proof_sides_come_from_the_index(session_factory):
+    """❌ A valid path cannot be replayed for another index, with or without edited side flags."""
+    receipts = [hashlib.sha256(bytes([i])).digest() for i in range(9)]
+    _append(ChainAppender(), session_factory, receipts)
+    with session_factory() as db:
+        path, root = merkle_index.proof(db, "e1", 4, 9)
+    assert not verify_proof(receipts[4], 5, 9, path, root)
+    flipped = [{**step, "side": "R" if step["side"] == "L" else "L"} for step in path]
+    assert verify_proof(receipts[4], 4, 9, flipped, root)
+    assert not verify_proof(receipts[4], 4, 9, path[:-1], root)
+    assert not verify_proof(receipts[8], 8, 9, path, root)
+
+
+def test_chain_without_index_is_backfilled_by_job(session_factory, monkeypatch):
+    """✅ Appends skip an unbuilt index; the backfill job builds it and appends then keep it current."""
+    appender = ChainAppender()
+    receipts = [hashlib.sha256(bytes([i])).digest() for i in range(12)]
+    _append(appender, session_factory, receipts[:5], with_index=False)
+    _append(appender, session_factory, receipts[5:6])
+    with session_factory() as db:
+        assert db.get(ChainHead, "e1").height == 6
+        assert merkle_index.built(db, "e1") == 0  # the hot path did not backfill
+
+    with session_factory() as db:
+        job = submit(db, "merkle_backfill", {"election_id": "e1"})
+    monkeypatch.setattr("common.chain.merkle.MERKLE_BACKFILL_CHUNK", 4)  # two steps
+    monkeypatch.setattr("common.jobs._schedules", {})
+    assert JobWorker(session_factory=session_factory, name="w").run_until_idle() == 1
+    with session_factory() as db:
+        done = db.get(Job, job.id)
+        assert done.status == "DONE" and json.loads(done.result)["leaves"] == 6
+        assert merkle_index.root(db, "e1", 6) == _reference_root(receipts[:6])
+
+    _append(appender, session_factory, receipts[6:])  # stale cached head: one CAS retry, then indexed
+    with session_factory() as db:
+        assert merkle_index.built(db, "e1") == 12
+        assert merkle_index.root(db, "e1", 12) == _reference_root(receipts)
+    assert appender.conflicts == 1
+
+
+def test_part_built_index_serves_no_proof(session_factory, monkeypatch):
+    """❌ Mid-backfill no root is signed; a failed backfill job is re-queued on the next request."""
+    receipts = [hashlib.sha256(bytes([i])).digest() for i in range(7)]
+    _append(ChainAppender(), session_factory, receipts, with_index=False)
+    with session_factory() as db:
+        assert merkle_index.backfill_step(db, "e1", chunk=5) == (5, 7)
+        with pytest.raises(LookupError):
+            merkle_index.proof(db, "e1", 1, 7)  # leaf 1 is indexed, the 7-leaf root is not
+        with pytest.raises(LookupError):
+            merkle_index.root(db, "e1", 7)
+
+    monkeypatch.setattr("common.jobs._schedules", {})
+    app = FastAPI()
+    app.include_router(audit_routes.router)
+
+    def session():
+        with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    client = TestClient(app)
+    first = client.get(f"/audit/proof/{receipts[1].hex()}")
+    assert first.status_code == 503
+    job_id = first.json()["detail"]["job_id"]
+    assert client.get(f"/audit/proof/{receipts[1].hex()}").json()["detail"]["job_id"] == job_id
+
+    with session_factory() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(status="FAILED"))
+        db.commit()
+    retry = client.get(f"/audit/proof/{receipts[1].hex()}").json()["detail"]["job_id"]
+    assert retry != job_id
+
+    assert JobWorker(session_factory=session_factory, name="w").run_until_idle() == 1
+    body = client.get(f"/audit/proof/{receipts[1].hex()}").json()
+    assert body["signed_root"]["size"] == 7
+    assert bytes.fromhex(body["signed_root"]["root"]) == _reference_root(receipts)
+    assert verify_proof(receipts[1], 1, 7, body["path"], _reference_root(receipts))
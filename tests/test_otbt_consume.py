@@ -0,0 +1,65 @@
+"""
+tests/test_otbt_consume.py
+Validates single-statement one-time ballot token consumption (SR-10).
+Expired or spent tokens must never be consumed, and rejects are cached.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.models.models import BallotToken
+from services.voting.deps import NegativeTokenCache, consume_otbts
+
+
+@pytest.fixture()
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'otbt.db'}")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+    with sessionmaker(bind=engine)() as s:
+        s.add_all([
+            BallotToken(token="live", voter_ref="v1", exp_at=now + timedelta(hours=1)),
+            BallotToken(token="expired", voter_ref="v2", exp_at=now - timedelta(minutes=1)),
+            BallotToken(token="spent", voter_ref="v3", exp_at=now + timedelta(hours=1),
+                        consumed_at=now),
+        ])
+        s.commit()
+        yield s
+
+
+def test_only_live_tokens_are_consumed(db):
+    """✅ One UPDATE consumes live tokens and skips expired/spent/unknown ones."""
+    consumed = consume_otbts(db, ["live", "expired", "spent", "unknown"])
+    db.commit()
+    assert consumed == {"live"}
+    assert db.query(BallotToken).filter_by(token="live").one().consumed_at is not None
+
+
+def test_double_spend_is_impossible(db):
+    """❌ A second consumption of the same token matches no row."""
+    assert consume_otbts(db, ["live"]) == {"live"}
+    db.commit()
+    assert consume_otbts(db, ["live"]) == set()
+
+
+def test_negative_cache_bounds_and_expiry():
+    """✅ Negative cache answers replays from memory and stays bounded."""
+    cache = NegativeTokenCache(maxsize=2, ttl=60)
+    for t in ("a", "b", "c"):
+        cache.add(t)
+    assert "a" not in cache          # evicted (LRU)
+    assert "b" in cache and "c" in cache
+    assert cache.hits == 2
+
+    short = NegativeTokenCache(maxsize=10, ttl=-1)
+    short.add("x")
+    assert "x" not in short          # already expired
@@ -0,0 +1,103 @@
+"""
+tests/test_otbt_issue.py
+Validates bulk OTBT issuance and the chunked AES-GCM mapping stream.
+The mailing-house file must decrypt to exactly the tokens stored in the DB.
+"""
+
+import io
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.models.models import BallotToken
+from cryptoutils.stream import EncryptedStreamWriter, StreamFormatError, decrypt_to
+from services.registration.otbt_issue import issue_tokens
+
+KEY = bytes(range(32))
+
+
+def test_issued_tokens_match_encrypted_mapping(tmp_path):
+    """✅ Every voter_ref gets a unique token; the mapping file round-trips."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'otbt.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    exp = datetime.now(timezone.utc) + timedelta(days=30)
+
+    out = io.BytesIO()
+    refs = [f"V{i:05d}" for i in range(2500)]
+    stats = issue_tokens(refs, exp, out, KEY, batch_size=1000, session_factory=factory)
+    assert stats["issued"] == 2500 and stats["rows_per_sec"] > 0
+
+    plain = io.BytesIO()
+    decrypt_to(io.BytesIO(out.getvalue()), plain, KEY)
+    mapping = dict(line.split(",") for line in plain.getvalue().decode().splitlines())
+
+    with factory() as db:
+        stored = {t.voter_ref: t.token for t in db.query(BallotToken).all()}
+    assert mapping == stored
+    assert len(set(stored.values())) == 2500
+    assert all(len(t) == 64 for t in stored.values())
+
+
+def _sealed(data: bytes, chunk_size: int = 64) -> bytes:
+    buf = io.BytesIO()
+    with EncryptedStreamWriter(buf, KEY, chunk_size=chunk_size) as w:
+        w.write(data)
+    return buf.getvalue()
+
+
+def test_stream_detects_truncation_and_tampering():
+    """❌ Dropping the trailer or flipping a byte must fail verification."""
+    blob = _sealed(os.urandom(1000))
+
+    with pytest.raises(StreamFormatError):
+        decrypt_to(io.BytesIO(blob[:-40]), io.BytesIO(), KEY)
+
+    tampered = bytearray(blob)
+    tampered[60] ^= 0x01
+    with pytest.raises(InvalidTag):
+        decrypt_to(io.BytesIO(bytes(tampered)), io.BytesIO(), KEY)
+
+
+def test_failed_commit_leaves_marked_mapping(tmp_path):
+    """❌ A batch whose commit fails is rolled back and marked; earlier batches stay mapped."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'otbt.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    exp = datetime.now(timezone.utc) + timedelta(days=30)
+    commits = []
+
+    def failing_factory():
+        db = factory()
+        real_commit = db.commit
+
+        def commit():
+            commits.append(1)
+            if len(commits) == 2:
+                raise RuntimeError("commit failed")
+            real_commit()
+
+        db.commit = commit
+        return db
+
+    out = io.BytesIO()
+    refs = [f"V{i:05d}" for i in range(250)]
+    with pytest.raises(RuntimeError):
+        issue_tokens(refs, exp, out, KEY, batch_size=100, session_factory=failing_factory)
+
+    plain = io.BytesIO()
+    decrypt_to(io.BytesIO(out.getvalue()), plain, KEY)  # trailer written despite the error
+    lines = plain.getvalue().decode().splitlines()
+    assert len(lines) == 201 and lines[-1] == "#rolled-back,100"
+    with factory() as db:
+        stored = {t.voter_ref: t.token for t in db.query(BallotToken).all()}
+    assert dict(line.split(",") for line in lines[:100]) == stored
@@ -0,0 +1,160 @@
+"""
+tests/test_push.py
+Validates the results/chain push channel: one check fans out to every
+subscriber, deltas only, slow consumers dropped, SSE and WebSocket framing,
+API key, known elections and subscriber caps.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.push import Broadcaster, PushLimit
+from common.tally.live import Snapshot
+import services.results.routes_push as routes_push
+
+KEY = {"X-API-Key": "demo-api-key"}
+
+
+def _sources(state):
+    async def tip(election_id):
+        state["tip_loads"] += 1
+        return {"height": state["height"], "tip_hash": f"{state['height']:064x}"}
+
+    async def results(election_id):
+        body = json.dumps({"tally": state["tally"]}).encode()
+        return Snapshot(version=state["version"], body=body, etag=f"v{state['version']}")
+
+    return tip, results
+
+
+def _state():
+    return {"height": 1, "tally": {"1": 5}, "version": 1, "tip_loads": 0}
+
+
+def test_one_check_fans_out_deltas():
+    """✅ Each subscriber gets the snapshot, then only what changed."""
+    async def scenario():
+        state = _state()
+        bc = Broadcaster(*_sources(state), queue_size=8, poll_s=60)
+        bc.start()
+        subs = [bc.subscribe("e1") for _ in range(50)]
+        await asyncio.sleep(0.05)
+        first = [json.loads(subs[0].queue.get_nowait().data) for _ in range(2)]
+        assert first[0] == {"type": "chain", "election_id": "e1", "height": 1, "tip_hash": f"{1:064x}"}
+        assert first[1]["tally"] == {"1": 5} and first[1]["version"] == 1
+
+        state["tally"], state["version"], state["height"] = {"1": 5, "2": 3}, 2, 2
+        loads = state["tip_loads"]
+        bc.notify("e1")
+        await asyncio.sleep(0.05)
+        assert state["tip_loads"] == loads + 1  # one check for all 50 subscribers
+        events = [json.loads(subs[-1].queue.get_nowait().data) for _ in range(4)][2:]
+        assert events[0]["height"] == 2
+        assert events[1]["tally"] == {"2": 3} and events[1]["version"] == 2
+
+        late = bc.subscribe("e1")  # joins with the current full state
+        assert json.loads(late.queue.get_nowait().data)["height"] == 2
+        assert json.loads(late.queue.get_nowait().data)["tally"] == {"1": 5, "2": 3}
+        await bc.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_dropped():
+    """❌ A client whose queue fills up is unsubscribed with a final 'dropped' event."""
+    async def scenario():
+        state = _state()
+        bc = Broadcaster(*_sources(state), queue_size=3, poll_s=60)
+        bc.start()
+        slow, fast = bc.subscribe("e1"), bc.subscribe("e1")
+        for h in range(2, 6):
+            await asyncio.sleep(0.02)
+            while not fast.queue.empty():
+                fast.queue.get_nowait()
+            state["height"] = h
+            bc.notify("e1")
+        await asyncio.sleep(0.02)
+        assert slow.dropped and not fast.dropped
+        assert json.loads(slow.queue.get_nowait().data)["type"] == "dropped"
+        assert bc.stats()["subscribers"] == 1 and bc.stats()["dropped"] == 1
+        frames = []
+        async for frame in bc.sse(slow):
+            frames.append(frame)
+        assert frames == []  # already drained above; the stream ends
+        await bc.stop()
+
+    asyncio.run(scenario())
+
+
+def test_websocket_and_sse_endpoints(monkeypatch):
+    """✅ WebSocket sends JSON events; SSE frames carry the event type."""
+    state = _state()
+
+    async def known(election_id):
+        return election_id in ("e1", "e2")
+
+    bc = Broadcaster(*_sources(state), queue_size=8, poll_s=60, known=known)
+    monkeypatch.setattr(routes_push, "broadcaster", bc)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        bc.start()
+        yield
+        await bc.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(routes_push.router, prefix="/results")
+    with TestClient(app) as client:
+        with client.websocket_connect("/results/push/ws?election_id=e1", headers=KEY) as ws:
+            assert json.loads(ws.receive_text())["type"] == "chain"
+            assert json.loads(ws.receive_text())["type"] == "results"
+            assert client.get("/results/push/stats").json()["subscribers"] == 1
+
+        sub = bc.subscribe("e2")
+
+        async def first_frame():
+            agen = bc.sse(sub)
+            frame = await agen.__anext__()
+            await agen.aclose()
+            return frame
+
+        frame = client.portal.call(first_frame)
+        assert frame.startswith("event: chain\ndata: {")
+        assert frame.endswith("\n\n")
+
+
+
+def test_push_requires_key_known_election_and_capacity(monkeypatch):
+    """❌ No key, an unknown election or a full server is refused before subscribing."""
+    async def known(election_id):
+        return election_id == "e1"
+
+    bc = Broadcaster(*_sources(_state()), poll_s=60, known=known, max_subscribers=3, max_per_election=2)
+    monkeypatch.setattr(routes_push, "broadcaster", bc)
+    app = FastAPI()
+    app.include_router(routes_push.router, prefix="/results")
+    client = TestClient(app)
+
+    assert client.get("/results/push/sse?election_id=e1").status_code == 401
+    assert client.get("/results/push/sse?election_id=nope", headers=KEY).status_code == 404
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/results/push/ws?election_id=e1") as ws:
+            ws.receive_text()
+    assert exc.value.code == 1008
+
+    bc.subscribe("e1"), bc.subscribe("e1")
+    with pytest.raises(PushLimit):
+        bc.subscribe("e1")
+    assert client.get("/results/push/sse?election_id=e1&api_key=demo-api-key").status_code == 503
+    assert bc.stats()["elections"] == 1
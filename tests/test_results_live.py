@@ -0,0 +1,183 @@
+"""
+tests/test_results_live.py
+Validates the live results aggregate: incremental per-division counts with
+versions, late-committing ballots, the count route's auth and division
+mapping, and /api/results/latest served from the per-version cache.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.routers import results as results_router
+from api.security.jwt import issue_access_token
+from common.db import Base, get_session
+from common.models.models import Ballot, ResultsAggregate
+from common.tally.live import ResultsCache, apply_partial, count_division, register_division
+import services.results.routes as results_routes
+from common.tally.mapreduce import InlineExecutor, ShardPartial
+from cryptoutils.ballots import BallotKeyContext, canonical_prefs
+
+HEADERS = {"X-API-Key": "demo-api-key"}
+
+
+@pytest.fixture()
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("BALLOT_AES_KEY", "55" * 32)
+    key = BallotKeyContext()
+    monkeypatch.setattr("common.tally.live.ballot_key", key)
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    cache = ResultsCache(session_factory=factory, ttl=60)
+    monkeypatch.setattr("common.tally.live.results_cache", cache)
+    monkeypatch.setattr(results_router, "results_cache", cache)
+
+    with factory() as db:
+        register_division(db, "fed", "north")
+        register_division(db, "fed", "south")
+
+    def cast(division, prefs_list, created_at=None, ids=None):
+        docs = [canonical_prefs(p, division, "t") for p in prefs_list]
+        with factory() as db:
+            for i, (ct, nonce) in enumerate(key.encrypt_many(docs)):
+                db.add(Ballot(id=ids[i] if ids else None, election_id=division, ciphertext=ct, nonce=nonce,
+                              receipt="00" * 32, created_at=created_at or datetime.now(timezone.utc)))
+            db.commit()
+
+    def count(division, settle_s=0):
+        with factory() as db:
+            return count_division(db, "fed", division, executor=InlineExecutor(), shard_size=4, settle_s=settle_s)
+
+    app = FastAPI()
+    app.include_router(results_router.router, prefix="/api/results")
+    return TestClient(app), cast, count, cache, factory
+
+
+def test_counts_accumulate_per_division(env):
+    """✅ Each count only processes new ballots and bumps the version per batch."""
+    client, cast, count, _, factory = env
+    cast("north", [[1, 2]] * 6 + [[2]] * 3)
+    first = count("north")
+    assert first["batches_applied"] == 3 and first["ballots"] == 9 and first["version"] == 3
+
+    assert count("north")["batches_applied"] == 0  # nothing new
+    cast("north", [[2, 1]] * 2)
+    cast("south", [[3]] * 5)
+    assert count("north")["ballots"] == 11
+    assert count("south")["version"] == 2
+
+    body = client.get("/api/results/latest", params={"election_id": "fed"}, headers=HEADERS).json()
+    assert body["tally"] == {"1": 6, "2": 5, "3": 5}
+    assert body["divisions"]["north"]["tally"] == {"1": 6, "2": 5}
+    assert body["version"] == first["version"] + 1 + 2
+    with factory() as db:
+        assert db.query(ResultsAggregate).count() == 3
+
+
+def test_stale_mark_is_not_applied_twice(env):
+    """❌ A batch for an already-moved mark is rejected (no double counting)."""
+    _, cast, count, _, factory = env
+    cast("north", [[1]] * 3)
+    count("north")
+    part = ShardPartial()
+    part.add([1])
+    with factory() as db:
+        assert apply_partial(db, "fed", "north", part, expected_upto=0, upto=99) is False
+        assert db.get(ResultsAggregate, ("fed", "north", 1)).votes == 3
+
+
+def test_late_commit_below_newer_ballot_is_counted(env):
+    """✅ The mark stops before unsettled ballots, so a ballot committing after a higher id is still counted."""
+    _, cast, count, _, factory = env
+    old = datetime.now(timezone.utc) - timedelta(minutes=5)
+    cast("north", [[1]] * 3, created_at=old)           # ids 1-3
+    cast("north", [[2]], ids=[5])                       # id 5 visible while id 4 is still in flight
+    first = count("north", settle_s=60)
+    assert first["counted_upto"] == 3 and first["ballots"] == 3
+
+    cast("north", [[3]], created_at=old, ids=[4])      # id 4 commits late
+    assert count("north", settle_s=60)["counted_upto"] == 4
+    with factory() as db:
+        db.query(Ballot).filter(Ballot.id == 5).update({"created_at": old})
+        db.commit()
+    final = count("north", settle_s=60)
+    assert final["counted_upto"] == 5 and final["ballots"] == 5
+    with factory() as db:
+        assert {c: db.get(ResultsAggregate, ("fed", "north", c)).votes for c in (1, 2, 3)} == {1: 3, 2: 1, 3: 1}
+
+
+def test_live_count_route_needs_auth_and_registered_division(env, monkeypatch):
+    """❌ Counting needs the key or an admin token, a registered division and its own election."""
+    _, cast, _, _, factory = env
+    monkeypatch.setattr("common.tally.live.LIVE_COUNT_SETTLE_S", 0)
+    monkeypatch.setattr(results_routes, "count_division",
+                        lambda db, e, d: count_division(db, e, d, executor=InlineExecutor(), settle_s=0))
+    app = FastAPI()
+    app.include_router(results_routes.router, prefix="/results")
+
+    def session():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    client = TestClient(app)
+    admin = {"Authorization": f"Bearer {issue_access_token('a@x', role='admin')}"}
+    voter = {"Authorization": f"Bearer {issue_access_token('v@x', role='voter')}"}
+    url = "/results/results/live/count"
+    cast("north", [[1]] * 2)
+
+    assert client.post(url, params={"election_id": "fed", "division": "north"}).status_code == 401
+    assert client.post(url, params={"election_id": "fed", "division": "north"}, headers=voter).status_code == 401
+    assert client.post(url, params={"election_id": "state", "division": "north"}, headers=HEADERS).status_code == 404
+    assert client.post(url, params={"election_id": "fed", "division": "north"}, headers=HEADERS).json()["ballots"] == 2
+
+    reg = "/results/results/live/divisions"
+    assert client.post(reg, params={"election_id": "state", "division": "east"}, headers=HEADERS).status_code == 403
+    assert client.post(reg, params={"election_id": "state", "division": "north"}, headers=admin).status_code == 409
+    assert client.post(reg, params={"election_id": "state", "division": "east"}, headers=admin).status_code == 200
+    assert client.post(url, params={"election_id": "state", "division": "east"}, headers=admin).json()["ballots"] == 0
+
+
+def test_latest_serves_cached_body_with_etag(env):
+    """✅ Same version is served from memory; If-None-Match gives 304; new batch changes the ETag."""
+    client, cast, count, cache, _ = env
+    assert client.get("/api/results/latest", params={"election_id": "fed"}).status_code == 401
+
+    cast("north", [[1]] * 2)
+    count("north")
+    r1 = client.get("/api/results/latest", params={"election_id": "fed"}, headers=HEADERS)
+    etag = r1.headers["ETag"]
+    assert r1.headers["X-Checksum-SHA256"] == etag and r1.headers["X-Results-Version"] == "1"
+    r2 = client.get("/api/results/latest", params={"election_id": "fed"},
+                    headers={**HEADERS, "If-None-Match": etag})
+    assert r2.status_code == 304 and cache.builds == 1 and cache.hits >= 1
+
+    cast("north", [[2]])
+    count("north")  # invalidates the cached snapshot
+    r3 = client.get("/api/results/latest", params={"election_id": "fed"},
+                    headers={**HEADERS, "If-None-Match": etag})
+    assert r3.status_code == 200 and r3.headers["ETag"] != etag
+    assert json.loads(r3.content)["tally"] == {"1": 2, "2": 1}
+
+
+def test_results_cache_is_bounded(env):
+    """❌ Requests for many election ids keep at most max_entries snapshots (LRU)."""
+    _, _, _, _, factory = env
+    cache = ResultsCache(session_factory=factory, ttl=60, max_entries=3)
+    for eid in ("fed", "a", "b", "c"):
+        cache.get(eid)
+    assert list(cache._entries) == ["a", "b", "c"]
+    cache.get("a")  # refreshes its position
+    cache.get("d")
+    assert list(cache._entries) == ["c", "a", "d"]
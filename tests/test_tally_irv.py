@@ -0,0 +1,115 @@
+"""
+tests/test_tally_irv.py
+Validates the vectorized instant-runoff count, ballot packing and the admin-only
+route.  Results must match a plain per-ballot reference count round for round.
+"""
+
+import json
+import os
+import random
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.security.jwt import issue_access_token
+from common.db import Base, get_session
+from common.models.models import Ballot
+from common.tally.ballots import load_preferences, pack_preferences
+from common.tally.irv import count_irv
+from cryptoutils.ballots import BallotKeyContext, canonical_prefs
+import services.results.routes as results_routes
+
+
+def _reference_irv(prefs, candidates):
+    active = set(candidates)
+    rounds = []
+    while True:
+        tallies = {c: 0 for c in active}
+        for p in prefs:
+            top = next((c for c in p if c in active), None)
+            if top is not None:
+                tallies[top] += 1
+        rounds.append(tallies)
+        total = sum(tallies.values())
+        leader = max(tallies, key=lambda c: (tallies[c], -c))
+        if 2 * tallies[leader] > total or len(active) == 1:
+            return leader, rounds
+        low = min(tallies.values())
+        tied = sorted(c for c in active if tallies[c] == low)
+        for past in reversed(rounds[:-1]):
+            m = min(past[c] for c in tied)
+            tied = [c for c in tied if past[c] == m]
+            if len(tied) == 1:
+                break
+        active.discard(tied[0])
+
+
+def test_textbook_count_with_transfers():
+    """✅ Exclusions transfer to next preferences until a majority appears."""
+    prefs = [[1, 2]] * 8 + [[2, 1]] * 7 + [[3, 2]] * 4 + [[3]] * 2
+    res = count_irv(pack_preferences(prefs))
+    r1, r2 = res.rounds
+    assert r1.tallies == {1: 8, 2: 7, 3: 6} and r1.excluded == 3
+    assert r2.tallies == {1: 8, 2: 11} and r2.exhausted == 2
+    assert r2.transfers == {2: 4, 3: -6}
+    assert res.winner == 2 and res.total == 21
+
+
+def test_matches_reference_on_random_ballots():
+    """✅ Vectorized rounds equal a per-ballot Python count."""
+    rng = random.Random(7)
+    cands = list(range(10, 18))
+    prefs = [rng.sample(cands, rng.randint(1, len(cands))) for _ in range(3000)]
+    winner, ref_rounds = _reference_irv(prefs, cands)
+    res = count_irv(pack_preferences(prefs, candidates=cands))
+    assert res.winner == winner
+    assert [r.tallies for r in res.rounds] == ref_rounds
+
+
+def test_weights_and_informal_ballots(tmp_path, monkeypatch):
+    """❌ Ballots for another election, with repeated candidates or naming unknown candidates are informal."""
+    monkeypatch.setenv("BALLOT_AES_KEY", "33" * 32)
+    key = BallotKeyContext()
+    monkeypatch.setattr("common.tally.ballots.ballot_key", key)
+    engine = create_engine(f"sqlite:///{tmp_path / 'tally.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        docs = [canonical_prefs([1, 2], "e1", "t"), canonical_prefs([2], "e1", "t"),
+                canonical_prefs([2], "other", "t"), canonical_prefs([1, 1], "e1", "t"),
+                json.dumps({"x": 1}).encode()]
+        for ct, nonce in key.encrypt_many(docs):
+            db.add(Ballot(election_id="e1", ciphertext=ct, nonce=nonce, receipt="00" * 32))
+        db.commit()
+        pm = load_preferences(db, "e1", pool=None)
+    assert pm.n_ballots == 2 and pm.informal == 3
+
+    weighted = pack_preferences([[1], [2]], weights=[3, 5])
+    res = count_irv(weighted)
+    assert res.winner == 2 and res.rounds[0].tallies == {1: 3, 2: 5}
+
+    outside = pack_preferences([[1, 9], [2, 1], [9]], candidates=[1, 2], weights=[2, 1, 4])
+    assert outside.n_ballots == 1 and outside.informal == 6
+    assert count_irv(outside).winner == 2
+
+
+def test_tally_route_is_admin_only(monkeypatch):
+    """❌ Only an admin bearer token may decrypt and count an election."""
+    monkeypatch.setattr(results_routes, "load_preferences_sharded",
+                        lambda db, election_id, candidates: pack_preferences([[1, 2], [2], [2, 1]]))
+    app = FastAPI()
+    app.include_router(results_routes.router, prefix="/results")
+    app.dependency_overrides[get_session] = lambda: None
+    client = TestClient(app)
+    url = "/results/results/tally/irv"
+    staff = {"Authorization": f"Bearer {issue_access_token('s@x', role='aec_staff')}"}
+    admin = {"Authorization": f"Bearer {issue_access_token('a@x', role='admin')}"}
+    assert client.get(url, params={"election_id": "e1"}).status_code == 403
+    assert client.get(url, params={"election_id": "e1"}, headers=staff).status_code == 403
+    res = client.get(url, params={"election_id": "e1"}, headers=admin)
+    assert res.status_code == 200 and res.json()["winner"] == 2
@@ -0,0 +1,135 @@
+"""
+tests/test_tally_mapreduce.py
+Validates the sharded tally: id-range shards, mergeable partials and
+agreement with the single-process load_preferences() path.
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.models.models import Ballot
+from common.tally.ballots import load_preferences
+from common.tally.irv import count_irv
+from common.tally.mapreduce import (
+    InlineExecutor,
+    ShardPartial,
+    load_preferences_sharded,
+    reduce_partials,
+    shard_bounds,
+)
+from common.tally.stv import count_stv
+import common.tally.mapreduce as mapreduce
+from cryptoutils.ballots import BallotKeyContext, canonical_prefs
+from cryptoutils.pool import CryptoPool
+
+
+@pytest.fixture()
+def election(tmp_path, monkeypatch):
+    monkeypatch.setenv("BALLOT_AES_KEY", "44" * 32)
+    key = BallotKeyContext()
+    monkeypatch.setattr("common.tally.ballots.ballot_key", key)
+    monkeypatch.setattr("common.tally.mapreduce.ballot_key", key)
+    engine = create_engine(f"sqlite:///{tmp_path / 'mr.db'}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    cands = [1, 2, 3, 4, 5]
+    docs = []
+    for i in range(1000):
+        docs.append(canonical_prefs(rng.sample(cands, rng.randint(1, 3)), "e1", "t"))
+        if i % 3 == 0:  # interleave another election's ballots
+            docs.append(canonical_prefs([1], "e2", "t"))
+    docs.append(canonical_prefs([2, 2], "e1", "t"))  # informal
+    with sessionmaker(bind=engine)() as db:
+        for doc, (ct, nonce) in zip(docs, key.encrypt_many(docs)):
+            eid = json.loads(doc)["e"]
+            db.add(Ballot(election_id=eid, ciphertext=ct, nonce=nonce, receipt="00" * 32))
+        db.commit()
+        yield db
+
+
+def test_shards_cover_election_ballots(election):
+    """✅ Id ranges hold at most shard_size ballots of the election and cover all of them."""
+    bounds = shard_bounds(election, "e1", shard_size=150)
+    assert len(bounds) == 7
+    ids = [b.id for b in election.query(Ballot).filter_by(election_id="e1").order_by(Ballot.id)]
+    counts = [sum(lo <= i <= hi for i in ids) for lo, hi in bounds]
+    assert sum(counts) == len(ids) and max(counts) == 150
+    assert shard_bounds(election, "missing") == []
+
+
+def test_sharded_count_matches_single_process(election):
+    """✅ Merged shards give the same IRV and STV results as the plain loader."""
+    plain = load_preferences(election, "e1", pool=None)
+    sharded = load_preferences_sharded(election, "e1", executor=InlineExecutor(), shard_size=97)
+    assert sharded.informal == plain.informal == 1
+    assert int(sharded.weights.sum()) == plain.n_ballots
+    assert sharded.n_ballots < plain.n_ballots  # repeated sequences collapse
+
+    a, b = count_irv(plain).to_dict(), count_irv(sharded).to_dict()
+    assert a["winner"] == b["winner"] and a["rounds"] == b["rounds"]
+    assert count_stv(plain, 2).elected == count_stv(sharded, 2).elected
+
+
+def test_unknown_candidates_are_informal_in_both_paths(election):
+    """❌ With a candidate list missing one candidate, ballots naming it are informal, not an error."""
+    plain = load_preferences(election, "e1", candidates=[1, 2, 3, 4], pool=None)
+    sharded = load_preferences_sharded(election, "e1", [1, 2, 3, 4], executor=InlineExecutor(), shard_size=97)
+    assert plain.informal == sharded.informal > 1
+    assert int(sharded.weights.sum()) == plain.n_ballots
+    assert 5 not in plain.candidates.tolist()
+    assert count_irv(plain).to_dict()["rounds"] == count_irv(sharded).to_dict()["rounds"]
+
+
+def test_shard_jobs_carry_no_secrets(election):
+    """❌ Shard jobs get a DSN and key fingerprint only; a worker with another key refuses to run."""
+    calls = []
+
+    class Recording(InlineExecutor):
+        def submit(self, fn, *args):
+            calls.append(args)
+            return super().submit(fn, *args)
+
+    load_preferences_sharded(election, "e1", executor=Recording(), shard_size=500)
+    key = mapreduce.ballot_key.key
+    for args in calls:
+        assert args[0].startswith("sqlite:///") and args[1] == mapreduce.ballot_key.key_id
+        assert not any(isinstance(a, bytes) for a in args) and key.hex() not in args[1]
+
+    lo, hi = shard_bounds(election, "e1", 500)[0]
+    with pytest.raises(RuntimeError, match="not configured"):
+        mapreduce._map_shard(calls[0][0], "0" * 16, "e1", lo, hi, 100)
+
+
+def test_process_pool_executor(election):
+    """✅ Shards run in worker processes and merge to the same matrix."""
+    pool = CryptoPool(workers=2)
+    try:
+        pm = load_preferences_sharded(election, "e1", executor=pool, shard_size=200)
+    finally:
+        pool.shutdown()
+    inline = load_preferences_sharded(election, "e1", executor=InlineExecutor(), shard_size=1000)
+    assert pm.digest() == inline.digest()
+
+
+def test_partials_merge_in_any_order():
+    """✅ Merging is order-independent and survives a JSON round trip."""
+    parts = []
+    for prefs in ([[1, 2], [2]], [[1, 2], None], [[3, 1, 2]]):
+        p = ShardPartial()
+        for x in prefs:
+            p.add(x)
+        parts.append(ShardPartial.from_dict(json.loads(json.dumps(p.to_dict()))))
+    fwd, rev = reduce_partials(parts), reduce_partials(reversed(parts))
+    assert fwd == rev
+    assert fwd.ballots == 5 and fwd.informal == 1
+    assert fwd.sequences[(1, 2)] == 2 and fwd.first_prefs == {1: 2, 2: 1, 3: 1}
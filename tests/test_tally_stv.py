@@ -0,0 +1,98 @@
+"""
+tests/test_tally_stv.py
+Validates the fixed-point STV count: quota, Gregory surplus transfers,
+exclusions, loss accounting, replay of the audit log and the admin-only route.
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.security.jwt import issue_access_token
+from common.db import get_session
+from common.tally.ballots import pack_preferences
+from common.tally.stv import SCALE, count_stv, replay_stv
+import services.results.routes as results_routes
+
+PREFS = [[1, 2]] * 60 + [[2, 3]] * 14 + [[3, 2]] * 12 + [[4, 3]] * 9 + [[5, 1]] * 5
+
+
+def test_surplus_and_exclusion_elect_three():
+    """✅ Droop quota, surplus of the first winner and exclusions fill all seats."""
+    res = count_stv(pack_preferences(PREFS), 3)
+    assert res.quota == 26 and res.elected == [1, 2, 3]
+    first = res.log[1]
+    assert first["action"] == "elect" and first["candidate"] == 1 and first["votes"] == 60 * SCALE
+
+    surplus = next(e for e in res.log if e["action"] == "surplus")
+    assert surplus["candidate"] == 1 and surplus["surplus"] == 34 * SCALE
+    assert surplus["transfer_value"] == 34 * SCALE // 60
+    # the 60 ballots of candidate 1 now sit on candidate 2 at the reduced value
+    assert surplus["tallies"][2] == 14 * SCALE + 60 * (34 * SCALE // 60)
+    assert any(e["action"] == "exclude" for e in res.log)
+
+
+def test_every_step_accounts_for_all_votes():
+    """✅ held + exhausted + loss equals the total at every step; loss never shrinks."""
+    res = count_stv(pack_preferences(PREFS), 3)
+    total = res.log[0]["total"] * SCALE
+    prev_loss = 0
+    for e in res.log[1:]:
+        assert sum(e["tallies"].values()) + e["exhausted"] + e["loss"] == total
+        assert 0 <= prev_loss <= e["loss"] < len(PREFS)
+        prev_loss = e["loss"]
+
+
+def test_weights_count_like_repeated_ballots():
+    """✅ A weighted ballot counts exactly like the same ballot repeated."""
+    unique = [[1, 2], [2, 3], [3, 2], [4, 3], [5, 1]]
+    weighted = count_stv(pack_preferences(unique, weights=[60, 14, 12, 9, 5]), 3)
+    plain = count_stv(pack_preferences(PREFS), 3)
+    assert weighted.elected == plain.elected
+    assert [e["tallies"] for e in weighted.log[1:]] == [e["tallies"] for e in plain.log[1:]]
+
+
+def test_replay_accepts_log_and_rejects_tampering():
+    """❌ A modified log entry or different ballots fail replay at the right step."""
+    pm = pack_preferences(PREFS)
+    res = count_stv(pm, 3)
+    buf = io.StringIO()
+    res.write_log(buf)
+    log = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert replay_stv(pm, log) == (True, None)
+
+    log[2]["tallies"]["2"] += 1
+    assert replay_stv(pm, log) == (False, 2)
+    assert replay_stv(pack_preferences(PREFS + [[4, 3]]), res.log) == (False, 0)
+
+
+def test_rejects_bad_seat_count():
+    """❌ More seats than candidates is refused."""
+    with pytest.raises(ValueError, match="seats"):
+        count_stv(pack_preferences(PREFS), 6)
+
+
+def test_stv_route_is_admin_only(monkeypatch):
+    """❌ The STV count needs an admin bearer token; bad seat counts are still a 400."""
+    monkeypatch.setattr(results_routes, "load_preferences_sharded",
+                        lambda db, election_id, candidates: pack_preferences(PREFS))
+    app = FastAPI()
+    app.include_router(results_routes.router, prefix="/results")
+    app.dependency_overrides[get_session] = lambda: None
+    client = TestClient(app)
+    url = "/results/results/tally/stv"
+    admin = {"Authorization": f"Bearer {issue_access_token('a@x', role='admin')}"}
+    observer = {"Authorization": f"Bearer {issue_access_token('o@x', role='observer')}"}
+    assert client.get(url, params={"election_id": "e1", "seats": 3}).status_code == 403
+    assert client.get(url, params={"election_id": "e1", "seats": 3}, headers=observer).status_code == 403
+    assert client.get(url, params={"election_id": "e1", "seats": 6}, headers=admin).status_code == 400
+    res = client.get(url, params={"election_id": "e1", "seats": 3}, headers=admin)
+    assert res.status_code == 200 and len(res.json()["elected"]) == 3
@@ -0,0 +1,268 @@
+"""
+tests/test_voting_ingest.py
+Validates the group-commit ballot ingestion stage of the voting service.
+Concurrent submissions must share transactions and still form one valid chain.
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure root path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from common.db import Base
+from common.models.models import Ballot, BallotChain, BallotToken
+from cryptoutils.ballots import hash_chain
+from common.chain.appender import ChainAppender
+from services.voting.ingest import BallotIngestor, PendingBallot
+from services.voting.deps import NegativeTokenCache
+import services.voting.routes as voting_routes
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'ingest.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _issue_tokens(factory, n):
+    exp = datetime.now(timezone.utc) + timedelta(hours=1)
+    with factory() as db:
+        toks = [BallotToken(token=f"tok-{i}", voter_ref=f"v{i}", exp_at=exp) for i in range(n)]
+        db.add_all(toks)
+        db.commit()
+        return [t.token for t in toks]
+
+
+def test_concurrent_submissions_are_group_committed(session_factory):
+    """✅ Many concurrent ballots land in few transactions with an unbroken chain."""
+    token_ids = _issue_tokens(session_factory, 40)
+    ing = BallotIngestor(
+        session_factory=session_factory, window_ms=50, max_batch=64, appender=ChainAppender()
+    )
+
+    results = []
+    def worker(tid):
+        item = PendingBallot("e1", os.urandom(32), os.urandom(12), os.urandom(32).hex(), tid)
+        results.append(ing.submit(item).result(timeout=10))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in token_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ing.stop()
+
+    assert len(results) == 40
+    assert ing.ballots_written == 40
+    assert ing.batches_written < 40
+
+    with session_factory() as db:
+        chain = db.query(BallotChain).order_by(BallotChain.id).all()
+        ballots = {b.id: b for b in db.query(Ballot).all()}
+        assert all(t.consumed_at is not None for t in db.query(BallotToken).all())
+
+    prev = bytes(32)
+    for link in chain:
+        b = ballots[link.ballot_id]
+        assert link.prev_hash == prev
+        assert link.curr_hash == hash_chain(prev, b.ciphertext, b.nonce)
+        prev = link.curr_hash
+    assert {r["chain_head"] for r in results} == {l.curr_hash.hex() for l in chain}
+
+
+def test_reused_token_in_same_batch_is_rejected(session_factory):
+    """❌ A token may only authorise one ballot, even inside one group commit."""
+    (tid,) = _issue_tokens(session_factory, 1)
+    ing = BallotIngestor(
+        session_factory=session_factory, window_ms=100, appender=ChainAppender()
+    )
+
+    f1 = ing.submit(PendingBallot("e1", b"a" * 32, b"n" * 12, "1" * 64, tid))
+    f2 = ing.submit(PendingBallot("e1", b"b" * 32, b"m" * 12, "2" * 64, tid))
+
+    assert f1.result(timeout=10)["receipt"] == "1" * 64
+    with pytest.raises(Exception) as exc:
+        f2.result(timeout=10)
+    assert "already used" in str(exc.value.detail)
+    ing.stop()
+
+    with session_factory() as db:
+        assert db.query(Ballot).count() == 1
+
+
+def test_submit_many_keeps_group_in_one_commit_and_order(session_factory):
+    """✅ A batch upload is never split and is chained in request order."""
+    token_ids = _issue_tokens(session_factory, 30)
+    ing = BallotIngestor(
+        session_factory=session_factory, window_ms=1, max_batch=8, appender=ChainAppender()
+    )
+    items = [
+        PendingBallot("e1", bytes([i]) * 32, b"n" * 12, f"{i:064x}", tid)
+        for i, tid in enumerate(token_ids)
+    ]
+    results = [f.result(timeout=10) for f in ing.submit_many(items)]
+    ing.stop()
+
+    assert ing.batches_written == 1  # larger than max_batch, still one commit
+    assert [r["receipt"] for r in results] == [f"{i:064x}" for i in range(30)]
+    with session_factory() as db:
+        seqs = [
+            l.seq
+            for l in db.query(BallotChain).order_by(BallotChain.ballot_id).all()
+        ]
+    assert seqs == list(range(1, 31))
+
+
+def test_multi_election_batch_locks_heads_in_sorted_order(session_factory):
+    """✅ Elections are appended in sorted order whatever the submission order."""
+    token_ids = _issue_tokens(session_factory, 6)
+    appender = ChainAppender()
+    order = []
+    append = appender.append
+    appender.append = lambda db, election_id, *a, **kw: order.append(election_id) or append(db, election_id, *a, **kw)
+    ing = BallotIngestor(session_factory=session_factory, window_ms=1, max_batch=8, appender=appender)
+    items = [
+        PendingBallot(eid, bytes([i]) * 32, b"n" * 12, f"{i:064x}", tid)
+        for i, (eid, tid) in enumerate(zip(["zz", "mm", "aa", "zz", "aa", "mm"], token_ids))
+    ]
+    results = [f.result(timeout=10) for f in ing.submit_many(items)]
+    ing.stop()
+    assert order == ["aa", "mm", "zz"]
+    assert [r["receipt"] for r in results] == [f"{i:064x}" for i in range(6)]
+
+
+class PoisonAppender(ChainAppender):
+    """Fails any transaction that appends to election "bad"."""
+
+    def append(self, db, election_id, *a, **kw):
+        if election_id == "bad":
+            raise ValueError("value too long for type character varying(64)")
+        return super().append(db, election_id, *a, **kw)
+
+
+def test_poisoned_item_only_fails_itself(session_factory):
+    """❌ A group commit failing on one bad row is retried per item; the others commit."""
+    token_ids = _issue_tokens(session_factory, 3)
+    ing = BallotIngestor(session_factory=session_factory, window_ms=100, appender=PoisonAppender())
+    futures = [
+        ing.submit(PendingBallot(eid, bytes([i]) * 32, b"n" * 12, f"{i:064x}", tid))
+        for i, (eid, tid) in enumerate(zip(["e1", "bad", "e1"], token_ids))
+    ]
+    assert futures[0].result(timeout=10)["receipt"] == f"{0:064x}"
+    assert futures[2].result(timeout=10)["receipt"] == f"{2:064x}"
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=10)
+    ing.stop()
+    with session_factory() as db:
+        assert db.query(Ballot).count() == 2
+        assert db.query(BallotToken).filter_by(token=token_ids[1]).one().consumed_at is None
+
+
+def test_overlong_election_id_rejected_at_the_edge():
+    """❌ election_id longer than the column is a 422, never a poisoned group commit."""
+    app = FastAPI()
+    app.include_router(voting_routes.router, prefix="/voting")
+    app.dependency_overrides[voting_routes.require_valid_otbt] = lambda: "t"
+    client = TestClient(app)
+    r = client.post("/voting/ballot/submit/batch",
+                    json={"election_id": "x" * 65, "items": [{"prefs": [1], "otbt": "t"}]})
+    assert r.status_code == 422
+    r = client.post("/voting/ballot/submit", json={"prefs": [1], "election_id": "x" * 65},
+                    headers={"X-OTBT": "t"})
+    assert r.status_code == 422
+
+
+class SlowAppender(ChainAppender):
+    """Holds the first group commit long enough for the caller to time out."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def run(self, factory, fn):
+        if self.delay:
+            threading.Event().wait(self.delay)
+            self.delay = 0
+        return super().run(factory, fn)
+
+
+def test_route_timeout_does_not_kill_the_writer(session_factory, monkeypatch):
+    """❌ A caller timing out gets 504 with its receipt; the ballot still commits and the writer lives on."""
+    monkeypatch.setenv("BALLOT_AES_KEY", "66" * 32)
+    fresh = NegativeTokenCache()  # earlier tests spent the same token strings
+    monkeypatch.setattr("services.voting.deps.bad_tokens", fresh)
+    monkeypatch.setattr("services.voting.ingest.bad_tokens", fresh)
+    t1, t2 = _issue_tokens(session_factory, 2)
+    ing = BallotIngestor(session_factory=session_factory, window_ms=1, appender=SlowAppender(0.5))
+    monkeypatch.setattr(voting_routes, "ingestor", ing)
+    monkeypatch.setattr(voting_routes, "INGEST_TIMEOUT_S", 0.1)
+    app = FastAPI()
+    app.include_router(voting_routes.router, prefix="/voting")
+    client = TestClient(app)
+    body = {"prefs": [1, 2], "election_id": "e1"}
+
+    slow = client.post("/voting/ballot/submit", json=body, headers={"X-OTBT": t1})
+    assert slow.status_code == 504
+    detail = slow.json()["detail"]
+    assert detail["code"] == "ingest_timeout" and detail["detail"] == "ballot is still being recorded"
+    receipt = detail["receipt"]
+
+    monkeypatch.setattr(voting_routes, "INGEST_TIMEOUT_S", 10)
+    ok = client.post("/voting/ballot/submit", json=body, headers={"X-OTBT": t2})
+    assert ok.status_code == 200
+    ing.stop()
+    with session_factory() as db:
+        assert {b.receipt for b in db.query(Ballot)} == {receipt, ok.json()["receipt"]}
+
+
+class BrokenAppender(ChainAppender):
+    def run(self, factory, fn):
+        raise RuntimeError("database went away")
+
+
+def _batch_client(monkeypatch, ing, timeout):
+    monkeypatch.setenv("BALLOT_AES_KEY", "66" * 32)
+    fresh = NegativeTokenCache()
+    monkeypatch.setattr("services.voting.deps.bad_tokens", fresh)
+    monkeypatch.setattr("services.voting.ingest.bad_tokens", fresh)
+    monkeypatch.setattr(voting_routes, "bad_tokens", fresh)
+    monkeypatch.setattr(voting_routes, "ingestor", ing)
+    monkeypatch.setattr(voting_routes, "INGEST_TIMEOUT_S", timeout)
+    app = FastAPI()
+    app.include_router(voting_routes.router, prefix="/voting")
+    return TestClient(app)
+
+
+def test_batch_reports_per_item_on_timeout_and_errors(session_factory, monkeypatch):
+    """❌ Timeouts and writer errors become per-item failures, never a 500 for the batch."""
+    tokens = _issue_tokens(session_factory, 3)
+    items = [{"prefs": [1, 2], "otbt": t} for t in tokens[:2]]
+
+    ing = BallotIngestor(session_factory=session_factory, window_ms=1, appender=SlowAppender(0.5))
+    r = _batch_client(monkeypatch, ing, 0.1).post(
+        "/voting/ballot/submit/batch", json={"election_id": "e1", "items": items})
+    assert r.status_code == 200
+    assert [x["error"] for x in r.json()["results"]] == ["ballot is still being recorded"] * 2
+    ing.stop()
+    with session_factory() as db:
+        assert db.query(Ballot).count() == 2  # committed after the response
+
+    broken = BallotIngestor(session_factory=session_factory, window_ms=1, appender=BrokenAppender())
+    r = _batch_client(monkeypatch, broken, 5).post(
+        "/voting/ballot/submit/batch", json={"election_id": "e1", "items": [{"prefs": [1], "otbt": tokens[2]}]})
+    assert r.status_code == 200 and r.json()["results"][0] == {
+        "index": 0, "ok": False, "error": "ballot could not be recorded"}
+    broken.stop()
@@ -1,63 +1,136 @@
 """
 utils/backup_utils.py
 Handles AES-256-GCM encrypted backups (SR-07, Commit 15).
+
+Backups are streamed through the chunked container in cryptoutils/stream.py:
+the database file is read BACKUP_CHUNK_BYTES at a time and every chunk is
+sealed with a nonce derived from its index, followed by an authenticated
+trailer (byte and chunk counts).  Memory stays at one chunk whatever the size
+of the database, and a restore verifies each chunk before writing it, so a
+truncated, reordered or tampered backup is rejected.
 """
 
+import hashlib
 import os
-import shutil
+import tempfile
 from datetime import datetime
+
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from Crypto.Cipher import AES
+
+from cryptoutils.stream import DEFAULT_CHUNK_SIZE, EncryptedStreamWriter, StreamFormatError, iter_decrypted
 
 
 # Ensure backup directory exists
 BACKUP_DIR = "backup"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-def perform_encrypted_backup(db_path: str = "dev.db"):
+BACKUP_CHUNK_BYTES = int(os.getenv("BACKUP_CHUNK_BYTES", str(DEFAULT_CHUNK_SIZE)))
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def backup_key() -> bytes | None:
+    """The configured backup key (BACKUP_AES_KEY, 64 hex chars), or None."""
+    key_hex = os.getenv("BACKUP_AES_KEY", "")
+    if not key_hex:
+        return None
+    if len(key_hex) != 64:
+        raise RuntimeError("BACKUP_AES_KEY must be a 64-hex string (32-byte key)")
+    return bytes.fromhex(key_hex)
+
+
+def perform_encrypted_backup(db_path: str = "dev.db", backup_file: str | None = None, key: bytes | None = None):
     """
     Creates an AES-256-GCM encrypted copy of the database file.
+    Without BACKUP_AES_KEY a one-off key is generated and only its preview is
+    returned, so such a backup cannot be restored.
     """
     # Generate backup filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    backup_file = os.path.join(BACKUP_DIR, f"dev_backup_{timestamp}.enc")
+    if backup_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        backup_file = os.path.join(BACKUP_DIR, f"dev_backup_{timestamp}.enc")
 
-    # Read DB bytes
-    with open(db_path, "rb") as f:
-        data = f.read()
+    key = key or backup_key()
+    restorable = key is not None
+    if key is None:
+        key = AESGCM.generate_key(bit_length=256)
 
-    # Generate encryption key + nonce
-    key = AESGCM.generate_key(bit_length=256)
-    aesgcm = AESGCM(key)
-    nonce = os.urandom(12)
-
-    # Encrypt database
-    encrypted_data = aesgcm.encrypt(nonce, data, None)
-
-    # Write encrypted backup
-    with open(backup_file, "wb") as f:
-        f.write(nonce + encrypted_data)
+    # Stream DB bytes through the encrypted container, chunk by chunk
+    sha = hashlib.sha256()
+    # unique per run: a re-queued backup job may overlap a superseded attempt
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(backup_file) or ".",
+                               prefix=os.path.basename(backup_file) + ".", suffix=".part")
+    try:
+        with open(db_path, "rb") as src, os.fdopen(fd, "wb", buffering=1 << 20) as dst:
+            writer = EncryptedStreamWriter(dst, key, BACKUP_CHUNK_BYTES)
+            while block := src.read(BACKUP_CHUNK_BYTES):
+                sha.update(block)
+                writer.write(block)
+            summary = writer.close()
+            dst.flush()
+            os.fsync(dst.fileno())
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, backup_file)
 
     return {
         "status": "success",
         "backup_file": backup_file,
         "key_preview": key.hex()[:16] + "...",
+        "restorable": restorable,
+        "bytes": summary["bytes"],
+        "chunks": summary["chunks"],
+        "sha256": sha.hexdigest(),
     }
 
 
-
-def restore_from_backup(encrypted_file: str):
-    """Simulates decryption & verification of latest encrypted backup."""
+def restore_from_backup(encrypted_file: str, restore_to: str | None = None, key: bytes | None = None):
+    """
+    Stream-decrypts a backup, verifying every chunk and the trailer.
+    With `restore_to` the plaintext is written there (via a unique temporary
+    file that only replaces the target once the whole backup verified).
+    """
     try:
-        with open(encrypted_file, "rb") as f:
-            blob = f.read()
-
-        # Just decrypt to test validity (reuse same key from perform_encrypted_backup)
-        from .crypto import AES_KEY  # or whichever key constant is used
-        nonce, tag, ct = blob[:12], blob[12:28], blob[28:]
-        cipher = AES.new(AES_KEY, AES.MODE_GCM, nonce=nonce)
-        cipher.decrypt_and_verify(ct, tag)
-
-        return {"file": encrypted_file, "verified": True}
-    except Exception as e:
-        return {"file": encrypted_file, "verified": False, "error": str(e)}
+        key = key or backup_key()
+        if key is None:
+            raise RuntimeError("BACKUP_AES_KEY is not set")
+        sha = hashlib.sha256()
+        total = chunks = 0
+        head = b""
+        out = tmp = None
+        if restore_to:
+            # unique per run, like the backup side: concurrent restores never share it
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(restore_to) or ".",
+                                       prefix=os.path.basename(restore_to) + ".", suffix=".part")
+            out = os.fdopen(fd, "wb", buffering=1 << 20)
+        try:
+            with open(encrypted_file, "rb", buffering=1 << 20) as f:
+                for pt in iter_decrypted(f, key):
+                    if len(head) < len(SQLITE_HEADER):
+                        head += pt[: len(SQLITE_HEADER)]
+                    sha.update(pt)
+                    total += len(pt)
+                    chunks += 1
+                    if out:
+                        out.write(pt)
+            if out:
+                out.close()
+                os.replace(tmp, restore_to)
+        finally:
+            if out and not out.closed:
+                out.close()
+                os.remove(tmp)
+
+        return {
+            "file": encrypted_file,
+            "verified": True,
+            "bytes": total,
+            "chunks": chunks,
+            "sha256": sha.hexdigest(),
+            "sqlite": head.startswith(SQLITE_HEADER),
+            "restored_to": restore_to,
+        }
+    except (InvalidTag, StreamFormatError, OSError, RuntimeError) as e:
+        return {"file": encrypted_file, "verified": False, "error": str(e) or type(e).__name__}